@@ -3,7 +3,10 @@ from datetime import date
 import os
 from dotenv import load_dotenv
 import pandas as pd
-from serpapi import GoogleSearch
+from utils.extract import FlightExtractor
+from utils.response_cache import cache_key
+from utils.serpapi_client import search, get_cache
+from utils.singleflight import get_group
 import plotly.express as px
 
 # ------------------------
@@ -85,25 +88,20 @@ def fetch_flights(departure, arrival, outbound_date, return_date):
         "api_key": API_KEY,
     }
 
-    search = GoogleSearch(params)
-    results = search.get_dict()
-
-    flights = []
-    for section in ["best_flights", "other_flights"]:
-        for group in results.get(section, []):
-            price = group.get("price")
-            for flight in group.get("flights", []):
-                flights.append({
-                    "airline": flight.get("airline"),
-                    "price": price,
-                    "departure": flight.get("departure_airport", {}).get("id"),
-                    "arrival": flight.get("arrival_airport", {}).get("id"),
-                    "departure_time": flight.get("departure_airport", {}).get("time"),
-                    "arrival_time": flight.get("arrival_airport", {}).get("time"),
-                    "flight_number": flight.get("flight_number"),
-                })
-
-    return pd.DataFrame(flights)
+    def run():
+        ext = FlightExtractor()
+        ext.add(search(params))
+
+        # Itinéraires (un prix par offre) + détail des vols de chacun
+        itineraries = ext.itineraries()
+        segments = ext.flat_segments(
+            ["itinerary_id", "airline", "price", "departure_airport", "arrival_airport",
+             "departure_time", "arrival_time", "flight_number"],
+        ).rename(columns={"departure_airport": "departure", "arrival_airport": "arrival"})
+        return itineraries, segments
+
+    # Les sessions qui lancent la même recherche au même moment partagent un seul appel
+    return get_group("app.fetch_flights").do(cache_key(params), run)
 
 # ------------------------
 # Action
@@ -126,17 +124,22 @@ if submit:
         st.stop()
 
     with st.spinner("Recherche des vols..."):
-        df = fetch_flights(departure, arrival, outbound_date, return_date)
+        itineraries, df = fetch_flights(departure, arrival, outbound_date, return_date)
+
+    cache_stats = get_cache().stats()
+    flight_stats = get_group("app.fetch_flights").stats()
+    st.sidebar.caption(f"🗄️ Cache SerpAPI : {cache_stats['hits']} hit(s) / {cache_stats['misses']} miss(es)")
+    st.sidebar.caption(f"🔗 Recherches émises : {flight_stats['issued']} · regroupés : {flight_stats['coalesced']}")
 
     if df.empty:
         st.warning("⚠️ Aucun vol trouvé")
     else:
-        st.success(f"✅ {len(df)} vols trouvés")
+        st.success(f"✅ {len(itineraries)} itinéraires trouvés ({len(df)} vols)")
 
         st.dataframe(df, use_container_width=True)
 
-        # 📊 Prix moyen par compagnie
-        avg_price = df.groupby("airline")["price"].mean().reset_index()
+        # 📊 Prix moyen par compagnie (sur les itinéraires : une escale ne double pas le poids)
+        avg_price = itineraries.groupby("airline", observed=True)["price"].mean().reset_index()
 
         fig = px.bar(
             avg_price,
@@ -3,7 +3,8 @@ from datetime import date
 import os
 from dotenv import load_dotenv
 import pandas as pd
-from google_search_results import GoogleSearch
+from utils.extract import extract_flights
+from utils.serpapi_client import search
 import plotly.express as px
 
 # ------------------------
@@ -68,7 +69,6 @@ with st.form("flight_form"):
 # SerpAPI logic
 # ------------------------
 def fetch_flights(departure, arrival, outbound_date, return_date):
-    client = SerpApiClient(api_key=API_KEY)
     params = {
         "engine": "google_flights",
         "departure_id": departure,
@@ -78,26 +78,14 @@ def fetch_flights(departure, arrival, outbound_date, return_date):
         "currency": "EUR",
         "hl": "fr",
         "type": 1,
+        "api_key": API_KEY,
     }
-    results = client.get_dict(params)
-    flights = []
-
-    for section in ["best_flights", "other_flights"]:
-        for group in results.get(section, []):
-            price = group.get("price")
-            duration = group.get("total_duration")
-            for flight in group.get("flights", []):
-                flights.append({
-                    "airline": flight.get("airline"),
-                    "price": price,
-                    "departure": flight.get("departure_airport", {}).get("id"),
-                    "arrival": flight.get("arrival_airport", {}).get("id"),
-                    "departure_time": flight.get("departure_airport", {}).get("time"),
-                    "arrival_time": flight.get("arrival_airport", {}).get("time"),
-                    "duration_min": duration,
-                    "flight_number": flight.get("flight_number"),
-                })
-    return pd.DataFrame(flights)
+    results = search(params)
+    return extract_flights(
+        results,
+        ["airline", "price", "departure_airport", "arrival_airport",
+         "departure_time", "arrival_time", "duration_min", "flight_number"],
+    ).rename(columns={"departure_airport": "departure", "arrival_airport": "arrival"})
 
 # ------------------------
 # Action
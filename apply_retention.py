@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+apply_retention.py
+Agrège les jours de collecte anciens du store (min / médiane / moyenne / max par
+compagnie et date aller) et supprime leurs relevés bruts. Incrémental : à relancer
+chaque jour, seuls les jours qui viennent de dépasser la limite sont traités.
+
+  python apply_retention.py                     # RETENTION_RAW_DAYS (config/settings.py)
+  python apply_retention.py --raw-days 14 --dry-run
+"""
+
+import argparse
+
+from config.settings import HISTORY_STORE_DIR, RETENTION_RAW_DAYS, RETENTION_ROLLUP_DAYS
+from utils.history_store import HistoryStore
+from utils.retention import apply_retention
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rétention et agrégation de l'historique des prix")
+    parser.add_argument("--store", default=HISTORY_STORE_DIR, help="Racine du store")
+    parser.add_argument("--raw-days", type=int, default=RETENTION_RAW_DAYS,
+                        help="Jours de collecte gardés en brut (0 = tout garder)")
+    parser.add_argument("--rollup-days", type=int, default=RETENTION_ROLLUP_DAYS,
+                        help="Jours d'agrégats gardés (0 = indéfiniment)")
+    parser.add_argument("--route", action="append", help="Limiter à une route (répétable)")
+    parser.add_argument("--today", help="Date de référence YYYY-MM-DD (défaut : aujourd'hui)")
+    parser.add_argument("--dry-run", action="store_true", help="Afficher sans rien modifier")
+    args = parser.parse_args()
+
+    store = HistoryStore(args.store)
+    result = apply_retention(store, args.raw_days, args.rollup_days, routes=args.route,
+                             today=args.today, dry_run=args.dry_run)
+
+    prefix = "🔎 (simulation) " if args.dry_run else "✅ "
+    for route, day in result.rolled:
+        print(f"  ~ {route} {day}")
+    print(f"{prefix}{len(result.rolled)} jour(s) agrégé(s) : {result.rows_in} itinéraires → {result.rows_out} lignes")
+    if result.expired:
+        print(f"{prefix}{len(result.expired)} jour(s) d'agrégats expiré(s)")
+    for dataset in ("itineraries", "rollups"):
+        print(f"📁 {dataset} : {len(store.partitions(dataset, args.route))} partition(s)")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+bench_extraction.py
+Compare l'ancienne extraction (liste de dicts + DataFrame) au FlightExtractor
+colonnaire sur des milliers de réponses synthétiques.
+
+Lancer avec : python bench_extraction.py --responses 5000
+"""
+
+import argparse
+import time
+
+import pandas as pd
+
+from utils.extract import FlightExtractor
+from utils.synthetic import make_response
+
+
+def legacy_extract(responses: list) -> pd.DataFrame:
+    """Copie de la boucle historique des scripts fetch_*.py."""
+    flights = []
+    for results in responses:
+        for section in ["best_flights", "other_flights"]:
+            for group in results.get(section, []):
+                price = group.get("price")
+                total_duration = group.get("total_duration")
+                for flight in group.get("flights", []):
+                    flights.append({
+                        "airline": flight.get("airline"),
+                        "price": price,
+                        "departure_airport": flight.get("departure_airport", {}).get("id"),
+                        "arrival_airport": flight.get("arrival_airport", {}).get("id"),
+                        "departure_time": flight.get("departure_airport", {}).get("time"),
+                        "arrival_time": flight.get("arrival_airport", {}).get("time"),
+                        "duration_min": total_duration,
+                        "flight_number": flight.get("flight_number"),
+                    })
+    return pd.DataFrame(flights)
+
+
+def columnar_extract(responses: list) -> FlightExtractor:
+    ext = FlightExtractor()
+    for results in responses:
+        ext.add(results)
+    return ext
+
+
+def both_tables(responses: list) -> tuple:
+    ext = columnar_extract(responses)
+    return ext.itineraries(), ext.segments()
+
+
+def best_of(func, repeat):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = func()
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de l'extraction des itinéraires")
+    parser.add_argument("--responses", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    responses = [make_response(outbound_date="2025-12-23", seed=i) for i in range(args.responses)]
+    print(f"🧪 {len(responses)} réponses synthétiques")
+
+    t_legacy, df_legacy = best_of(lambda: legacy_extract(responses), args.repeat)
+    # Extraction complète chronométrée d'un bloc : les identifiants stables sont
+    # calculés une fois par extracteur, partagés par itineraries() et segments()
+    t_full, (itin, seg) = best_of(lambda: both_tables(responses), args.repeat)
+    t_ext, ext = best_of(lambda: columnar_extract(responses), args.repeat)
+    t_flat, df_flat = best_of(lambda: columnar_extract(responses).flat_segments(), args.repeat)
+
+    mem_legacy = df_legacy.memory_usage(deep=True).sum() / 1e6
+    mem_itin = itin.memory_usage(deep=True).sum() / 1e6
+    mem_seg = seg.memory_usage(deep=True).sum() / 1e6
+
+    print(f"\n{'Méthode':<44}{'Temps':>10}{'Lignes':>10}{'Mémoire':>12}")
+    print(f"{'Ancienne boucle (dicts → DataFrame)':<44}{t_legacy:>9.3f}s{len(df_legacy):>10}{mem_legacy:>10.1f}MB")
+    print(f"{'FlightExtractor (lecture seule)':<44}{t_ext:>9.3f}s{len(ext):>10}{'':>12}")
+    print(f"{'FlightExtractor → itinéraires + segments':<44}{t_full:>9.3f}s{len(itin) + len(seg):>10}{mem_itin + mem_seg:>10.1f}MB")
+    print(f"{'FlightExtractor → segments à plat':<44}{t_flat:>9.3f}s{len(df_flat):>10}{'':>12}")
+    print(f"\n⚡ Gain (itinéraires + segments) : x{t_legacy / t_full:.2f}")
+    print(f"⚡ Gain (segments à plat, même sortie que l'ancienne boucle) : x{t_legacy / t_flat:.2f}")
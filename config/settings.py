@@ -7,8 +7,48 @@ API_KEY = os.getenv("API_KEY_SERPAPI")
 DEPARTURE_ID = os.getenv("DEPARTURE_ID", "CDG")
 ARRIVAL_ID = os.getenv("ARRIVAL_ID", "ABJ")
 CURRENCY = os.getenv("CURRENCY", "EUR")
-LANG = os.getenv("LANG", "fr")
+# Pas $LANG : c'est la locale système (ex. en_US.UTF-8), refusée par SerpAPI comme `hl`
+LANG = os.getenv("SERPAPI_HL", "fr")
 OUTPUT_DIR = os.getenv("OUTPUT_DIR", "data/raw_flights")
 LOG_FILE = os.getenv("LOG_FILE", "logs/fetch.log")
 START_DATE = os.getenv("START_DATE")
 END_DATE = os.getenv("END_DATE")
+
+# Collecte concurrente : nombre d'appels simultanés et débit max (appels/s)
+SERPAPI_MAX_WORKERS = int(os.getenv("SERPAPI_MAX_WORKERS", "4"))
+SERPAPI_RATE_PER_SEC = float(os.getenv("SERPAPI_RATE_PER_SEC", "1"))
+SERPAPI_BURST = int(os.getenv("SERPAPI_BURST", "2"))
+
+# Cache disque des réponses SerpAPI partagé par tous les scripts
+SERPAPI_CACHE_PATH = os.getenv("SERPAPI_CACHE_PATH", "cache/serpapi.sqlite")
+SERPAPI_CACHE_TTL = float(os.getenv("SERPAPI_CACHE_TTL", str(6 * 3600)))
+SERPAPI_CACHE_MAX_MB = float(os.getenv("SERPAPI_CACHE_MAX_MB", "200"))
+
+# Archive brute (append-only, gzip) de toutes les réponses SerpAPI
+SERPAPI_ARCHIVE_DIR = os.getenv("SERPAPI_ARCHIVE_DIR", "data/archive")
+SERPAPI_ARCHIVE_ENABLED = os.getenv("SERPAPI_ARCHIVE_ENABLED", "1") == "1"
+
+# Réessais, backoff et disjoncteur des appels SerpAPI
+SERPAPI_MAX_RETRIES = int(os.getenv("SERPAPI_MAX_RETRIES", "3"))
+SERPAPI_BACKOFF_BASE = float(os.getenv("SERPAPI_BACKOFF_BASE", "1"))
+SERPAPI_BACKOFF_MAX = float(os.getenv("SERPAPI_BACKOFF_MAX", "30"))
+SERPAPI_BREAKER_THRESHOLD = int(os.getenv("SERPAPI_BREAKER_THRESHOLD", "5"))
+SERPAPI_BREAKER_COOLDOWN = float(os.getenv("SERPAPI_BREAKER_COOLDOWN", "60"))
+
+# URL de l'API (surchargée par le serveur local mock_serpapi.py pour les tests de charge)
+SERPAPI_BACKEND = os.getenv("SERPAPI_BACKEND", "")
+
+# Historique Parquet partitionné (route / date de collecte)
+HISTORY_STORE_DIR = os.getenv("HISTORY_STORE_DIR", "data/store")
+FARE_DB_PATH = os.getenv("FARE_DB_PATH", "data/fares.sqlite")
+
+# Rétention : jours de collecte gardés en brut, puis agrégés (0 = jamais / garder indéfiniment)
+RETENTION_RAW_DAYS = int(os.getenv("RETENTION_RAW_DAYS", "30"))
+RETENTION_ROLLUP_DAYS = int(os.getenv("RETENTION_ROLLUP_DAYS", "0"))
+
+# Graphiques : points max par courbe après réduction (minmax ou lttb, utils/downsample.py)
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "1000"))
+CHART_DOWNSAMPLE = os.getenv("CHART_DOWNSAMPLE", "minmax")
+
+# Tableau de bord : intervalle de vérification du store par le rafraîchissement d'arrière-plan (s)
+DASHBOARD_REFRESH_SECONDS = float(os.getenv("DASHBOARD_REFRESH_SECONDS", "60"))
@@ -8,67 +8,42 @@ Affiche la tendance du meilleur prix général et des compagnies aériennes
 import os
 import pandas as pd
 import matplotlib.pyplot as plt
-from datetime import datetime
+
+from config.settings import CHART_DOWNSAMPLE, CHART_MAX_POINTS, FARE_DB_PATH
+from utils.downsample import downsample
+from utils.fare_db import open_fare_db
 
 # ------------------------------
 # Configuration
 # ------------------------------
 OUTPUT_DIR = "output"
+ROUTE = "CDG-ABJ"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-# Lister tous les fichiers CSV disponibles
-csv_files = sorted([f for f in os.listdir(OUTPUT_DIR) if f.endswith(".csv")])
-if not csv_files:
-    raise FileNotFoundError("Aucun fichier CSV trouvé dans le dossier 'output'.")
-
-print(f"🧾 {len(csv_files)} fichiers trouvés :")
-for f in csv_files:
-    print(f"  - {f}")
+db = open_fare_db(routes=[ROUTE])
 
 # ------------------------------
-# Initialisation des structures
+# Agrégation (requêtes indexées, prix déjà typés)
 # ------------------------------
-dates = []
-best_prices = []
-company_prices = {}
+by_day = db.daily_stats(ROUTE)
+if by_day.empty:
+    raise FileNotFoundError(f"Aucune collecte {ROUTE} dans '{FARE_DB_PATH}'.")
+print(f"🧾 {len(by_day)} jours de collecte trouvés")
+
+# Au plus CHART_MAX_POINTS points par courbe (enveloppe min/max ou forme LTTB conservée)
+by_day, n_days = downsample(by_day, "collection_date", "price_min", CHART_MAX_POINTS, method=CHART_DOWNSAMPLE)
+by_airline, n_airline_days = downsample(
+    db.daily_stats(ROUTE, by_airline=True), "collection_date", "price_mean", CHART_MAX_POINTS,
+    by="airline", method=CHART_DOWNSAMPLE,
+)
+print(f"📉 Réduction {CHART_DOWNSAMPLE} : {len(by_day)} points tracés pour {n_days[None]} jours (meilleur prix)")
+
+dates = [d.to_pydatetime() for d in by_day["collection_date"]]
+best_prices = by_day["price_min"].astype(float).tolist()
 
-# ------------------------------
-# Lecture et agrégation
-# ------------------------------
-for file in csv_files:
-    path = os.path.join(OUTPUT_DIR, file)
-    df = pd.read_csv(path)
-
-    if df.empty:
-        continue
-
-    # Extraire la date de collecte depuis le nom du fichier
-    date_str = file.replace(".csv", "").split("_")[-1]
-    try:
-        date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-    except ValueError:
-        print(f"⚠️ Nom de fichier inattendu : {file}")
-        continue
-
-    # Nettoyer les prix
-    df["price"] = (
-        df["price"].astype(str)
-        .str.replace("[^0-9]", "", regex=True)
-        .astype(float)
-    )
-
-    # Enregistrer la date
-    dates.append(date_obj)
-
-    # Prix minimum du jour
-    best_prices.append(df["price"].min())
-
-    # Prix par compagnie
-    for airline, group in df.groupby("airline"):
-        mean_price = group["price"].mean()
-        if airline not in company_prices:
-            company_prices[airline] = []
-        company_prices[airline].append((date_obj, mean_price))
+company_prices = {}
+for row in by_airline.itertuples(index=False):
+    company_prices.setdefault(row.airline, []).append((row.collection_date.to_pydatetime(), float(row.price_mean)))
 
 # ------------------------------
 # Afficher un résumé rapide
@@ -89,13 +64,14 @@ dates, best_prices = zip(*sorted(zip(dates, best_prices)))
 plt.figure(figsize=(12,6))
 
 # Courbe du meilleur prix global
-plt.plot(dates, best_prices, marker='o', linestyle='-', color='black', linewidth=2, label='Meilleur prix global')
+plt.plot(dates, best_prices, marker='o', linestyle='-', color='black', linewidth=2, label=f'Meilleur prix global ({len(dates)}/{n_days[None]} jours)')
 
 # Courbes des compagnies
 for airline, values in company_prices.items():
     values_sorted = sorted(values, key=lambda x: x[0])
     date_series, price_series = zip(*values_sorted)
-    plt.plot(date_series, price_series, marker='o', linestyle='--', label=airline)
+    plt.plot(date_series, price_series, marker='o', linestyle='--',
+             label=f"{airline} ({len(values)}/{n_airline_days[airline]} jours)")
 
 # Mise en forme
 plt.title("📉 Évolution des prix des vols Paris → Abidjan (par compagnie)")
@@ -2,10 +2,21 @@
 """
 fetch_flights_generic.py
 Collecte générique des prix de vols via SerpAPI (Google Flights)
+
+Un seul trajet :
+  python fetch_flights_generic.py --from CDG --to ABJ --out 2025-12-20 --ret 2026-01-10
+Par lots (matrice routes × dates, reprise automatique après interruption) :
+  python fetch_flights_generic.py --batch jobs.json
 """
 
-from google_search_results import GoogleSearch
-import csv
+from config.settings import SERPAPI_MAX_WORKERS, SERPAPI_RATE_PER_SEC, SERPAPI_BURST, HISTORY_STORE_DIR
+from utils.batch_jobs import Checkpoint, FlightJob, checkpoint_path, load_jobs
+from utils.extract import FlightExtractor
+from utils.fetch_pool import fetch_concurrently
+from utils.history_store import HistoryStore
+from utils.rate_limit import TokenBucket
+from utils.retry import CircuitOpenError
+from utils.serpapi_client import search, metrics
 import os
 import json
 import argparse
@@ -18,90 +29,128 @@ from dotenv import load_dotenv
 load_dotenv()
 API_KEY = os.getenv("SERPAPI_KEY")
 
-# ------------------------
-# Arguments CLI
-# ------------------------
-parser = argparse.ArgumentParser(description="Analyse dynamique des vols")
-parser.add_argument("--from", dest="departure", required=True, help="Aéroport départ (ex: CDG)")
-parser.add_argument("--to", dest="arrival", required=True, help="Aéroport arrivée (ex: ABJ)")
-parser.add_argument("--out", dest="outbound_date", required=True, help="Date aller YYYY-MM-DD")
-parser.add_argument("--ret", dest="return_date", required=True, help="Date retour YYYY-MM-DD")
+OUTPUT_DIR = "data/raw"  # journaux de reprise ; les vols vont dans le store Parquet
+store = HistoryStore(HISTORY_STORE_DIR)
 
-args = parser.parse_args()
 
 # ------------------------
-# Préparation sortie
+# Paramètres SerpAPI
 # ------------------------
-OUTPUT_DIR = "data/raw"
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-today = datetime.now().strftime("%Y-%m-%d")
-route = f"{args.departure}-{args.arrival}"
+def build_params(job: FlightJob) -> dict:
+    params = {
+        "engine": "google_flights",
+        "departure_id": job.departure,
+        "arrival_id": job.arrival,
+        "outbound_date": job.outbound_date,
+        "currency": "EUR",
+        "hl": "fr",
+        "type": 1 if job.return_date else 2,
+        "api_key": API_KEY,
+    }
+    if job.return_date:
+        params["return_date"] = job.return_date
+    return params
+
+
+def collect(job: FlightJob, today: str):
+    """Un appel SerpAPI → (réponse brute, extracteur : itinéraires + segments)."""
+    results = search(build_params(job))
+    flights = FlightExtractor()
+    flights.add(results, outbound_date=job.outbound_date, return_date=job.return_date)
+    return results, flights
+
+
+def write_partition(flights: FlightExtractor, job: FlightJob, today: str) -> str:
+    """Un fichier par job dans la partition (route, jour) du store, réécrit si le job est rejoué."""
+    part_name = f"{job.outbound_date}_{job.return_date or 'oneway'}"
+    return store.append_flights(flights.itineraries(), flights.segments(), job.route, today, part_name=part_name)
 
-output_file = os.path.join(
-    OUTPUT_DIR, f"flights_{route}_{today}.csv"
-)
 
 # ------------------------
-# Paramètres SerpAPI
+# Modes d'exécution
 # ------------------------
-params = {
-    "engine": "google_flights",
-    "departure_id": args.departure,
-    "arrival_id": args.arrival,
-    "outbound_date": args.outbound_date,
-    "return_date": args.return_date,
-    "currency": "EUR",
-    "hl": "fr",
-    "type": 1,
-    "api_key": API_KEY,
-}
-
-print(f"🔎 Route : {route}")
-print(f"📅 Aller : {args.outbound_date} | Retour : {args.return_date}")
-print(f"📆 Collecte du {today}\n")
+def run_single(args, today: str):
+    job = FlightJob(args.departure, args.arrival, args.outbound_date, args.return_date)
+
+    print(f"🔎 Route : {job.route}")
+    print(f"📅 Aller : {job.outbound_date} | Retour : {job.return_date}")
+    print(f"📆 Collecte du {today}\n")
+
+    try:
+        results, flights = collect(job, today)
+
+        if not len(flights):
+            print("⚠️ Aucun vol trouvé")
+            print(json.dumps(results, indent=2))
+        else:
+            print(f"✅ {len(flights)} itinéraires collectés")
+
+            output_file = write_partition(flights, job, today)
+
+            print(f"📁 Fichier généré : {output_file}")
+
+    except Exception as e:
+        print(f"❌ Erreur : {e}")
+
+
+def run_batch(args, today: str):
+    jobs = load_jobs(args.batch)
+    checkpoint = Checkpoint(args.checkpoint or checkpoint_path(args.batch, os.path.join(OUTPUT_DIR, "_checkpoints")))
+    pending = checkpoint.pending(jobs)
+    if jobs and not pending and not args.checkpoint:
+        # Lot déjà terminé : nouvelle collecte, le journal précédent est conservé à part
+        print(f"🗂️ Lot précédent terminé, journal archivé : {checkpoint.archive()}")
+        pending = jobs
+
+    print(f"🧾 Lot : {args.batch} — {len(jobs)} jobs, {len(jobs) - len(pending)} déjà faits")
+    print(f"📆 Collecte du {today} | {args.workers} workers, {args.rate:g} appel(s)/s\n")
+
+    limiter = TokenBucket(args.rate, capacity=SERPAPI_BURST)
+    stream = fetch_concurrently(
+        pending, lambda job: collect(job, today), max_workers=args.workers, limiter=limiter
+    )
+    for i, (job, output, err) in enumerate(stream, start=1):
+        prefix = f"[{i}/{len(pending)}] {job.job_id}"
+        if err is not None:
+            checkpoint.record(job, "failed", error=str(err))
+            print(f"❌ {prefix} — Erreur : {err}")
+            if isinstance(err, CircuitOpenError):
+                print("🛑 Lot interrompu : l'API échoue en boucle. Relancer plus tard reprendra ici.")
+                break
+            continue
+        results, flights = output
+        if not len(flights):
+            checkpoint.record(job, "empty", error=results.get("error"))
+            print(f"⚠️ {prefix} — aucun vol")
+            continue
+        path = write_partition(flights, job, today)
+        checkpoint.record(job, "done", rows=len(flights), path=path)
+        print(f"✅ {prefix} — {len(flights)} itinéraires → {path}")
+
+    print(f"\n📊 Bilan : {checkpoint.summary()} (journal : {checkpoint.path})")
+    print(f"⏱️ Appels API : {metrics.summary()}")
+
 
 # ------------------------
-# Recherche vols
+# Arguments CLI
 # ------------------------
-try:
-    search = GoogleSearch(params)
-    results = search.get_dict()
-    flights = []
-
-    for section in ["best_flights", "other_flights"]:
-        for group in results.get(section, []):
-            price = group.get("price")
-            total_duration = group.get("total_duration")
-
-            for flight in group.get("flights", []):
-                flights.append({
-                    "route": route,
-                    "search_date": today,
-                    "outbound_date": args.outbound_date,
-                    "return_date": args.return_date,
-                    "airline": flight.get("airline"),
-                    "price": price,
-                    "departure_airport": flight.get("departure_airport", {}).get("id"),
-                    "arrival_airport": flight.get("arrival_airport", {}).get("id"),
-                    "departure_time": flight.get("departure_airport", {}).get("time"),
-                    "arrival_time": flight.get("arrival_airport", {}).get("time"),
-                    "duration_min": total_duration,
-                    "flight_number": flight.get("flight_number"),
-                })
-
-    if not flights:
-        print("⚠️ Aucun vol trouvé")
-        print(json.dumps(results, indent=2))
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyse dynamique des vols")
+    parser.add_argument("--from", dest="departure", help="Aéroport départ (ex: CDG)")
+    parser.add_argument("--to", dest="arrival", help="Aéroport arrivée (ex: ABJ)")
+    parser.add_argument("--out", dest="outbound_date", help="Date aller YYYY-MM-DD")
+    parser.add_argument("--ret", dest="return_date", help="Date retour YYYY-MM-DD")
+    parser.add_argument("--batch", help="Matrice de jobs (.json ou .csv)")
+    parser.add_argument("--checkpoint", help="Journal de reprise (défaut : data/raw/_checkpoints/<lot>_<empreinte>.jsonl)")
+    parser.add_argument("--workers", type=int, default=SERPAPI_MAX_WORKERS, help="Appels simultanés")
+    parser.add_argument("--rate", type=float, default=SERPAPI_RATE_PER_SEC, help="Appels/s max")
+    args = parser.parse_args()
+
+    today = datetime.now().strftime("%Y-%m-%d")
+    if args.batch:
+        run_batch(args, today)
     else:
-        print(f"✅ {len(flights)} vols collectés")
-
-        with open(output_file, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=flights[0].keys())
-            writer.writeheader()
-            writer.writerows(flights)
-
-        print(f"📁 Fichier généré : {output_file}")
-
-except Exception as e:
-    print(f"❌ Erreur : {e}")
+        missing = [f for f in ("departure", "arrival", "outbound_date", "return_date") if not getattr(args, f)]
+        if missing:
+            parser.error("--from, --to, --out et --ret sont requis sans --batch")
+        run_single(args, today)
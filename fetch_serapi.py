@@ -5,8 +5,8 @@ Recherche aller-retour Paris (CDG) → Abidjan (ABJ)
 Période : 22 décembre 2025 au 14 janvier 2026
 """
 
-from serpapi import GoogleSearch
-import csv
+from utils.serpapi_client import search
+from utils.extract import extract_flights
 import os
 import json
 
@@ -38,39 +38,26 @@ OUTPUT_DIR = "output"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 try:
-    search = GoogleSearch(params)
-    results = search.get_dict()
+    # Cache, réessais, disjoncteur et archive brute, comme les autres collecteurs
+    results = search(params)
 
-    flights = []
+    flights = extract_flights(
+        results,
+        ["airline", "price", "departure_airport", "arrival_airport",
+         "departure_time", "arrival_time", "duration_min", "flight_number"],
+    )
 
-    for section in ["best_flights", "other_flights"]:
-        for group in results.get(section, []):
-            price = group.get("price")
-            total_duration = group.get("total_duration")
-
-            for flight in group.get("flights", []):
-                flights.append({
-                    "airline": flight.get("airline"),
-                    "price": price,
-                    "departure_airport": flight.get("departure_airport", {}).get("id"),
-                    "arrival_airport": flight.get("arrival_airport", {}).get("id"),
-                    "departure_time": flight.get("departure_airport", {}).get("time"),
-                    "arrival_time": flight.get("arrival_airport", {}).get("time"),
-                    "duration": total_duration,
-                    "flight_number": flight.get("flight_number"),
-                })
-
-    if not flights:
+    if flights.empty:
         print("⚠️ Aucun vol trouvé. Voici la réponse brute :")
         print(json.dumps(results, indent=2))
     else:
         print(f"✅ {len(flights)} vols trouvés !\n")
 
-        for f in flights[:5]:
+        for f in flights.head(5).to_dict("records"):
             print(
                 f"✈️ {f['airline']} | {f['departure_airport']} → {f['arrival_airport']} "
                 f"({f['departure_time']} → {f['arrival_time']}) | "
-                f"Durée: {f['duration']} min | Prix: {f['price']} €"
+                f"Durée: {f['duration_min']} min | Prix: {f['price']} €"
             )
 
         # 💾 Sauvegarde CSV
@@ -78,16 +65,7 @@ try:
             OUTPUT_DIR, f"vols_paris_abidjan_{date_depart}_retour_{date_retour}.csv"
         )
 
-        with open(output_file, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(
-                f,
-                fieldnames=[
-                    "airline", "price", "departure_airport", "arrival_airport",
-                    "departure_time", "arrival_time", "duration", "flight_number",
-                ],
-            )
-            writer.writeheader()
-            writer.writerows(flights)
+        flights.to_csv(output_file, index=False, encoding="utf-8")
 
         print(f"\n📁 Résultats enregistrés dans : {output_file}")
 
@@ -3,11 +3,14 @@
 fetch_serapi_paris_abidjan_daily.py
 Recherche complète Paris (CDG) → Abidjan (ABJ)
 Période fixe : départ 22 décembre 2025, retour 14 janvier 2026
-Un fichier CSV par jour
+Une partition Parquet par jour (data/store)
 """
 
-from serpapi import GoogleSearch
-import csv
+from config.settings import HISTORY_STORE_DIR, RETENTION_RAW_DAYS, RETENTION_ROLLUP_DAYS
+from utils.serpapi_client import search
+from utils.extract import FlightExtractor
+from utils.history_store import HistoryStore
+from utils.retention import apply_retention
 import os
 import json
 from datetime import datetime
@@ -24,12 +27,10 @@ DATE_DEPART = "2025-12-23"
 DATE_RETOUR = "2026-01-14"
 
 # ------------------------
-# Préparation dossier et CSV
+# Store de l'historique (une partition par jour de collecte)
 # ------------------------
-OUTPUT_DIR = "output"
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+store = HistoryStore(HISTORY_STORE_DIR)
 today = datetime.now().strftime("%Y-%m-%d")
-output_file = os.path.join(OUTPUT_DIR, f"vols_paris_abidjan_{today}.csv")
 
 # ------------------------
 # Recherche des vols
@@ -51,45 +52,28 @@ print(f"📅 Départ : {DATE_DEPART} | Retour : {DATE_RETOUR}")
 print(f"📆 Exécution du {today}\n")
 
 try:
-    search = GoogleSearch(params)
-    results = search.get_dict()
-    flights = []
+    results = search(params)
+    flights = FlightExtractor()
+    flights.add(results, outbound_date=DATE_DEPART, return_date=DATE_RETOUR)
 
-    for section in ["best_flights", "other_flights"]:
-        for group in results.get(section, []):
-            price = group.get("price")
-            total_duration = group.get("total_duration")
-            for flight in group.get("flights", []):
-                flights.append({
-                    "airline": flight.get("airline"),
-                    "price": price,
-                    "departure_airport": flight.get("departure_airport", {}).get("id"),
-                    "arrival_airport": flight.get("arrival_airport", {}).get("id"),
-                    "departure_time": flight.get("departure_airport", {}).get("time"),
-                    "arrival_time": flight.get("arrival_airport", {}).get("time"),
-                    "duration": total_duration,
-                    "flight_number": flight.get("flight_number"),
-                })
-
-    if not flights:
+    if not len(flights):
         print("⚠️ Aucun vol trouvé. Voici la réponse brute :")
         print(json.dumps(results, indent=2))
     else:
-        print(f"✅ {len(flights)} vols trouvés !")
+        print(f"✅ {len(flights)} itinéraires trouvés !")
 
-        # 💾 Sauvegarde CSV du jour
-        with open(output_file, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(
-                f,
-                fieldnames=[
-                    "airline", "price", "departure_airport", "arrival_airport",
-                    "departure_time", "arrival_time", "duration", "flight_number",
-                ],
-            )
-            writer.writeheader()
-            writer.writerows(flights)
+        # 💾 Partition du jour (remplacée si le script est relancé) : itinéraires + segments,
+        # sous un nom stable pour que la fusion incrémentale reconnaisse le même fichier
+        output_file = store.append_flights(
+            flights.itineraries(), flights.segments(), "CDG-ABJ", today, part_name="daily", replace=True
+        )
 
         print(f"📁 Résultats enregistrés dans : {output_file}")
 
+        # Rétention : les jours qui viennent de dépasser la limite passent en agrégats
+        retention = apply_retention(store, RETENTION_RAW_DAYS, RETENTION_ROLLUP_DAYS, today=today)
+        if retention.rolled:
+            print(f"🗜️ {len(retention.rolled)} jour(s) ancien(s) agrégé(s) ({retention.rows_in} → {retention.rows_out} lignes)")
+
 except Exception as e:
     print(f"❌ Erreur : {e}")
@@ -2,8 +2,13 @@ import streamlit as st
 from datetime import date
 import os
 from dotenv import load_dotenv
+import numpy as np
 import pandas as pd
-from serpapi import GoogleSearch
+from utils.extract import FlightExtractor
+from utils.response_cache import cache_key
+from utils.serpapi_client import search, get_cache
+from utils.scoring import Weights, rank, top_k
+from utils.singleflight import get_group
 import plotly.express as px
 
 # ------------------------
@@ -72,31 +77,19 @@ def fetch_flights(departure, arrival, outbound_date, return_date):
         "api_key": API_KEY,
     }
 
-    search = GoogleSearch(params)
-    results = search.get_dict()
-    flights = []
-
-    for section in ["best_flights", "other_flights"]:
-        for group in results.get(section, []):
-            price = group.get("price")
-            duration = group.get("total_duration")
-            segments = group.get("flights", [])
-            stops = max(len(segments) - 1, 0)
-            flight_type = "Direct" if stops == 0 else "Avec escale"
-
-            for flight in segments:
-                flights.append({
-                    "airline": flight.get("airline"),
-                    "price": price,
-                    "duration_min": duration,
-                    "stops": stops,
-                    "flight_type": flight_type,
-                    "departure": flight.get("departure_airport", {}).get("id"),
-                    "arrival": flight.get("arrival_airport", {}).get("id"),
-                    "flight_number": flight.get("flight_number"),
-                })
-
-    return pd.DataFrame(flights)
+    def run():
+        ext = FlightExtractor()
+        ext.add(search(params))
+        # Une ligne par itinéraire : un vol avec escale n'est compté qu'une fois
+        df = ext.itineraries()[
+            ["airline", "price", "duration_min", "stops",
+             "departure_airport", "arrival_airport", "flight_numbers"]
+        ].rename(columns={"departure_airport": "departure", "arrival_airport": "arrival"})
+        df.insert(4, "flight_type", np.where(df["stops"] == 0, "Direct", "Avec escale"))
+        return df
+
+    # Les sessions qui lancent la même recherche au même moment partagent un seul appel
+    return get_group("flight_analyzer.fetch_flights").do(cache_key(params), run)
 
 # ------------------------
 # Action
@@ -114,6 +107,11 @@ if submit:
             with st.spinner("Recherche des vols..."):
                 df = fetch_flights(departure, arrival, outbound_date, return_date)
 
+            cache_stats = get_cache().stats()
+            flight_stats = get_group("flight_analyzer.fetch_flights").stats()
+            st.sidebar.caption(f"🗄️ Cache SerpAPI : {cache_stats['hits']} hit(s) / {cache_stats['misses']} miss(es)")
+            st.sidebar.caption(f"🔗 Recherches émises : {flight_stats['issued']} · regroupés : {flight_stats['coalesced']}")
+
             if df.empty:
                 st.warning("⚠️ Aucun vol trouvé")
             else:
@@ -121,7 +119,9 @@ if submit:
                 # Nettoyage & score
                 # ------------------------
                 df = df.dropna(subset=["price", "duration_min", "stops"])
-                df["score"] = (df["price"]/df["price"].min()*0.5) + (df["duration_min"]/df["duration_min"].min()*0.3) + df["stops"]*0.2
+                # Score commun (utils/scoring.py) : 50 % prix, 30 % durée, 20 % escales ; 0 = meilleur
+                df = rank(df, Weights(price=0.5, duration=0.3, stops=0.2, departure_hour=0, airline=0))
+                df["score"] = df["score_global"]
 
                 # ------------------------
                 # Sidebar filtres
@@ -141,7 +141,7 @@ if submit:
                 # ------------------------
                 st.success(f"✅ {len(filtered_df)} vols affichés")
                 st.subheader("📋 Liste des vols")
-                st.dataframe(filtered_df[["airline", "price", "duration_min", "stops", "flight_type", "flight_number"]], use_container_width=True)
+                st.dataframe(filtered_df[["airline", "price", "duration_min", "stops", "flight_type", "flight_numbers"]], use_container_width=True)
 
                 # ------------------------
                 # Insight direct vs escale
@@ -155,12 +155,12 @@ if submit:
                 # Graphique prix vs durée
                 # ------------------------
                 st.subheader("⏱️💰 Compromis durée / prix")
-                fig = px.scatter(filtered_df, x="duration_min", y="price", color="flight_type", hover_data=["airline", "stops", "flight_number"], title="Prix vs durée des vols")
+                fig = px.scatter(filtered_df, x="duration_min", y="price", color="flight_type", hover_data=["airline", "stops", "flight_numbers"], title="Prix vs durée des vols")
                 st.plotly_chart(fig, use_container_width=True)
 
                 # ------------------------
                 # Top 3 vols recommandés
                 # ------------------------
                 st.subheader("🏆 Top 3 vols recommandés")
-                top3 = filtered_df.sort_values("score").head(3)
+                top3 = filtered_df.iloc[top_k(filtered_df["score"].to_numpy(), 3)]
                 st.dataframe(top3[["airline", "price", "duration_min", "stops", "flight_type", "score"]], use_container_width=True)
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+load_test.py
+Test de charge hors-ligne des chemins de collecte contre le serveur mock_serpapi.py
+(aucun appel payant). Mesure débit, latences, efficacité du cache, des réessais
+et du regroupement des requêtes.
+
+Scénarios :
+  search     appels directs à utils.serpapi_client.search (cache, réessais, archive)
+  batch      collecteur par lots de fetch_flights_generic.py
+  streamlit  sessions simultanées de app.py / flight_analyzer.py (formulaire soumis)
+
+Exemples :
+  python load_test.py --scenario search --requests 500 --distinct 50 --concurrency 32
+  python load_test.py --scenario streamlit --sessions 20 --error-rate 0.1
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+
+def percentiles(values: list) -> str:
+    if not values:
+        return "—"
+    values = sorted(values)
+    pick = lambda p: values[min(len(values) - 1, int(p * len(values)))]
+    return f"p50 {pick(0.5) * 1000:.0f} ms · p95 {pick(0.95) * 1000:.0f} ms · p99 {pick(0.99) * 1000:.0f} ms"
+
+
+def timed_pool(tasks: list, concurrency: int):
+    """Exécute les tâches (callables) en parallèle ; renvoie (durée, opérations, latences, erreurs)."""
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def run(task):
+        start = time.perf_counter()
+        try:
+            task()
+            with lock:
+                latencies.append(time.perf_counter() - start)
+        except Exception as e:
+            with lock:
+                errors.append(f"{type(e).__name__}: {e}")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(run, tasks))
+    return time.perf_counter() - start, len(tasks), latencies, errors
+
+
+# ------------------------
+# Scénarios
+# ------------------------
+def scenario_search(args):
+    from utils.serpapi_client import search
+
+    first = date.today() + timedelta(days=30)
+    queries = [{
+        "engine": "google_flights",
+        "departure_id": "CDG",
+        "arrival_id": ["ABJ", "JFK", "DKR", "LOS"][i % 4],
+        "outbound_date": (first + timedelta(days=i // 4)).isoformat(),
+        "currency": "EUR",
+        "hl": "fr",
+        "type": 2,
+        "api_key": "load-test",
+    } for i in range(args.distinct)]
+    tasks = [
+        (lambda q=queries[i % len(queries)]: search(q, use_cache=not args.no_cache))
+        for i in range(args.requests)
+    ]
+    return timed_pool(tasks, args.concurrency)
+
+
+def scenario_batch(args):
+    import types
+    import fetch_flights_generic as collector
+    from utils.batch_jobs import load_jobs
+
+    first = date.today() + timedelta(days=30)
+    matrix = os.path.join(args.workdir, "load_test_jobs.csv")
+    with open(matrix, "w", encoding="utf-8") as f:
+        f.write("departure,arrival,outbound_date,return_date\n")
+        outs = ";".join((first + timedelta(days=d)).isoformat() for d in range(args.distinct // 4 or 1))
+        f.write(f"CDG,ABJ;JFK;DKR;LOS,{outs},{(first + timedelta(days=60)).isoformat()}\n")
+    collector.OUTPUT_DIR = os.path.join(args.workdir, "raw")
+    batch_args = types.SimpleNamespace(
+        batch=matrix, checkpoint=None, workers=args.concurrency, rate=args.rate,
+    )
+    start = time.perf_counter()
+    collector.run_batch(batch_args, date.today().isoformat())
+    # Pas de latence par job : le débit se mesure en jobs du lot
+    return time.perf_counter() - start, len(load_jobs(matrix)), [], []
+
+
+def scenario_streamlit(args):
+    from streamlit.testing.v1 import AppTest
+
+    apps = ["app.py", "flight_analyzer.py"]
+    outbound = date.today() + timedelta(days=30)
+
+    def session(i):
+        def run():
+            at = AppTest.from_file(os.path.join(ROOT, apps[i % len(apps)]), default_timeout=120)
+            at.run()
+            at.date_input[0].set_value(outbound + timedelta(days=i % args.distinct))
+            at.date_input[1].set_value(outbound + timedelta(days=14))
+            at.button[0].click().run()
+            if at.exception:
+                raise RuntimeError(at.exception[0].value)
+        return run
+
+    return timed_pool([session(i) for i in range(args.sessions)], args.concurrency)
+
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SCENARIOS = {"search": scenario_search, "batch": scenario_batch, "streamlit": scenario_streamlit}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test de charge hors-ligne (SerpAPI factice)")
+    parser.add_argument("--scenario", choices=[*SCENARIOS, "all"], default="search")
+    parser.add_argument("--backend", help="URL d'un mock_serpapi.py déjà lancé (sinon démarré ici)")
+    parser.add_argument("--requests", type=int, default=200, help="Scénario search : nombre d'appels")
+    parser.add_argument("--distinct", type=int, default=40, help="Nombre de recherches distinctes")
+    parser.add_argument("--sessions", type=int, default=12, help="Scénario streamlit : sessions simultanées")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rate", type=float, default=50.0, help="Scénario batch : appels/s max")
+    parser.add_argument("--no-cache", action="store_true", help="Désactive le cache disque")
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--other", type=int, default=12, help="Taille des réponses (other_flights)")
+    parser.add_argument("--verbose", action="store_true", help="Affiche chaque réessai")
+    args = parser.parse_args()
+    logging.getLogger("serpapi").setLevel(logging.WARNING if args.verbose else logging.CRITICAL)
+
+    # Environnement isolé : cache, archive et store temporaires, backend local
+    args.workdir = tempfile.mkdtemp(prefix="airci_load_")
+    server = None
+    if not args.backend:
+        from mock_serpapi import start_mock_server
+        server, mock_config, args.backend = start_mock_server(
+            latency_ms=args.latency_ms, error_rate=args.error_rate,
+            throttle_rate=args.throttle_rate, n_other=args.other,
+        )
+    os.environ.update({
+        "SERPAPI_BACKEND": args.backend,
+        "SERPAPI_KEY": os.environ.get("SERPAPI_KEY", "load-test"),
+        "SERPAPI_CACHE_PATH": os.path.join(args.workdir, "cache", "serpapi.sqlite"),
+        "SERPAPI_ARCHIVE_DIR": os.path.join(args.workdir, "archive"),
+        "HISTORY_STORE_DIR": os.path.join(args.workdir, "store"),
+        "FARE_DB_PATH": os.path.join(args.workdir, "fares.sqlite"),
+        "SERPAPI_BACKOFF_BASE": os.environ.get("SERPAPI_BACKOFF_BASE", "0.2"),
+    })
+    os.chdir(ROOT)
+
+    from utils import serpapi_client
+    from utils.singleflight import get_group
+
+    print(f"🧪 Backend : {args.backend} · dossier de travail : {args.workdir}\n")
+    for name in (SCENARIOS if args.scenario == "all" else [args.scenario]):
+        elapsed, done, latencies, errors = SCENARIOS[name](args)
+        print(f"── Scénario {name} ─────────────────────────────")
+        print(f"⏱️ Durée : {elapsed:.2f}s · {done / elapsed:.1f} opérations/s")
+        if latencies:
+            print(f"📈 Latences : {percentiles(latencies)}")
+        if errors:
+            print(f"❌ {len(errors)} erreur(s), ex. : {errors[0]}")
+        print(f"🗄️ Cache : {serpapi_client.get_cache().stats()}")
+        print(f"🔁 Appels API (client) : {serpapi_client.metrics.summary()}")
+        for group in ("app.fetch_flights", "flight_analyzer.fetch_flights"):
+            stats = get_group(group).stats()
+            if stats["issued"]:
+                print(f"🔗 Regroupement {group} : {stats}")
+        if server is not None:
+            print(f"🖥️ Serveur : {dict(mock_config.counters)}")
+        print()
+
+    if server is not None:
+        server.shutdown()
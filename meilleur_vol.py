@@ -4,21 +4,36 @@ meilleur_vol.py
 Dashboard Streamlit tout-en-un
 Scraping + Analyse meilleur deal ABJ → Paris (CDG)
 Période : 2 premières semaines de juillet 2026 (1 → 14 juillet)
+Aller-retour : matrice des prix date aller × date retour (fenêtres et durée de séjour au choix)
 Lancer avec : streamlit run meilleur_vol.py
 """
 
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import os
-import glob
-import time
 import json
+import time
 from collections import defaultdict
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
+from config.settings import SERPAPI_MAX_WORKERS, SERPAPI_RATE_PER_SEC, SERPAPI_BURST, HISTORY_STORE_DIR
+from utils.cube import combine
+from utils.date_matrix import build_date_matrix, pairs
+from utils.extract import FlightExtractor
+from utils.fare_index import FareIndex
+from utils.fare_planner import FAILED, plan_fare_search
+from utils.fetch_pool import fetch_concurrently
+from utils.history_store import HistoryStore, import_legacy_csvs
+from utils.schema import SCHEMAS, normalize
+from utils.scoring import Weights, rank
+from utils.rate_limit import TokenBucket
+from utils.retry import CircuitOpenError
+from utils.serpapi_client import search
+
 load_dotenv()
 
 # ------------------------
@@ -27,8 +42,18 @@ load_dotenv()
 DATE_DEBUT    = datetime(2026, 7, 1)
 DATE_FIN      = datetime(2026, 7, 14)
 OUTPUT_DIR    = "output"
+PARTS_DIR     = os.path.join(OUTPUT_DIR, "_partiel")   # un CSV par date de départ, écrit dès réception
+FRESHNESS_H   = float(os.getenv("SCRAPING_FRESHNESS_HOURS", "12"))
+ROUTE         = "ABJ-CDG"
+ROUTE_AR      = "ABJ-CDG-ABJ"   # aller-retour : prix non comparables à l'aller simple, rangés à part
+AR_ALLER      = (DATE_DEBUT.date(), DATE_FIN.date())
+AR_RETOUR     = ((DATE_DEBUT + timedelta(days=14)).date(), (DATE_FIN + timedelta(days=45)).date())
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+store = HistoryStore(HISTORY_STORE_DIR)
+if store.is_empty("itineraries") and store.is_empty("rollups"):
+    import_legacy_csvs(store)   # anciens vols_abj_paris_juillet_*.csv
+
 st.set_page_config(
     page_title="✈️ Meilleur vol ABJ → Paris",
     page_icon="✈️",
@@ -42,59 +67,72 @@ st.caption("Juillet 2026 · Critère : meilleur rapport Prix + Durée")
 # ------------------------
 # Utilitaires
 # ------------------------
+@st.cache_resource
+def fare_index(route: str) -> FareIndex:
+    """Index des prix minimum de la route, partagé par les sessions et complété à chaque affichage."""
+    return FareIndex(route, HistoryStore(HISTORY_STORE_DIR))
+
+def require_api_key() -> str:
+    """Clé SerpAPI ; arrête la page avec un message si la clé ou le package manque."""
+    api_key = os.getenv("SERPAPI_KEY")
+    if not api_key:
+        st.error("❌ Clé SERPAPI_KEY manquante dans le fichier `.env`")
+        st.stop()
+
+    try:
+        import serpapi  # noqa: F401
+    except ImportError:
+        st.error("❌ Package `google-search-results` non installé. Lance : `pip install google-search-results`")
+        st.stop()
+    return api_key
+
 def date_range(start, end):
     current = start
     while current <= end:
         yield current
         current += timedelta(days=1)
 
-def extract_itineraries(results: dict, date_depart: str) -> list:
-    raw = []
-    for section in ["best_flights", "other_flights"]:
-        for group in results.get(section, []):
-            price          = group.get("price")
-            total_duration = group.get("total_duration")
-            segments       = group.get("flights", [])
-            if not segments:
-                continue
-            first = next((s for s in segments if s.get("departure_airport", {}).get("id") == "ABJ"), segments[0])
-            last  = segments[-1]
-            raw.append({
-                "date_depart":     date_depart,
-                "airline":         first.get("airline"),
-                "price":           int(price) if price else 0,
-                "departure_time":  first.get("departure_airport", {}).get("time", ""),
-                "arrival_time":    last.get("arrival_airport", {}).get("time", ""),
-                "arrival_airport": last.get("arrival_airport", {}).get("id", ""),
-                "duration_min":    int(total_duration) if total_duration else 0,
-                "duration_h":      round(int(total_duration) / 60, 1) if total_duration else 0,
-                "nb_escales":      len(segments) - 1,
-                "flight_numbers":  " / ".join(s.get("flight_number", "") for s in segments),
-            })
-    return raw
-
-def compute_score(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Score combiné Prix + Durée (0 = meilleur, 100 = pire)
-    Pondération : 60% prix, 40% durée
-    """
-    df = df.copy()
-    p_min, p_max = df["price"].min(), df["price"].max()
-    d_min, d_max = df["duration_min"].min(), df["duration_min"].max()
-
-    if p_max > p_min:
-        df["score_prix"] = (df["price"] - p_min) / (p_max - p_min) * 100
-    else:
-        df["score_prix"] = 0
-
-    if d_max > d_min:
-        df["score_duree"] = (df["duration_min"] - d_min) / (d_max - d_min) * 100
-    else:
-        df["score_duree"] = 0
-
-    df["score_global"] = (df["score_prix"] * 0.6 + df["score_duree"] * 0.4).round(1)
-    return df.sort_values("score_global")
+def format_itineraries(ext: FlightExtractor) -> pd.DataFrame:
+    """Table des itinéraires (une ligne par offre) au schéma canonique `itineraries`."""
+    return normalize(ext.itineraries(), "itineraries")
 
+def for_display(df: pd.DataFrame) -> pd.DataFrame:
+    """Colonnes d'affichage dérivées du schéma canonique (dates lisibles, durée en heures)."""
+    df = df.copy()
+    df["date_depart"]    = df["outbound_date"]
+    df["date_str"]       = df["outbound_date"].dt.strftime("%d %b")
+    df["duration_h"]     = (df["duration_min"].astype(float) / 60).round(1)
+    df["nb_escales"]     = df["stops"].fillna(0).astype(int)
+    df["departure_time"] = df["departure_time"].dt.strftime("%Y-%m-%d %H:%M").fillna("")
+    df["arrival_time"]   = df["arrival_time"].dt.strftime("%Y-%m-%d %H:%M").fillna("")
+    return df
+
+def part_path(today: str, date_str: str) -> str:
+    return os.path.join(PARTS_DIR, today, f"{date_str}.csv")
+
+def dates_to_fetch(dates: list, today: str) -> list:
+    """Dates sans résultat enregistré aujourd'hui, ou dont le résultat dépasse FRESHNESS_H."""
+    limit = time.time() - FRESHNESS_H * 3600
+    return [
+        d for d in dates
+        if not os.path.exists(part_path(today, d)) or os.path.getmtime(part_path(today, d)) < limit
+    ]
+
+def save_part(df: pd.DataFrame, today: str, date_str: str):
+    path = part_path(today, date_str)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df.to_csv(path + ".tmp", index=False, encoding="utf-8")
+    os.replace(path + ".tmp", path)
+
+def part_min_price(today: str, key: str):
+    """Prix minimum d'un résultat déjà enregistré (None si aucun vol)."""
+    prices = normalize(pd.read_csv(part_path(today, key)), "itineraries")["price"].dropna()
+    return float(prices.min()) if len(prices) else None
+
+def assemble_parts(dates: list, today: str) -> pd.DataFrame:
+    parts = [pd.read_csv(part_path(today, d)) for d in dates if os.path.exists(part_path(today, d))]
+    parts = [normalize(p, "itineraries") for p in parts if not p.empty]
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
 
 # ============================================================
 # SECTION 1 — Scraping
@@ -102,44 +140,45 @@ def compute_score(df: pd.DataFrame) -> pd.DataFrame:
 st.divider()
 st.header("1️⃣ Collecte des données")
 
-existing = sorted(glob.glob(os.path.join(OUTPUT_DIR, "vols_abj_paris_juillet_*.csv")))
+last_date = store.latest_collection("itineraries", ROUTE)
 
 col_s1, col_s2 = st.columns([2, 1])
 with col_s1:
-    if existing:
-        last_file = existing[-1]
-        last_date = os.path.basename(last_file).split("_")[-1].replace(".csv", "")
-        st.success(f"✅ Dernière collecte : `{last_date}` — `{os.path.basename(last_file)}`")
+    if last_date:
+        st.success(f"✅ Dernière collecte : `{last_date}` — route `{ROUTE}`")
     else:
         st.warning("⚠️ Aucune collecte trouvée. Lance le scraping ci-dessous.")
 
 with col_s2:
     run_scraping = st.button("🔄 Lancer le scraping", type="primary", use_container_width=True)
+    n_dates      = (DATE_FIN - DATE_DEBUT).days + 1
+    budget       = st.number_input(
+        "Budget d'appels API", min_value=2, max_value=n_dates, value=n_dates,
+        help="En dessous du nombre de dates, la fenêtre est échantillonnée puis affinée autour des prix les plus bas.",
+    )
 
 if run_scraping:
-    api_key = os.getenv("SERPAPI_KEY")
-    if not api_key:
-        st.error("❌ Clé SERPAPI_KEY manquante dans le fichier `.env`")
-        st.stop()
-
-    try:
-        from serpapi import GoogleSearch
-    except ImportError:
-        st.error("❌ Package `google-search-results` non installé. Lance : `pip install google-search-results`")
-        st.stop()
+    api_key = require_api_key()
 
     today      = datetime.now().strftime("%Y-%m-%d")
-    out_file   = os.path.join(OUTPUT_DIR, f"vols_abj_paris_juillet_{today}.csv")
-    dates      = list(date_range(DATE_DEBUT, DATE_FIN))
-    all_itin   = []
+    dates      = [dt.strftime("%Y-%m-%d") for dt in date_range(DATE_DEBUT, DATE_FIN)]
+    todo       = dates_to_fetch(dates, today)
+
+    planned    = budget < len(todo)
 
     progress   = st.progress(0, text="Initialisation...")
     status_box = st.empty()
-
-    for i, dt in enumerate(dates):
-        date_str = dt.strftime("%Y-%m-%d")
-        status_box.info(f"🔎 Recherche pour le **{date_str}** ({i+1}/{len(dates)})...")
-
+    if len(todo) < len(dates):
+        st.info(
+            f"♻️ {len(dates) - len(todo)} date(s) déjà collectée(s) aujourd'hui "
+            f"(< {FRESHNESS_H:g} h) — seules **{len(todo)}** date(s) restent à rechercher."
+        )
+    status_box.info(
+        f"🔎 Recherche de **{min(len(todo), budget)} dates** "
+        f"({SERPAPI_MAX_WORKERS} en parallèle, {SERPAPI_RATE_PER_SEC:g} appel(s)/s max)..."
+    )
+
+    def fetch_date(date_str):
         params = {
             "engine":        "google_flights",
             "departure_id":  "ABJ",
@@ -151,40 +190,277 @@ if run_scraping:
             "type":          2,
             "api_key":       api_key,
         }
-
-        try:
-            results = GoogleSearch(params).get_dict()
-            itin    = extract_itineraries(results, date_str)
-            all_itin.extend(itin)
-            status_box.success(f"✅ {date_str} — {len(itin)} itinéraire(s) trouvé(s)")
-        except Exception as e:
-            status_box.warning(f"⚠️ {date_str} — Erreur : {e}")
-
-        progress.progress((i + 1) / len(dates), text=f"{i+1}/{len(dates)} dates traitées")
-        if i < len(dates) - 1:
-            time.sleep(2)
-
-    if all_itin:
-        df_out = pd.DataFrame(all_itin)
-        df_out.to_csv(out_file, index=False, encoding="utf-8")
-        st.success(f"📁 **{len(all_itin)} itinéraires** enregistrés → `{out_file}`")
-        st.rerun()
+        return search(params)
+
+    limiter  = TokenBucket(SERPAPI_RATE_PER_SEC, capacity=SERPAPI_BURST)
+    n_total  = min(len(todo), budget)
+    failed   = []
+    counter  = {"done": 0, "stopped": False}
+
+    def scrape(batch: list) -> dict:
+        """Collecte un lot de dates ; renvoie le prix minimum de chaque date (None si aucun vol, FAILED si erreur)."""
+        min_prices = {}
+        if counter["stopped"]:
+            return min_prices
+        # Les dates arrivent dans l'ordre de fin d'appel, pas dans l'ordre du calendrier.
+        # Chaque date est enregistrée dès réception : une interruption ne perd rien.
+        stream = fetch_concurrently(batch, fetch_date, max_workers=SERPAPI_MAX_WORKERS, limiter=limiter)
+        for date_str, results, err in stream:
+            try:
+                if err is not None:
+                    raise err
+                extractor = FlightExtractor()
+                n_itin = extractor.add(results, outbound_date=date_str)
+                part = format_itineraries(extractor)
+                save_part(part, today, date_str)
+                prices = part["price"].dropna()
+                min_prices[date_str] = float(prices.min()) if len(prices) else None
+                if date_str in failed:
+                    failed.remove(date_str)   # réessayée avec succès par le planificateur
+                status_box.success(f"✅ {date_str} — {n_itin} itinéraire(s) trouvé(s)")
+            except CircuitOpenError as e:
+                status_box.error(f"🛑 Collecte interrompue : {e}")
+                counter["stopped"] = True
+                break
+            except Exception as e:
+                min_prices[date_str] = FAILED   # appel émis, à réessayer
+                if date_str not in failed:
+                    failed.append(date_str)
+                status_box.warning(f"⚠️ {date_str} — Erreur : {e}")
+
+            counter["done"] += 1
+            progress.progress(min(counter["done"] / n_total, 1.0), text=f"{counter['done']}/{n_total} dates traitées")
+        return min_prices
+
+    if not planned:
+        scrape(todo)
+    else:
+        # Budget inférieur au nombre de dates : échantillonnage grossier puis raffinement
+        known = {d: part_min_price(today, d) for d in dates if d not in todo}
+        plan = plan_fare_search(
+            dates,
+            [[(datetime.strptime(d, "%Y-%m-%d") - DATE_DEBUT).days] for d in dates],
+            scrape,
+            budget=int(budget),
+            known=known,
+            batch_size=SERPAPI_MAX_WORKERS,
+        )
+        if plan.best_point is not None:
+            verdict = "optimum probable (hypothèse de régularité)" if plan.converged else f"confiance {plan.confidence:.0%}"
+            st.info(
+                f"🎯 Planificateur : meilleur prix **{plan.best_price:.0f} €** le **{plan.best_point}** "
+                f"— {plan.calls} appel(s) sur {len(todo)} date(s) à rechercher ({verdict}, "
+                f"hypothèse : variation ≤ {plan.lipschitz:.0f} €/jour entre dates voisines)."
+            )
+
+    progress.progress(1.0, text=f"{len(dates) - len(dates_to_fetch(dates, today))}/{len(dates)} dates disponibles")
+    df_out = assemble_parts(dates, today)
+    if not df_out.empty:
+        df_out = df_out.sort_values("outbound_date", kind="stable")
+        out_file = store.append(df_out, "itineraries", ROUTE, today, replace=True)
+        if failed or counter["stopped"]:
+            retry = failed or dates_to_fetch(dates, today)
+            st.warning(f"⚠️ {len(retry)} date(s) en échec, relance le scraping pour les compléter : {', '.join(retry)}")
+        st.success(f"📁 **{len(df_out)} itinéraires** enregistrés → `{out_file}`")
+        if not (failed or counter["stopped"] or planned):
+            st.rerun()
     else:
         st.error("❌ Aucun vol collecté.")
 
 
+# ============================================================
+# SECTION 1 bis — Aller-retour : matrice des dates
+# ============================================================
+st.divider()
+st.header("🔁 Aller-retour — matrice des dates")
+st.caption(
+    "Prix aller-retour minimum pour chaque couple (date aller, date retour). "
+    "Les résultats du jour sont réutilisés, et les cases que l'estimation (variation de prix bornée entre "
+    "dates voisines) juge peu susceptibles de battre le meilleur prix trouvé ne sont pas interrogées."
+)
+
+col_r1, col_r2, col_r3 = st.columns(3)
+fenetre_aller  = col_r1.date_input("Fenêtre aller", AR_ALLER)
+fenetre_retour = col_r2.date_input("Fenêtre retour", AR_RETOUR)
+sejour         = col_r3.slider("Durée du séjour (jours)", 1, 60, (14, 28))
+
+def key_ar(pair: tuple) -> str:
+    return f"{pair[0]}_{pair[1]}"
+
+def label_jour(day: str) -> str:
+    return datetime.strptime(day, "%Y-%m-%d").strftime("%d %b")
+
+if len(fenetre_aller) < 2 or len(fenetre_retour) < 2:
+    st.info("📅 Choisis une date de début et une date de fin pour chaque fenêtre.")
+else:
+    today_ar = datetime.now().strftime("%Y-%m-%d")
+    couples  = pairs(fenetre_aller, fenetre_retour, *sejour)
+    todo_ar  = set(dates_to_fetch([key_ar(c) for c in couples], today_ar))
+    # Couples déjà recherchés aujourd'hui (< FRESHNESS_H) : gratuits pour la matrice
+    known_ar = {c: part_min_price(today_ar, key_ar(c)) for c in couples if key_ar(c) not in todo_ar}
+
+    col_r4, col_r5 = st.columns([1, 2])
+    budget_ar = col_r4.number_input(
+        "Budget d'appels API (aller-retour)", min_value=1, max_value=max(len(couples), 1),
+        value=max(min(len(couples), 40), 1),
+        help=f"{len(couples)} couple(s) admis par les fenêtres et la durée de séjour, "
+             f"dont {len(known_ar)} déjà connu(s) aujourd'hui.",
+    )
+    run_ar = col_r5.button("🔄 Construire la matrice", disabled=not couples, use_container_width=True)
+
+    if run_ar:
+        api_key     = require_api_key()
+        progress_ar = st.progress(0, text="Initialisation...")
+        status_ar   = st.empty()
+        limiter_ar  = TokenBucket(SERPAPI_RATE_PER_SEC, capacity=SERPAPI_BURST)
+        failed_ar   = []
+        counter_ar  = {"done": 0, "stopped": False}
+
+        def fetch_pair(pair):
+            params = {
+                "engine":        "google_flights",
+                "departure_id":  "ABJ",
+                "arrival_id":    "CDG",
+                "outbound_date": pair[0],
+                "return_date":   pair[1],
+                "currency":      "EUR",
+                "hl":            "fr",
+                "gl":            "fr",
+                "type":          1,
+                "api_key":       api_key,
+            }
+            return search(params)
+
+        def scrape_ar(batch: list) -> dict:
+            """Collecte un lot de couples ; renvoie le prix minimum de chacun (None si aucun vol, FAILED si erreur)."""
+            min_prices = {}
+            if counter_ar["stopped"]:
+                return min_prices
+            stream = fetch_concurrently(batch, fetch_pair, max_workers=SERPAPI_MAX_WORKERS, limiter=limiter_ar)
+            for pair, results, err in stream:
+                try:
+                    if err is not None:
+                        raise err
+                    extractor = FlightExtractor()
+                    extractor.add(results, outbound_date=pair[0], return_date=pair[1])
+                    part = format_itineraries(extractor)
+                    save_part(part, today_ar, key_ar(pair))
+                    # Un fichier par couple dans la partition du jour, réécrit si le couple est relancé
+                    store.append(part, "itineraries", ROUTE_AR, today_ar, part_name=key_ar(pair))
+                    prices = part["price"].dropna()
+                    min_prices[pair] = float(prices.min()) if len(prices) else None
+                    if key_ar(pair) in failed_ar:
+                        failed_ar.remove(key_ar(pair))   # réessayé avec succès par le planificateur
+                    status_ar.success(f"✅ {pair[0]} → {pair[1]} — {len(part)} itinéraire(s) trouvé(s)")
+                except CircuitOpenError as e:
+                    status_ar.error(f"🛑 Collecte interrompue : {e}")
+                    counter_ar["stopped"] = True
+                    break
+                except Exception as e:
+                    min_prices[pair] = FAILED   # appel émis, à réessayer
+                    if key_ar(pair) not in failed_ar:
+                        failed_ar.append(key_ar(pair))
+                    status_ar.warning(f"⚠️ {pair[0]} → {pair[1]} — Erreur : {e}")
+
+                counter_ar["done"] += 1
+                progress_ar.progress(min(counter_ar["done"] / budget_ar, 1.0),
+                                     text=f"{counter_ar['done']} couple(s) traité(s)")
+            return min_prices
+
+        matrix = build_date_matrix(
+            fenetre_aller, fenetre_retour, *sejour, scrape_ar,
+            budget=int(budget_ar), known=known_ar, batch_size=SERPAPI_MAX_WORKERS,
+        )
+        progress_ar.progress(1.0, text=f"{matrix.plan.calls} appel(s) pour {len(couples)} couple(s)")
+        if failed_ar:
+            st.warning(f"⚠️ {len(failed_ar)} couple(s) en échec, relance pour les compléter : {', '.join(failed_ar)}")
+    else:
+        # Sans appel : matrice des couples déjà connus aujourd'hui
+        matrix = build_date_matrix(fenetre_aller, fenetre_retour, *sejour, lambda batch: {}, budget=0, known=known_ar)
+
+    if matrix.searched.any():
+        plan = matrix.plan
+        if plan.best_point is not None:
+            aller, retour = plan.best_point
+            duree = (datetime.strptime(retour, "%Y-%m-%d") - datetime.strptime(aller, "%Y-%m-%d")).days
+            verdict = "optimum probable (hypothèse de régularité)" if plan.converged else f"confiance {plan.confidence:.0%}"
+            st.success(
+                f"🏆 Meilleur aller-retour : **{plan.best_price:.0f} €** — aller **{label_jour(aller)}**, "
+                f"retour **{label_jour(retour)}** ({duree} jours) · {verdict}"
+            )
+        st.caption(
+            f"{int(matrix.searched.sum())} case(s) connue(s) sur {int(matrix.valid.sum())} · "
+            f"{int(matrix.skipped.sum())} non interrogée(s) ou en échec (·) · ∅ = aucun vol"
+        )
+        texte = [
+            [
+                f"{p:.0f}€" if not np.isnan(p) else ("∅" if s else ("·" if v else ""))
+                for p, s, v in zip(row_p, row_s, row_v)
+            ]
+            for row_p, row_s, row_v in zip(matrix.prices, matrix.searched, matrix.valid)
+        ]
+        fig_ar = go.Figure(data=go.Heatmap(
+            z=matrix.prices,
+            x=[label_jour(d) for d in matrix.returns],
+            y=[label_jour(d) for d in matrix.outbound],
+            colorscale="RdYlGn_r",
+            text=texte,
+            texttemplate="%{text}",
+            textfont=dict(size=10),
+            hoverongaps=False,
+            colorbar=dict(title="Prix (€)"),
+        ))
+        fig_ar.update_layout(
+            title="Prix aller-retour minimum (€) par date aller × date retour",
+            xaxis_title="Date retour",
+            yaxis_title="Date aller",
+            height=max(300, len(matrix.outbound) * 30 + 120),
+            plot_bgcolor="rgba(0,0,0,0)",
+        )
+        st.plotly_chart(fig_ar, use_container_width=True)
+
+    index_ar = fare_index(ROUTE_AR)
+    index_ar.refresh()
+    connu = index_ar.cheapest_round_trip(fenetre_aller[0], fenetre_aller[1], *sejour)
+    if connu is not None:
+        st.caption(
+            f"📚 Meilleur prix connu dans l'historique (départ dans la fenêtre aller, séjour de "
+            f"{sejour[0]} à {sejour[1]} jours) : **{connu.price:.0f} €** — aller {connu.outbound_date:%d %b}, "
+            f"retour {connu.return_date:%d %b}"
+        )
+
+
 # ============================================================
 # SECTION 2 — Analyse
 # ============================================================
-existing = sorted(glob.glob(os.path.join(OUTPUT_DIR, "vols_abj_paris_juillet_*.csv")))
-if not existing:
+last_date = store.latest_collection("itineraries", ROUTE)
+if not last_date:
     st.info("👆 Lance le scraping pour voir les analyses.")
     st.stop()
 
-df_raw = pd.read_csv(existing[-1])
-df     = compute_score(df_raw)
-df["date_depart"] = pd.to_datetime(df["date_depart"])
-df["date_str"]    = df["date_depart"].dt.strftime("%d %b")
+df_raw = store.read("itineraries", [ROUTE], start=last_date, end=last_date, columns=list(SCHEMAS["itineraries"]))
+df_raw = df_raw.dropna(subset=["price", "duration_min"])
+
+with st.expander("⚖️ Pondération du score"):
+    col_w1, col_w2, col_w3, col_w4, col_w5 = st.columns(5)
+    weights = Weights(
+        price=col_w1.slider("Prix", 0, 100, 60),
+        duration=col_w2.slider("Durée", 0, 100, 40),
+        stops=col_w3.slider("Escales", 0, 100, 0),
+        departure_hour=col_w4.slider("Heure de départ", 0, 100, 0),
+        airline=col_w5.slider("Compagnie", 0, 100, 0),
+    )
+    col_h, col_a = st.columns(2)
+    hours = col_h.slider("Plage de départ souhaitée (h)", 0, 24, (7, 21))
+    preferred = col_a.multiselect("Compagnies préférées", sorted(df_raw["airline"].dropna().unique()))
+if sum(weights) == 0:
+    weights = Weights()
+
+df     = for_display(rank(df_raw, weights, preferred_airlines=preferred, hours=hours))
+# Cube écrit avec la collecte (utils/cube.py) : prix min par date × compagnie sans regroupement des itinéraires
+cube   = combine(store.read("cube", [ROUTE], start=last_date, end=last_date), ["outbound_date", "airline"])
+cube   = cube.dropna(subset=["outbound_date"]).sort_values("outbound_date")
+cube["date_str"] = cube["outbound_date"].dt.strftime("%d %b")
 
 st.divider()
 st.header("2️⃣ Meilleur deal")
@@ -201,13 +477,14 @@ col_b5.metric("🔁 Escales",          int(best["nb_escales"]))
 st.info(
     f"**Vol {best['flight_numbers']}** · "
     f"Départ {best['departure_time']} → Arrivée {best['arrival_time']} ({best['arrival_airport']}) · "
-    f"Score combiné prix+durée : **{best['score_global']}/100** (0 = parfait)"
+    f"Score combiné : **{best['score_global']}/100** (0 = parfait)"
 )
 
 st.divider()
 st.header("3️⃣ Prix vs Durée — trouver le meilleur coin")
 
-st.caption("💡 Le coin **en bas à gauche** = moins cher ET plus rapide. La taille des bulles = nombre d'escales.")
+st.caption("💡 Le coin **en bas à gauche** = moins cher ET plus rapide. La taille des bulles = nombre d'escales. "
+           "La ligne pointillée relie le front de Pareto (aucun vol à la fois moins cher, plus court et avec moins d'escales).")
 
 fig_scatter = px.scatter(
     df,
@@ -248,6 +525,12 @@ fig_scatter.add_annotation(
     showarrow=False,
     font=dict(color="green", size=11),
 )
+# Front de Pareto (prix, durée, escales)
+front = df[df["pareto"]].sort_values("duration_h")
+fig_scatter.add_trace(go.Scatter(
+    x=front["duration_h"], y=front["price"], mode="lines",
+    name="Front de Pareto", line=dict(color="green", dash="dash"),
+))
 st.plotly_chart(fig_scatter, use_container_width=True)
 
 st.divider()
@@ -255,17 +538,12 @@ st.header("4️⃣ Heatmap — Quel jour, quelle compagnie ?")
 
 st.caption("💡 Les cases **vertes foncées** = combinaisons date × compagnie les moins chères.")
 
-# Prix minimum par (date, compagnie)
-heatmap_data = (
-    df.groupby(["date_str", "airline"])["price"]
-    .min()
-    .reset_index()
-    .pivot(index="airline", columns="date_str", values="price")
-)
+# Prix minimum par (date, compagnie), lu dans le cube
+heatmap_data = cube.pivot(index="airline", columns="date_str", values="price_min").astype(float)
 
 # Réordonner les colonnes par date chronologique
-date_order = df.sort_values("date_depart")["date_str"].unique().tolist()
-heatmap_data = heatmap_data.reindex(columns=[d for d in date_order if d in heatmap_data.columns])
+date_order = cube["date_str"].unique().tolist()
+heatmap_data = heatmap_data.reindex(columns=date_order)
 
 fig_heat = go.Figure(data=go.Heatmap(
     z=heatmap_data.values,
@@ -291,12 +569,24 @@ st.plotly_chart(fig_heat, use_container_width=True)
 st.divider()
 st.header("4️⃣ Prix minimum par date")
 
-prix_date = (
-    df.groupby("date_str")["price"]
-    .min()
-    .reset_index()
-    .rename(columns={"price": "prix_min"})
-)
+# Index tarifaire (utils/fare_index.py) : dernier prix connu par date, minimum d'une plage en O(log n)
+index = fare_index(ROUTE)
+index.refresh()
+calendrier = index.calendar(DATE_DEBUT, DATE_FIN)
+prix_date = pd.DataFrame({
+    "date_str": calendrier.index.strftime("%d %b"),
+    "prix_min": calendrier.to_numpy(),
+})
+
+jours = [d.date() for d in calendrier.index]
+if len(jours) > 1:
+    col_p1, col_p2 = st.columns([3, 1])
+    plage = col_p1.select_slider(
+        "Départ entre", options=jours, value=(jours[0], jours[-1]), format_func=lambda d: d.strftime("%d %b"),
+    )
+    moins_cher = index.cheapest(*plage)
+    col_p2.metric("💶 Moins cher sur la plage", f"{moins_cher.price:.0f} €", moins_cher.outbound_date.strftime("%d %b"),
+                  delta_color="off")
 
 fig_prix = px.bar(
     prix_date,
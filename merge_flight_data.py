@@ -1,64 +1,148 @@
 #!/usr/bin/env python3
 """
 merge_flight_data.py
-Fusionne tous les fichiers CSV générés par le script de collecte (output/)
+Fusionne l'historique Paris (CDG) → Abidjan (ABJ) du store (data/store)
 en un seul fichier propre, prêt pour l'analyse ou la dataviz.
+
+Fusion incrémentale : un manifeste (chemin, taille, mtime, hash) mémorise les fichiers
+déjà intégrés et un index des clés de lignes évite les doublons ; seuls les fichiers
+nouveaux ou modifiés sont lus, et leurs lignes inédites ajoutées en fin de CSV.
+Un fichier réécrit (collecte relancée) remplace ses anciennes lignes dans le CSV, de
+même qu'un fichier disparu d'un jour qui a encore des collectes (partition remplacée
+sous un autre nom). Les jours entièrement agrégés par la rétention gardent leurs lignes :
+le CSV fusionné conserve l'historique détaillé. Le CSV n'est réécrit qu'une fois par
+fusion, et seulement si des lignes sont à retirer.
+Un arrêt brutal entre l'écriture du CSV et le manifeste peut laisser des doublons
+(jamais de pertes) : `--compact` les supprime.
+
+  python merge_flight_data.py              # ajoute les nouvelles collectes
+  python merge_flight_data.py --compact    # réécrit le CSV trié et dédoublonné
+  python merge_flight_data.py --rebuild    # repart de zéro
 """
 
 import os
+import argparse
+import numpy as np
 import pandas as pd
-from datetime import datetime
+
+from config.settings import HISTORY_STORE_DIR
+from utils.history_store import HistoryStore, import_legacy_csvs
+from utils.merge_manifest import MergeManifest, row_keys
+from utils.schema import to_text
 
 # --- Configuration ---
-INPUT_DIR = "output"      # Dossier où se trouvent les CSV journaliers
+ROUTE = "CDG-ABJ"
 OUTPUT_DIR = "merged"     # Dossier où sera enregistré le CSV fusionné
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-# --- Lister les fichiers CSV ---
-files = [f for f in os.listdir(INPUT_DIR) if f.endswith(".csv")]
-if not files:
-    raise FileNotFoundError("Aucun fichier CSV trouvé dans le dossier 'output'.")
-
-print(f"🧾 {len(files)} fichiers trouvés :")
-for f in files:
-    print(f"  - {f}")
-
-# --- Charger et fusionner les fichiers ---
-dfs = []
-for f in files:
-    path = os.path.join(INPUT_DIR, f)
-    try:
-        df = pd.read_csv(path)
-        # Extraire la date de collecte à partir du nom du fichier
-        df["date_recolte"] = f.split("_")[-1].replace(".csv", "")
-        dfs.append(df)
-    except Exception as e:
-        print(f"⚠️ Erreur lors de la lecture de {f}: {e}")
-
-if not dfs:
-    raise ValueError("Aucun fichier valide n’a pu être chargé.")
-
-merged_df = pd.concat(dfs, ignore_index=True)
-print(f"✅ {len(merged_df)} lignes fusionnées avec succès.")
-
-# --- Nettoyage minimal ---
-merged_df.drop_duplicates(inplace=True)
-merged_df.dropna(subset=["price"], inplace=True)
-
-# Convertir le prix en numérique
-merged_df["price"] = (
-    merged_df["price"]
-    .astype(str)
-    .str.replace("[^0-9]", "", regex=True)
-    .astype(float)
-)
-
-# Convertir les dates
-merged_df["date_recolte"] = pd.to_datetime(merged_df["date_recolte"], errors="coerce")
-
-# --- Enregistrer le fichier final ---
-today = datetime.now().strftime("%Y-%m-%d")
-output_file = os.path.join(OUTPUT_DIR, f"vols_paris_abidjan_all_{today}.csv")
-merged_df.to_csv(output_file, index=False, encoding="utf-8")
-
-print(f"📁 Fichier fusionné enregistré dans : {output_file}")
+OUTPUT_FILE = os.path.join(OUTPUT_DIR, "vols_paris_abidjan_all.csv")
+MANIFEST_PATH = os.path.join(OUTPUT_DIR, "_manifest.sqlite")
+# Une ligne par itinéraire : un vol avec escale n'est plus compté deux fois
+COLUMNS = [
+    "itinerary_id", "airline", "price", "departure_airport", "arrival_airport", "departure_time",
+    "arrival_time", "duration", "stops", "flight_numbers", "outbound_date", "return_date", "date_recolte",
+]
+
+
+def to_output(part: pd.DataFrame, day: str) -> pd.DataFrame:
+    """Lignes d'un fichier du store au format du CSV fusionné (prix déjà typés à l'écriture)."""
+    df = part.rename(columns={"duration_min": "duration"}).dropna(subset=["price"])
+    df["date_recolte"] = day
+    return to_text(df[COLUMNS].copy())
+
+
+def drop_keys(keys) -> int:
+    """Retire du CSV fusionné les lignes dont la clé est dans `keys` ; renvoie le nombre retiré."""
+    if not len(keys) or not os.path.exists(OUTPUT_FILE):
+        return 0
+    df = pd.read_csv(OUTPUT_FILE, dtype=str, keep_default_na=False)
+    stale = np.isin(row_keys(df), keys)
+    if stale.any():
+        tmp = OUTPUT_FILE + ".tmp"
+        df[~stale].to_csv(tmp, index=False, encoding="utf-8")
+        os.replace(tmp, OUTPUT_FILE)
+    return int(stale.sum())
+
+
+def collection_day(path: str) -> str:
+    """Jour de collecte d'un fichier du store, lu dans le composant `collection_date=...` du chemin."""
+    for part in os.path.normpath(path).split(os.sep):
+        if part.startswith("collection_date="):
+            return part[len("collection_date="):]
+    return ""
+
+
+def merge(store: HistoryStore, manifest: MergeManifest) -> tuple:
+    """Intègre les fichiers nouveaux ou modifiés ; renvoie (fichiers lus, lignes ajoutées)."""
+    files = store.files("itineraries", routes=[ROUTE])
+    by_path = {path: day for _, day, path in files}
+    todo = manifest.changed(by_path)
+    # Fichiers disparus d'un jour toujours collecté : remplacés (collecte relancée)
+    days = set(by_path.values())
+    replaced = [p for p in manifest.paths() if p not in by_path and collection_day(p) in days]
+
+    # Lignes retirées en une seule réécriture du CSV ; un arrêt ici ne perd rien :
+    # les fichiers concernés ne sont pas encore enregistrés et seront relus
+    stale = [manifest.file_keys(p) for p in [*replaced, *(state.path for state in todo)]]
+    removed = drop_keys(np.concatenate(stale) if stale else [])
+    manifest.forget(replaced)
+    if removed:
+        print(f"  - {removed} ligne(s) de collectes remplacées retirée(s)")
+
+    added = 0
+    for state in todo:
+        part = to_output(pd.read_parquet(state.path, engine="pyarrow"), by_path[state.path])
+        fresh = manifest.new_rows(part, replacing=state.path)
+        if not fresh.empty:
+            header = not os.path.exists(OUTPUT_FILE)
+            fresh.to_csv(OUTPUT_FILE, mode="a", header=header, index=False, encoding="utf-8")
+        # Clés et fichier enregistrés ensemble, après l'écriture : un arrêt brutal relira le fichier
+        manifest.record(state, fresh)
+        added += len(fresh)
+        print(f"  + {os.path.relpath(state.path, store.root)} : {len(fresh)}/{len(part)} lignes")
+    return len(todo), added
+
+
+def header_matches() -> bool:
+    with open(OUTPUT_FILE, encoding="utf-8") as fh:
+        return fh.readline().strip() == ",".join(COLUMNS)
+
+
+def compact(manifest: MergeManifest) -> int:
+    """Réécrit le CSV trié par date de collecte, sans doublon, et réaligne l'index des clés."""
+    df = pd.read_csv(OUTPUT_FILE, dtype=str, keep_default_na=False)
+    df = df.drop_duplicates().sort_values(["date_recolte", "outbound_date"], kind="stable")
+    tmp = OUTPUT_FILE + ".tmp"
+    df.to_csv(tmp, index=False, encoding="utf-8")
+    os.replace(tmp, OUTPUT_FILE)
+    manifest.reset_keys(df)
+    return len(df)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fusion incrémentale de l'historique des vols")
+    parser.add_argument("--compact", action="store_true", help="Réécrire le CSV trié et dédoublonné")
+    parser.add_argument("--rebuild", action="store_true", help="Oublier le manifeste et tout refusionner")
+    args = parser.parse_args()
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    # Manifeste et sortie vont ensemble : l'un sans l'autre (ou un ancien format) → reconstruction complète
+    if args.rebuild or not os.path.exists(OUTPUT_FILE) or not header_matches():
+        for path in (OUTPUT_FILE, MANIFEST_PATH):
+            if os.path.exists(path):
+                os.remove(path)
+
+    store = HistoryStore(HISTORY_STORE_DIR)
+    if store.is_empty("itineraries") and store.is_empty("rollups"):
+        import_legacy_csvs(store)
+    if not store.files("itineraries", routes=[ROUTE]):
+        raise FileNotFoundError(f"Aucune collecte {ROUTE} dans '{HISTORY_STORE_DIR}'.")
+
+    manifest = MergeManifest(MANIFEST_PATH)
+    n_files, n_rows = merge(store, manifest)
+    print(f"✅ {n_files} fichier(s) nouveau(x) ou modifié(s), {n_rows} ligne(s) ajoutée(s).")
+
+    if args.compact and os.path.exists(OUTPUT_FILE):
+        print(f"🧹 Compactage : {compact(manifest)} lignes")
+
+    stats = manifest.stats()
+    print(f"📁 Fichier fusionné : {OUTPUT_FILE} ({stats['keys']} lignes uniques, {stats['files']} fichiers suivis)")
+    manifest.close()
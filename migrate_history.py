@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+migrate_history.py
+Importe les anciens CSV journaliers (output/, data/raw/) dans le store Parquet partitionné.
+Réimport idempotent : chaque CSV devient un fichier nommé de sa partition.
+Les anciens fichiers `segments` à plat du store sont scindés en itinéraires + segments,
+et le cube d'agrégats est complété pour les fichiers écrits avant lui.
+
+  python migrate_history.py
+  python migrate_history.py --store data/store --base .
+"""
+
+import argparse
+
+from config.settings import HISTORY_STORE_DIR
+from utils.history_store import HistoryStore, import_legacy_csvs, upgrade_flat_partitions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migration des CSV vers le store Parquet")
+    parser.add_argument("--store", default=HISTORY_STORE_DIR, help="Racine du store")
+    parser.add_argument("--base", default=".", help="Dossier contenant output/ et data/raw/")
+    args = parser.parse_args()
+
+    store = HistoryStore(args.store)
+    upgraded = upgrade_flat_partitions(store)
+    if upgraded:
+        print(f"🔧 {upgraded} fichier(s) à plat scindé(s) en itinéraires + segments")
+    imported = import_legacy_csvs(store, args.base)
+    print(f"✅ {len(imported)} fichier(s) importé(s) dans {args.store}")
+    built = store.build_cubes()
+    if built:
+        print(f"🧊 Cube complété pour {built} fichier(s)")
+    for dataset in ("segments", "itineraries", "cube"):
+        parts = store.partitions(dataset)
+        routes = sorted({route for route, _, _ in parts})
+        print(f"📁 {dataset} : {len(parts)} partition(s) — {', '.join(routes) or 'vide'}")
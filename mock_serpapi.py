@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+mock_serpapi.py
+Serveur local imitant l'endpoint SerpAPI Google Flights (/search.json)
+Réponses synthétiques réalistes (utils/synthetic.py), latence, taux d'erreur
+et taille de réponse configurables. Aucun appel payant.
+
+Lancer avec : python mock_serpapi.py --port 8765 --latency-ms 800 --error-rate 0.05
+Puis        : SERPAPI_BACKEND=http://127.0.0.1:8765 python fetch_flights_generic.py ...
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+from utils.synthetic import make_response
+
+SUPPORTED_HL = {"fr", "en", "es", "de", "it", "pt", "nl"}
+
+
+class MockConfig:
+
+    def __init__(self, latency_ms=600.0, jitter=0.5, error_rate=0.0, throttle_rate=0.0,
+                 n_best=3, n_other=12, vary=False):
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.n_best = n_best
+        self.n_other = n_other
+        self.vary = vary
+        self.lock = threading.Lock()
+        self.counters = {"requests": 0, "ok": 0, "errors": 0, "throttled": 0, "bad_request": 0, "in_flight": 0, "peak_in_flight": 0}
+
+    def count(self, key, delta=1):
+        with self.lock:
+            self.counters[key] += delta
+            if key == "in_flight":
+                self.counters["peak_in_flight"] = max(self.counters["peak_in_flight"], self.counters["in_flight"])
+
+
+def _seed(params: dict) -> int:
+    key = "|".join(params.get(k, "") for k in ("departure_id", "arrival_id", "outbound_date", "return_date"))
+    return zlib.crc32(key.encode("utf-8"))
+
+
+def make_handler(config: MockConfig):
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, payload: dict):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/stats":
+                with config.lock:
+                    return self._send(200, dict(config.counters))
+            if url.path not in ("/search", "/search.json"):
+                return self._send(404, {"error": "Not found"})
+
+            params = dict(parse_qsl(url.query))
+            config.count("requests")
+            config.count("in_flight")
+            try:
+                # Latence log-normale autour de la moyenne demandée
+                if config.latency_ms > 0:
+                    sigma = max(config.jitter, 1e-6)
+                    delay = random.lognormvariate(0, sigma) * config.latency_ms / 1000 / (2.718281828 ** (sigma ** 2 / 2))
+                    time.sleep(delay)
+
+                if params.get("engine") != "google_flights":
+                    config.count("bad_request")
+                    return self._send(400, {"error": "Unsupported engine."})
+                if params.get("hl", "en") not in SUPPORTED_HL:
+                    config.count("bad_request")
+                    return self._send(400, {"error": f"Unsupported `{params.get('hl')}` interface language - hl parameter."})
+                if not params.get("departure_id") or not params.get("outbound_date"):
+                    config.count("bad_request")
+                    return self._send(400, {"error": "Missing `departure_id` or `outbound_date` parameter."})
+
+                roll = random.random()
+                if roll < config.throttle_rate:
+                    config.count("throttled")
+                    return self._send(429, {"error": "Too many requests, please try again later."})
+                if roll < config.throttle_rate + config.error_rate:
+                    config.count("errors")
+                    return self._send(500, {"error": "Internal Server Error. Please try again."})
+
+                response = make_response(
+                    params.get("departure_id", "CDG"),
+                    params.get("arrival_id", "ABJ"),
+                    params["outbound_date"],
+                    n_best=config.n_best,
+                    n_other=config.n_other,
+                    seed=None if config.vary else _seed(params),
+                )
+                response["search_parameters"].update({k: v for k, v in params.items() if k != "api_key"})
+                config.count("ok")
+                return self._send(200, response)
+            finally:
+                config.count("in_flight", -1)
+
+    return Handler
+
+
+def start_mock_server(host: str = "127.0.0.1", port: int = 0, **options):
+    """Démarre le serveur dans un thread ; renvoie (serveur, config, url de base)."""
+    config = MockConfig(**options)
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, config, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serveur SerpAPI Google Flights factice")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=600, help="Latence moyenne")
+    parser.add_argument("--jitter", type=float, default=0.5, help="Dispersion (sigma log-normal)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Part de réponses 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Part de réponses 429")
+    parser.add_argument("--best", type=int, default=3, help="Nombre de best_flights par réponse")
+    parser.add_argument("--other", type=int, default=12, help="Nombre de other_flights par réponse")
+    parser.add_argument("--vary", action="store_true", help="Prix différents à chaque appel")
+    args = parser.parse_args()
+
+    server, config, url = start_mock_server(
+        args.host, args.port,
+        latency_ms=args.latency_ms, jitter=args.jitter, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, n_best=args.best, n_other=args.other, vary=args.vary,
+    )
+    print(f"🧪 SerpAPI factice sur {url} (statistiques : {url}/stats)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
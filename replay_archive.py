@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+replay_archive.py
+Reconstruit un CSV à partir de l'archive brute des réponses SerpAPI (data/archive),
+sans aucun appel API. Utile après l'ajout d'une colonne à l'extraction.
+
+Exemples :
+  python replay_archive.py --out merged/replay_segments.csv
+  python replay_archive.py --route CDG-ABJ --since 2025-12-01 --extractor mon_module:ma_fonction
+"""
+
+import argparse
+import importlib
+import os
+import time
+
+import pandas as pd
+
+from config.settings import SERPAPI_ARCHIVE_DIR
+from utils.extract import FlightExtractor, extract_flights
+from utils.raw_archive import RawArchive
+
+
+SEGMENT_COLUMNS = [
+    "route", "search_date", "outbound_date", "return_date", "airline", "price",
+    "departure_airport", "arrival_airport", "departure_time", "arrival_time",
+    "duration_min", "flight_number",
+]
+
+
+def _context(params: dict, fetched_at: str) -> dict:
+    return {
+        "route": f"{params.get('departure_id')}-{params.get('arrival_id')}",
+        "search_date": fetched_at[:10],
+        "outbound_date": params.get("outbound_date"),
+        "return_date": params.get("return_date"),
+    }
+
+
+class SegmentRows:
+    """
+    Extracteur par défaut : une ligne par segment, comme fetch_flights_generic.py.
+    Toutes les réponses d'un segment d'archive passent dans un seul FlightExtractor,
+    converti en DataFrame une seule fois à la fin.
+    """
+
+    def __init__(self):
+        self._flights = FlightExtractor()
+
+    def add(self, response: dict, params: dict, fetched_at: str):
+        self._flights.add(response, **_context(params, fetched_at))
+
+    def frame(self) -> pd.DataFrame:
+        return self._flights.flat_segments(SEGMENT_COLUMNS)
+
+
+def segment_rows(response: dict, params: dict, fetched_at: str) -> pd.DataFrame:
+    """Même extraction pour une seule réponse (extracteur fonction, ex. tests ou scripts)."""
+    return extract_flights(response, SEGMENT_COLUMNS, **_context(params, fetched_at))
+
+
+def load_extractor(spec: str):
+    module_name, _, func_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Relecture hors-ligne de l'archive SerpAPI")
+    parser.add_argument("--archive", default=SERPAPI_ARCHIVE_DIR, help="Dossier de l'archive")
+    parser.add_argument("--extractor", default="replay_archive:SegmentRows", help="module:fonction ou module:Classe")
+    parser.add_argument("--route", help="Filtrer une route (ex: CDG-ABJ)")
+    parser.add_argument("--since", help="Collectes à partir de YYYY-MM-DD")
+    parser.add_argument("--until", help="Collectes avant YYYY-MM-DD")
+    parser.add_argument("--workers", type=int, default=None, help="Nombre de processus")
+    parser.add_argument("--out", default="merged/replay.csv", help="CSV de sortie")
+    args = parser.parse_args()
+
+    archive = RawArchive(args.archive)
+    print(f"🗃️ Archive : {archive.stats()}")
+
+    start = time.perf_counter()
+    df = archive.replay(
+        load_extractor(args.extractor),
+        workers=args.workers,
+        route=args.route,
+        since=args.since,
+        until=args.until,
+    )
+    elapsed = time.perf_counter() - start
+
+    if df.empty:
+        print("⚠️ Aucune ligne extraite")
+    else:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        df.to_csv(args.out, index=False, encoding="utf-8")
+        print(f"✅ {len(df)} lignes extraites en {elapsed:.2f}s")
+        print(f"📁 Fichier généré : {args.out}")
@@ -6,9 +6,14 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import os
 from datetime import datetime
 
+from config.settings import CHART_DOWNSAMPLE, CHART_MAX_POINTS, DASHBOARD_REFRESH_SECONDS
+from utils.cube import combine
+from utils.downsample import METHODS, downsample
+from utils.export import FORMATS, export
+from utils.shared_history import SharedHistory
+
 # -----------------------------
 # ⚙️ CONFIGURATION DE LA PAGE
 # -----------------------------
@@ -32,43 +37,63 @@ st.markdown(
 # -----------------------------
 # 📂 CHARGEMENT DES DONNÉES
 # -----------------------------
-DATA_DIR = "output"
-
-@st.cache_data
-def load_data():
-    files = sorted([f for f in os.listdir(DATA_DIR) if f.endswith(".csv")])
-    dfs = []
-    for f in files:
-        df = pd.read_csv(os.path.join(DATA_DIR, f))
-        df["date_collecte"] = f.replace(".csv", "").split("_")[-1]
-        df["date_collecte"] = pd.to_datetime(df["date_collecte"], errors="coerce")
-        dfs.append(df)
-
-    data = pd.concat(dfs, ignore_index=True)
-
-    # Nettoyage
-    data["price"] = (
-        data["price"].astype(str)
-        .str.replace("[^0-9]", "", regex=True)
-        .astype(float)
-    )
-    data["duration_hours"] = data["duration"].astype(str).str.extract(r"(\d+)").astype(float)
-    data["airline"] = data["airline"].fillna("Inconnue")
-    return data
-
-data = load_data()
+ROUTE = "CDG-ABJ"
+
+def prepare(cache):
+    # Appelé une fois par nouveau snapshot (pas par session) ; seuls les fichiers nouveaux
+    # du store ont été relus. Une ligne par itinéraire, types déjà normalisés
+    data = cache.frame.rename(columns={"collection_date": "date_collecte", "duration_min": "duration"})
+    data["price"] = data["price"].astype(float)
+    data["duration_hours"] = (data["duration"].astype(float) / 60).round(1)
+    data["airline"] = data["airline"].cat.add_categories(["Inconnue"]).fillna("Inconnue").cat.remove_unused_categories()
+    # Cube maintenu à l'écriture (utils/cube.py), ramené à jour × compagnie : tout l'historique,
+    # jours agrégés par la rétention inclus ; les indicateurs ci-dessous ne touchent plus aux lignes brutes
+    daily = combine(cache.cube, ["collection_date", "airline"]).rename(columns={"collection_date": "date_collecte"})
+    daily["airline"] = daily["airline"].cat.add_categories(["Inconnue"]).fillna("Inconnue")
+    return data, daily
+
+@st.cache_resource
+def shared_history():
+    # Un seul jeu de données pour tout le processus, en lecture seule, remplacé d'un bloc
+    # par le thread de rafraîchissement quand le store change
+    return SharedHistory(ROUTE, prepare=prepare, interval=DASHBOARD_REFRESH_SECONDS).start()
+
+def selection(data, compagnies, columns=None):
+    # Vue sans copie si toutes les compagnies sont retenues ; sinon seules les lignes
+    # (et colonnes) utiles sont extraites
+    rows = data[columns] if columns else data
+    if set(compagnies) >= set(data["airline"].cat.categories):
+        return rows
+    return rows[data["airline"].isin(compagnies)]
+
+snapshot = shared_history().snapshot
+fingerprint = snapshot.fingerprint
+data, daily = snapshot.data, snapshot.daily   # partagés entre sessions : ne pas modifier
 
 # -----------------------------
 # 🧭 BARRE LATÉRALE
 # -----------------------------
 st.sidebar.header("⚙️ Paramètres du tableau de bord")
-compagnies = sorted(data["airline"].unique())
+st.sidebar.caption(
+    f"🔄 Données du {datetime.fromtimestamp(snapshot.loaded_at):%d/%m/%Y %H:%M} · "
+    f"{len(data):,} relevés · vérifiées toutes les {DASHBOARD_REFRESH_SECONDS:.0f}s"
+)
+compagnies = sorted(daily["airline"].unique())
 compagnie_select = st.sidebar.multiselect(
     "✈️ Choisir les compagnies à afficher",
     options=compagnies,
     default=compagnies,
 )
-filtered = data[data["airline"].isin(compagnie_select)]
+max_points = st.sidebar.slider(
+    "📉 Points max par courbe", min_value=100, max_value=5000, value=CHART_MAX_POINTS, step=100,
+    help="Au-delà, les courbes sont réduites côté serveur avant l'envoi au navigateur",
+)
+methode = st.sidebar.radio(
+    "Réduction", METHODS, index=METHODS.index(CHART_DOWNSAMPLE), horizontal=True,
+    help="minmax : garde l'enveloppe min/max · lttb : garde la forme de la courbe",
+)
+daily_filtered = daily[daily["airline"].isin(compagnie_select)]
+par_compagnie = combine(daily_filtered, ["airline"])
 
 # -----------------------------
 # 🏠 EN-TÊTE
@@ -85,10 +110,10 @@ st.markdown(
 # 💡 INDICATEURS CLÉS
 # -----------------------------
 col1, col2, col3, col4 = st.columns(4)
-prix_moyen = filtered["price"].mean()
-prix_min = filtered["price"].min()
-prix_max = filtered["price"].max()
-nb_vols = len(filtered)
+nb_vols = int(daily_filtered["n"].sum())
+prix_moyen = daily_filtered["price_sum"].sum() / nb_vols
+prix_min = daily_filtered["price_min"].min()
+prix_max = daily_filtered["price_max"].max()
 col1.metric("💶 Prix moyen", f"{prix_moyen:,.0f} €")
 col2.metric("📉 Prix minimum", f"{prix_min:,.0f} €")
 col3.metric("📈 Prix maximum", f"{prix_max:,.0f} €")
@@ -98,7 +123,8 @@ col4.metric("🛫 Nombre total de vols", nb_vols)
 # 📅 ANALYSE PAR JOUR
 # -----------------------------
 st.subheader("📊 Analyse des prix par jour de collecte")
-prix_moyen_par_jour = filtered.groupby("date_collecte")["price"].mean().reset_index()
+prix_moyen_par_jour = combine(daily_filtered, ["date_collecte"])[["date_collecte", "price_mean"]]
+prix_moyen_par_jour = prix_moyen_par_jour.rename(columns={"price_mean": "price"})
 jour_le_moins_cher = prix_moyen_par_jour.loc[prix_moyen_par_jour["price"].idxmin(), "date_collecte"]
 jour_le_plus_cher = prix_moyen_par_jour.loc[prix_moyen_par_jour["price"].idxmax(), "date_collecte"]
 st.info(f"✅ Jour avec prix moyen le plus bas : {jour_le_moins_cher.strftime('%A %d %B %Y')}")
@@ -118,16 +144,25 @@ st.plotly_chart(fig_jours, use_container_width=True)
 # -----------------------------
 # 📊 VISUALISATIONS
 # -----------------------------
+# Onglets à la demande : seul l'onglet ouvert est calculé (on_change="rerun"),
+# et ses figures sont mises en cache par état des filtres (snapshot, compagnies, réduction)
 tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
     "📈 Évolution", "📊 Distribution", "⏱️ Durée vs Prix", 
     "📋 Données brutes", "🗺️ Carte", "📉 Tendance par compagnie"
-])
-
-# --- ÉVOLUTION ---
-with tab1:
-    st.subheader("Évolution des prix par compagnie")
+], key="onglet", on_change="rerun")
+compagnies_cle = tuple(sorted(compagnie_select))
+
+@st.cache_data(max_entries=32)
+def figure_evolution(fingerprint, compagnies, max_points, methode, _data):
+    filtered = selection(_data, compagnies, ["date_collecte", "price", "airline"])
+    # Au plus `max_points` points par compagnie envoyés au navigateur
+    evolution, nb_points = downsample(filtered, "date_collecte", "price", max_points, by="airline", method=methode)
+    affiches = evolution["airline"].value_counts()
+    legende = " · ".join(
+        f"**{airline}** : {affiches.get(airline, 0)} pts / {n:,} relevés" for airline, n in nb_points.items()
+    )
     fig1 = px.line(
-        filtered,
+        evolution,
         x="date_collecte",
         y="price",
         color="airline",
@@ -137,26 +172,23 @@ with tab1:
         template="plotly_dark"
     )
     fig1.update_layout(legend_title_text="Compagnie", hovermode="x unified")
-    st.plotly_chart(fig1, use_container_width=True)
+    return fig1, legende
 
-# --- DISTRIBUTION ---
-with tab2:
-    st.subheader("Distribution des prix par compagnie")
-    fig2 = px.box(
-        filtered,
+@st.cache_data(max_entries=32)
+def figure_distribution(fingerprint, compagnies, _data):
+    return px.box(
+        selection(_data, compagnies, ["airline", "price"]),
         x="airline",
         y="price",
         color="airline",
         title="Distribution des prix observés",
         template="plotly_dark"
     )
-    st.plotly_chart(fig2, use_container_width=True)
 
-# --- DURÉE VS PRIX ---
-with tab3:
-    st.subheader("Durée du vol vs Prix")
-    fig3 = px.scatter(
-        filtered,
+@st.cache_data(max_entries=32)
+def figure_duree_prix(fingerprint, compagnies, _data):
+    return px.scatter(
+        selection(_data, compagnies, ["duration_hours", "price", "airline", "departure_time", "arrival_time"]),
         x="duration_hours",
         y="price",
         color="airline",
@@ -166,103 +198,152 @@ with tab3:
         labels={"duration_hours": "Durée (heures)", "price": "Prix (€)"},
         template="plotly_dark"
     )
-    st.plotly_chart(fig3, use_container_width=True)
+
+# --- ÉVOLUTION ---
+if tab1.open:
+    with tab1:
+        st.subheader("Évolution des prix par compagnie")
+        fig1, legende = figure_evolution(fingerprint, compagnies_cle, max_points, methode, data)
+        st.caption(legende)
+        st.plotly_chart(fig1, use_container_width=True)
+
+# --- DISTRIBUTION ---
+if tab2.open:
+    with tab2:
+        st.subheader("Distribution des prix par compagnie")
+        st.plotly_chart(figure_distribution(fingerprint, compagnies_cle, data), use_container_width=True)
+
+# --- DURÉE VS PRIX ---
+if tab3.open:
+    with tab3:
+        st.subheader("Durée du vol vs Prix")
+        st.plotly_chart(figure_duree_prix(fingerprint, compagnies_cle, data), use_container_width=True)
 
 # --- DONNÉES BRUTES ---
-with tab4:
-    st.subheader("🧾 Données brutes filtrées")
-    st.dataframe(filtered.sort_values("date_collecte", ascending=False))
-    st.download_button(
-        "📥 Télécharger les données filtrées (CSV)",
-        data=filtered.to_csv(index=False).encode("utf-8"),
-        file_name=f"flights_filtered_{datetime.now().strftime('%Y-%m-%d')}.csv",
-        mime="text/csv",
+@st.cache_data(max_entries=16)
+def ordre_tri(fingerprint, compagnies, colonne, croissant, _data):
+    # Positions des lignes triées : on ne trie qu'une colonne, pas le tableau entier
+    valeurs = selection(_data, compagnies, [colonne])[colonne].reset_index(drop=True)
+    return valeurs.sort_values(ascending=croissant, kind="stable", na_position="last").index.to_numpy()
+
+@st.fragment
+def donnees_brutes():
+    # Fragment : tri, pagination et choix du format ne relancent que cet onglet
+    filtered = selection(data, compagnie_select)
+    colonnes = list(filtered.columns)
+    c1, c2, c3, c4 = st.columns(4)
+    colonne = c1.selectbox("Trier par", colonnes, index=colonnes.index("date_collecte"))
+    croissant = c2.toggle("Ordre croissant", value=False)
+    taille = c3.selectbox("Lignes par page", [50, 100, 500, 1000], index=1)
+    nb_pages = max(1, -(-len(filtered) // taille))
+    page = c4.number_input(f"Page (sur {nb_pages})", min_value=1, max_value=nb_pages, value=1, step=1)
+
+    # Seule la page affichée est envoyée au navigateur
+    debut = (page - 1) * taille
+    ordre = ordre_tri(fingerprint, compagnies_cle, colonne, croissant, data)
+    st.dataframe(filtered.iloc[ordre[debut:debut + taille]], use_container_width=True)
+    st.caption(f"Lignes {min(debut + 1, len(filtered)):,}–{min(debut + taille, len(filtered)):,} sur {len(filtered):,}")
+
+    f1, f2 = st.columns([1, 3])
+    fmt = f1.selectbox("Format d'export", list(FORMATS), format_func=lambda f: f.upper())
+    mime, extension = FORMATS[fmt]
+    f2.download_button(
+        "📥 Télécharger les données filtrées",
+        # Fichier écrit par morceaux, au clic seulement (pas à chaque rerun)
+        data=lambda: export(selection(data, compagnie_select), fmt),
+        file_name=f"flights_filtered_{datetime.now().strftime('%Y-%m-%d')}{extension}",
+        mime=mime,
     )
 
+if tab4.open:
+    with tab4:
+        st.subheader("🧾 Données brutes filtrées")
+        donnees_brutes()
+
 # --- CARTE ---
-with tab5:
-    st.subheader("Carte interactive : Paris → Abidjan")
-    coords = {"Paris": {"lat": 48.8566, "lon": 2.3522}, "Abidjan": {"lat": 5.35995, "lon": -4.00826}}
-    map_data = pd.DataFrame({
-        "city": ["Paris", "Abidjan"],
-        "lat": [coords["Paris"]["lat"], coords["Abidjan"]["lat"]],
-        "lon": [coords["Paris"]["lon"], coords["Abidjan"]["lon"]],
-        "price": [prix_moyen_par_jour["price"].mean(), prix_moyen_par_jour["price"].mean()]
-    })
-
-    fig_map = px.scatter_geo(
-        map_data,
-        lat="lat",
-        lon="lon",
-        text="city",
-        size="price",
-        size_max=40,
-        color="price",
-        color_continuous_scale="Viridis",
-        projection="natural earth",
-        title="Trajet Paris → Abidjan et prix moyens",
-        template="plotly_dark"
-    )
-    fig_map.add_trace(
-        px.line_geo(
-            lat=[coords["Paris"]["lat"], coords["Abidjan"]["lat"]],
-            lon=[coords["Paris"]["lon"], coords["Abidjan"]["lon"]],
-        ).data[0]
-    )
-    st.plotly_chart(fig_map, use_container_width=True)
+if tab5.open:
+    with tab5:
+        st.subheader("Carte interactive : Paris → Abidjan")
+        coords = {"Paris": {"lat": 48.8566, "lon": 2.3522}, "Abidjan": {"lat": 5.35995, "lon": -4.00826}}
+        map_data = pd.DataFrame({
+            "city": ["Paris", "Abidjan"],
+            "lat": [coords["Paris"]["lat"], coords["Abidjan"]["lat"]],
+            "lon": [coords["Paris"]["lon"], coords["Abidjan"]["lon"]],
+            "price": [prix_moyen_par_jour["price"].mean(), prix_moyen_par_jour["price"].mean()]
+        })
+
+        fig_map = px.scatter_geo(
+            map_data,
+            lat="lat",
+            lon="lon",
+            text="city",
+            size="price",
+            size_max=40,
+            color="price",
+            color_continuous_scale="Viridis",
+            projection="natural earth",
+            title="Trajet Paris → Abidjan et prix moyens",
+            template="plotly_dark"
+        )
+        fig_map.add_trace(
+            px.line_geo(
+                lat=[coords["Paris"]["lat"], coords["Abidjan"]["lat"]],
+                lon=[coords["Paris"]["lon"], coords["Abidjan"]["lon"]],
+            ).data[0]
+        )
+        st.plotly_chart(fig_map, use_container_width=True)
 
 # --- TENDANCE PAR COMPAGNIE ---
-with tab6:
-    st.subheader("📈 Tendance, prix bas et hauts par compagnie")
-
-    # Calcul prix moyens par jour et par compagnie
-    prix_par_jour_compagnie = (
-        filtered.groupby(["airline", "date_collecte"])["price"]
-        .mean()
-        .reset_index()
-        .sort_values(["airline", "date_collecte"])
-    )
-
-    # Calcul des extrêmes
-    extremes = filtered.groupby("airline")["price"].agg(["min", "max", "mean"]).reset_index()
-    extremes.columns = ["Compagnie", "Prix minimum (€)", "Prix maximum (€)", "Prix moyen (€)"]
-
-    # Calcul des tendances (%)
-    def compute_trend(df):
-        if len(df) < 2:
-            return 0
-        return (df["price"].iloc[-1] - df["price"].iloc[0]) / df["price"].iloc[0] * 100
-
-    tendances = prix_par_jour_compagnie.groupby("airline").apply(compute_trend).reset_index(name="Tendance (%)")
-    extremes = extremes.merge(tendances, left_on="Compagnie", right_on="airline", how="left").drop(columns="airline")
-
-    # Tableau des résultats
-    st.dataframe(extremes.sort_values("Prix moyen (€)"), use_container_width=True)
-
-    # Interprétation automatique
-    st.markdown("### 🧭 Interprétation automatique")
-    for _, row in extremes.iterrows():
-        tendance = row["Tendance (%)"]
-        symbole = "📈" if tendance > 0 else ("📉" if tendance < 0 else "⚖️")
-        st.write(
-            f"- **{row['Compagnie']}** : {symbole} tendance de {tendance:+.1f}% | "
-            f"Min : {row['Prix minimum (€)']:.0f} € | Max : {row['Prix maximum (€)']:.0f} € | "
-            f"Moyenne : {row['Prix moyen (€)']:.0f} €"
+if tab6.open:
+    with tab6:
+        st.subheader("📈 Tendance, prix bas et hauts par compagnie")
+
+        # Calcul prix moyens par jour et par compagnie
+        prix_par_jour_compagnie = (
+            daily_filtered.rename(columns={"price_mean": "price"})[["airline", "date_collecte", "price"]]
+            .sort_values(["airline", "date_collecte"])
         )
 
-    # Graphique de tendance
-    fig_tendance = px.line(
-        prix_par_jour_compagnie,
-        x="date_collecte",
-        y="price",
-        color="airline",
-        markers=True,
-        title="Tendance des prix moyens par compagnie",
-        labels={"price": "Prix moyen (€)", "date_collecte": "Date de collecte"},
-        template="plotly_dark"
-    )
-    fig_tendance.update_layout(hovermode="x unified")
-    st.plotly_chart(fig_tendance, use_container_width=True)
+        # Calcul des extrêmes
+        extremes = par_compagnie[["airline", "price_min", "price_max", "price_mean"]].copy()
+        extremes.columns = ["Compagnie", "Prix minimum (€)", "Prix maximum (€)", "Prix moyen (€)"]
+
+        # Calcul des tendances (%)
+        def compute_trend(df):
+            if len(df) < 2:
+                return 0
+            return (df["price"].iloc[-1] - df["price"].iloc[0]) / df["price"].iloc[0] * 100
+
+        tendances = prix_par_jour_compagnie.groupby("airline").apply(compute_trend).reset_index(name="Tendance (%)")
+        extremes = extremes.merge(tendances, left_on="Compagnie", right_on="airline", how="left").drop(columns="airline")
+
+        # Tableau des résultats
+        st.dataframe(extremes.sort_values("Prix moyen (€)"), use_container_width=True)
+
+        # Interprétation automatique
+        st.markdown("### 🧭 Interprétation automatique")
+        for _, row in extremes.iterrows():
+            tendance = row["Tendance (%)"]
+            symbole = "📈" if tendance > 0 else ("📉" if tendance < 0 else "⚖️")
+            st.write(
+                f"- **{row['Compagnie']}** : {symbole} tendance de {tendance:+.1f}% | "
+                f"Min : {row['Prix minimum (€)']:.0f} € | Max : {row['Prix maximum (€)']:.0f} € | "
+                f"Moyenne : {row['Prix moyen (€)']:.0f} €"
+            )
+
+        # Graphique de tendance
+        fig_tendance = px.line(
+            prix_par_jour_compagnie,
+            x="date_collecte",
+            y="price",
+            color="airline",
+            markers=True,
+            title="Tendance des prix moyens par compagnie",
+            labels={"price": "Prix moyen (€)", "date_collecte": "Date de collecte"},
+            template="plotly_dark"
+        )
+        fig_tendance.update_layout(hovermode="x unified")
+        st.plotly_chart(fig_tendance, use_container_width=True)
 
 # -----------------------------
 # 🧠 SYNTHÈSE VISUELLE FINALE
@@ -271,16 +352,16 @@ st.markdown("---")
 st.subheader("🧠 Synthèse finale")
 
 # Compagnie la plus économique
-best_airline = filtered.groupby("airline")["price"].mean().sort_values().index[0]
+best_airline = par_compagnie.sort_values("price_mean")["airline"].iloc[0]
 
 # Jour moyen le plus bas
 jour_le_moins_cher = prix_moyen_par_jour.loc[prix_moyen_par_jour["price"].idxmin(), "date_collecte"]
 
 # Prix le plus bas toutes compagnies confondues
-record_min_row = filtered.loc[filtered["price"].idxmin()]
+record_min_row = daily_filtered.loc[daily_filtered["price_min"].idxmin()]
 record_date = record_min_row["date_collecte"]
 record_airline = record_min_row["airline"]
-record_price = record_min_row["price"]
+record_price = record_min_row["price_min"]
 
 # Colonnes synthèse
 col1, col2, col3 = st.columns(3)
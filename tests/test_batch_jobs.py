@@ -0,0 +1,46 @@
+import types
+
+import pytest
+
+import fetch_flights_generic as collector
+from utils.retry import CircuitOpenError
+from utils.synthetic import make_response
+from utils.extract import FlightExtractor
+
+
+@pytest.fixture
+def batch(tmp_path, monkeypatch):
+    matrix = tmp_path / "jobs.csv"
+    matrix.write_text("departure,arrival,outbound_date,return_date\n"
+                      "CDG,ABJ,2026-07-01;2026-07-02;2026-07-03;2026-07-04,\n", encoding="utf-8")
+    monkeypatch.setattr(collector, "OUTPUT_DIR", str(tmp_path / "raw"))
+    monkeypatch.setattr(collector, "write_partition", lambda flights, job, today: f"{today}/{job.job_id}")
+    calls = []
+
+    def collect(job, today):
+        calls.append((job.outbound_date, today))
+        if len(calls) == 3 and today == "2026-06-01":
+            raise CircuitOpenError(60)   # interruption du lot
+        flights = FlightExtractor()
+        flights.add(make_response("CDG", "ABJ", job.outbound_date, seed=1))
+        return {}, flights
+
+    monkeypatch.setattr(collector, "collect", collect)
+    args = types.SimpleNamespace(batch=str(matrix), checkpoint=None, workers=1, rate=1000.0)
+    return args, calls
+
+
+def test_batch_resumes_after_midnight(batch):
+    args, calls = batch
+    collector.run_batch(args, "2026-06-01")
+    collector.run_batch(args, "2026-06-02")
+    # Seuls le job interrompu et le job restant sont refaits
+    assert [day for _, day in calls].count("2026-06-02") == 2
+
+
+def test_finished_batch_starts_a_new_collection(batch):
+    args, calls = batch
+    collector.run_batch(args, "2026-06-01")
+    collector.run_batch(args, "2026-06-01")
+    collector.run_batch(args, "2026-06-02")
+    assert [day for _, day in calls].count("2026-06-02") == 4
@@ -0,0 +1,48 @@
+from utils.extract import FlightExtractor
+from utils.fare_db import FareDB
+from utils.history_store import HistoryStore
+from utils.synthetic import make_response
+
+
+def collect(seed, duration=None):
+    response = make_response("ABJ", "CDG", "2026-07-01", seed=seed)
+    if duration is not None:
+        for group in response["best_flights"] + response["other_flights"]:
+            for flight in group["flights"]:
+                flight["duration"] = duration
+    ext = FlightExtractor()
+    ext.add(response, outbound_date="2026-07-01")
+    return ext
+
+
+def test_sync_of_a_route_keeps_routes_sharing_its_prefix(tmp_path):
+    store = HistoryStore(str(tmp_path / "store"))
+    db = FareDB(str(tmp_path / "fares.sqlite"))
+    for route in ("ABJ-CDG", "ABJ-CDG-ABJ"):
+        ext = collect(1)
+        store.append_flights(ext.itineraries(), ext.segments(), route, "2026-06-01")
+    db.sync(store)
+    round_trips = len(db.snapshots("ABJ-CDG-ABJ"))
+    assert round_trips > 0
+
+    ext = collect(2)
+    store.append_flights(ext.itineraries(), ext.segments(), "ABJ-CDG", "2026-06-01", replace=True)
+    db.sync(store, ["ABJ-CDG"])
+    assert len(db.snapshots("ABJ-CDG-ABJ")) == round_trips
+    assert len(db.snapshots("ABJ-CDG")) == len(ext.itineraries())
+
+
+def test_segments_come_from_the_requested_collection_day(tmp_path):
+    store = HistoryStore(str(tmp_path / "store"))
+    db = FareDB(str(tmp_path / "fares.sqlite"))
+    for day, duration in (("2026-06-01", 300), ("2026-06-02", 310)):
+        ext = collect(1, duration)
+        store.append_flights(ext.itineraries(), ext.segments(), "ABJ-CDG", day)
+    db.sync(store)
+    ids = db.snapshots("ABJ-CDG")["itinerary_id"].unique()[:3]
+
+    first = db.segments("ABJ-CDG", ids, "2026-06-01")
+    latest = db.segments("ABJ-CDG", ids)
+    assert set(first["duration_min"]) == {300}
+    assert set(latest["duration_min"]) == {310}
+    assert not first.duplicated(["itinerary_id", "seq"]).any()
@@ -0,0 +1,104 @@
+import numpy as np
+
+from utils.fare_index import RangeMin
+
+
+def test_range_min_matches_brute_force():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        n, m = rng.integers(1, 20), rng.integers(1, 9)
+        values = rng.integers(0, 50, (n, m)).astype(float)
+        values[rng.random((n, m)) < 0.3] = np.inf   # cases vides
+        tree = RangeMin(values)
+        for _ in range(5):
+            i, j, v = rng.integers(0, n), rng.integers(0, m), float(rng.integers(0, 50))
+            values[i, j] = v
+            tree.update(i, j, v)
+        assert np.array_equal(tree.leaves(), values)
+
+        for _ in range(10):
+            r0, r1 = sorted(rng.integers(0, n, 2))
+            c0, c1 = sorted(rng.integers(0, m, 2))
+            block = values[r0:r1 + 1, c0:c1 + 1]
+            assert tree.query((r0, r1), (c0, c1)) == block.min()
+            hit = tree.argmin((r0, r1), (c0, c1))
+            if np.isinf(block.min()):
+                assert hit is None
+            else:
+                price, i, j = hit
+                assert price == block.min() and values[i, j] == price
+                assert r0 <= i <= r1 and c0 <= j <= c1
+
+
+def test_range_min_1d():
+    values = np.array([5.0, 3.0, np.inf, 3.0, 8.0])
+    tree = RangeMin(values)
+    assert tree.query((0, 4)) == 3.0
+    assert tree.query((2, 2)) == np.inf
+    tree.update(4, 0, 1.0)
+    assert tree.argmin((3, 4))[:2] == (1.0, 4)
+
+
+def brute_force(store, route):
+    """Par case : prix minimum de la collecte la plus récente qui la couvre."""
+    import pandas as pd
+
+    frames = [
+        pd.read_parquet(path).assign(day=day)
+        for _, day, path in store.files("itineraries", [route])
+    ]
+    if not frames:
+        return {}, {}
+    rows = pd.concat(frames, ignore_index=True).dropna(subset=["price"])
+    rows["stay"] = (rows["return_date"] - rows["outbound_date"]).dt.days
+
+    def latest(group):
+        return float(group[group["day"] == group["day"].max()]["price"].min())
+
+    calendar = {_key(d): p for d, p in rows.groupby("outbound_date").apply(latest).items()}
+    trips = rows.dropna(subset=["stay"])
+    stays = {(_key(d), int(s)): p for (d, s), p in trips.groupby(["outbound_date", "stay"]).apply(latest).items()}
+    return calendar, stays
+
+
+def _key(day) -> int:
+    return int(np.datetime64(day, "D").astype(np.int64))
+
+
+def test_incremental_refresh_matches_a_full_recomputation(tmp_path):
+    import pandas as pd
+
+    from utils.fare_index import FareIndex
+    from utils.history_store import HistoryStore
+
+    rng = np.random.default_rng(0)
+    store = HistoryStore(str(tmp_path / "store"))
+    index = FareIndex("ABJ-CDG-ABJ", store)
+
+    def collection(n):
+        outbound = pd.Timestamp("2026-07-01") + pd.to_timedelta(rng.integers(0, 20, n), "D")
+        returns = pd.Series(outbound + pd.to_timedelta(rng.integers(3, 15, n), "D"))
+        returns[rng.random(n) < 0.2] = pd.NaT
+        return pd.DataFrame({"outbound_date": outbound, "return_date": returns,
+                             "price": rng.integers(300, 900, n), "airline": "X"})
+
+    days = [f"2026-06-{d:02d}" for d in range(1, 8)]
+    for step in range(25):
+        action = rng.random()
+        day = days[rng.integers(0, len(days))]
+        if action < 0.6:
+            store.append(collection(int(rng.integers(5, 40))), "itineraries", "ABJ-CDG-ABJ", day,
+                         part_name=str(rng.integers(0, 3)))
+        elif action < 0.8:
+            store.append(collection(10), "itineraries", "ABJ-CDG-ABJ", day, replace=True)
+        else:
+            store.drop("itineraries", "ABJ-CDG-ABJ", day)
+        index.refresh()
+
+        calendar, stays = brute_force(store, "ABJ-CDG-ABJ")
+        assert index._calendar == calendar
+        assert index._stays == stays
+        best = index.cheapest()
+        assert (best is None and not calendar) or best.price == min(calendar.values())
+        trip = index.cheapest_round_trip()
+        assert (trip is None and not stays) or trip.price == min(stays.values())
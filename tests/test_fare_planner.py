@@ -0,0 +1,83 @@
+import numpy as np
+
+from utils.fare_planner import FAILED, plan_fare_search
+
+POINTS = list(range(40))
+COORDS = [[p] for p in POINTS]
+PRICES = 600 + 8 * np.abs(np.arange(40) - 29)   # minimum 600 € au point 29
+
+
+def fetch(prices):
+    def run(batch):
+        return {p: float(prices[p]) for p in batch}
+    return run
+
+
+def test_failures_are_not_no_flight_and_the_budget_is_spent():
+    calls = []
+
+    def always_fails(batch):
+        calls.extend(batch)
+        return {p: FAILED for p in batch}
+
+    plan = plan_fare_search(POINTS, COORDS, always_fails, budget=20, batch_size=4)
+    assert plan.calls == len(calls) == 20
+    assert plan.best_point is None
+    assert plan.prices == {}   # rien n'est marqué « sans vol »
+
+
+def test_failed_points_are_retried():
+    attempts = {}
+
+    def fails_once(batch):
+        out = {}
+        for p in batch:
+            attempts[p] = attempts.get(p, 0) + 1
+            out[p] = float(PRICES[p]) if attempts[p] > 1 else FAILED
+        return out
+
+    plan = plan_fare_search(POINTS, COORDS, fails_once, budget=80, batch_size=4)
+    assert plan.best_price == PRICES.min()
+    assert all(price is not None for price in plan.prices.values())
+
+
+def test_sampling_continues_while_nothing_is_known():
+    def no_flight_on_the_left(batch):
+        return {p: (None if p < 25 else float(PRICES[p])) for p in batch}
+
+    plan = plan_fare_search(POINTS, COORDS, no_flight_on_the_left, budget=20, batch_size=4,
+                            known={p: None for p in range(0, 10)})
+    assert plan.best_price == PRICES.min()
+
+
+def test_larger_budget_never_finds_a_worse_fare():
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        prices = rng.integers(300, 900) + np.cumsum(rng.integers(-40, 41, 40))
+        best = [
+            plan_fare_search(POINTS, COORDS, fetch(prices), budget=b, batch_size=4).best_price
+            for b in range(4, 41, 3)
+        ]
+        assert all(later <= earlier for earlier, later in zip(best, best[1:]))
+
+
+def test_full_budget_finds_the_minimum():
+    rng = np.random.default_rng(1)
+    prices = rng.integers(300, 900, 40)
+    plan = plan_fare_search(POINTS, COORDS, fetch(prices), budget=40, batch_size=4)
+    assert plan.best_price == prices.min()
+
+
+def test_only_real_fetches_are_counted():
+    calls = []
+
+    def stops_after_two_batches(batch):
+        if len(calls) >= 8:
+            return {}   # disjoncteur ouvert : plus aucun appel émis
+        calls.extend(batch)
+        return {p: float(PRICES[p]) for p in batch}
+
+    plan = plan_fare_search(POINTS, COORDS, stops_after_two_batches, budget=30, batch_size=4)
+    assert plan.calls == len(calls) == 8
+    assert not plan.converged
+    assert len(plan.prices) == 8
@@ -0,0 +1,98 @@
+import pandas as pd
+import pytest
+
+import merge_flight_data as mfd
+from utils.extract import FlightExtractor
+from utils.history_store import HistoryStore
+from utils.merge_manifest import MergeManifest
+from utils.synthetic import make_response
+
+
+def itineraries(seed: int, n_other: int = 6) -> pd.DataFrame:
+    ext = FlightExtractor()
+    ext.add(make_response("CDG", "ABJ", "2025-12-23", n_best=2, n_other=n_other, seed=seed),
+            outbound_date="2025-12-23", return_date="2026-01-10")
+    return ext.itineraries()
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    monkeypatch.setattr(mfd, "OUTPUT_FILE", str(tmp_path / "merged.csv"))
+    store = HistoryStore(str(tmp_path / "store"))
+    manifest = MergeManifest(str(tmp_path / "manifest.sqlite"))
+    yield store, manifest
+    manifest.close()
+
+
+def merged() -> pd.DataFrame:
+    return pd.read_csv(mfd.OUTPUT_FILE, dtype=str, keep_default_na=False)
+
+
+def test_new_rows_is_a_pure_lookup(env):
+    _, manifest = env
+    part = mfd.to_output(itineraries(1), "2025-12-01")
+    assert len(manifest.new_rows(part)) == len(part)
+    assert len(manifest.new_rows(part)) == len(part)
+    assert manifest.stats()["keys"] == 0
+
+
+def test_crash_before_csv_write_loses_nothing(env, monkeypatch):
+    store, manifest = env
+    expected = itineraries(1)
+    store.append(expected, "itineraries", mfd.ROUTE, "2025-12-01", part_name="a")
+
+    def crash(*args, **kwargs):
+        raise OSError("disque plein")
+
+    with monkeypatch.context() as m:
+        m.setattr(pd.DataFrame, "to_csv", crash)
+        with pytest.raises(OSError):
+            mfd.merge(store, manifest)
+
+    assert mfd.merge(store, manifest) == (1, len(expected))
+    assert len(merged()) == len(expected)
+    assert mfd.merge(store, manifest) == (0, 0)
+
+
+def test_rewritten_file_replaces_its_rows(env):
+    store, manifest = env
+    store.append(itineraries(1), "itineraries", mfd.ROUTE, "2025-12-01", part_name="a")
+    store.append(itineraries(2), "itineraries", mfd.ROUTE, "2025-12-01", part_name="b")
+    mfd.merge(store, manifest)
+
+    rewritten = itineraries(3, n_other=3)
+    store.append(rewritten, "itineraries", mfd.ROUTE, "2025-12-01", part_name="a")
+    mfd.merge(store, manifest)
+
+    out = merged()
+    assert len(out) == len(itineraries(2)) + len(rewritten)
+    assert set(out["flight_numbers"]) == set(itineraries(2)["flight_numbers"]) | set(rewritten["flight_numbers"])
+
+
+def test_rerun_of_the_same_day_replaces_its_rows(env):
+    store, manifest = env
+    store.append(itineraries(1), "itineraries", mfd.ROUTE, "2025-12-01")
+    store.append(itineraries(2), "itineraries", mfd.ROUTE, "2025-12-02")
+    mfd.merge(store, manifest)
+
+    # Collecte relancée : partition vidée, nouveau nom de fichier
+    rerun = itineraries(3, n_other=3)
+    store.append(rerun, "itineraries", mfd.ROUTE, "2025-12-01", replace=True)
+    mfd.merge(store, manifest)
+
+    out = merged()
+    assert len(out) == len(itineraries(2)) + len(rerun)
+    assert set(out.loc[out["date_recolte"] == "2025-12-01", "flight_numbers"]) == set(rerun["flight_numbers"])
+    assert manifest.stats()["files"] == 2
+    assert mfd.merge(store, manifest) == (0, 0)
+
+
+def test_days_removed_by_retention_keep_their_rows(env):
+    store, manifest = env
+    store.append(itineraries(1), "itineraries", mfd.ROUTE, "2025-12-01")
+    store.append(itineraries(2), "itineraries", mfd.ROUTE, "2025-12-02")
+    mfd.merge(store, manifest)
+
+    store.drop("itineraries", mfd.ROUTE, "2025-12-01")
+    mfd.merge(store, manifest)
+    assert len(merged()) == len(itineraries(1)) + len(itineraries(2))
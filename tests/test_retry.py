@@ -0,0 +1,71 @@
+import pytest
+
+from utils.retry import CircuitBreaker, CircuitOpenError, SerpApiError, call_with_retry
+
+
+def failing(message, retryable):
+    def fn():
+        raise SerpApiError(message, retryable)
+    return fn
+
+
+def test_breaker_counts_one_failure_per_exhausted_call():
+    breaker = CircuitBreaker(threshold=3, cooldown=60)
+    for _ in range(2):
+        with pytest.raises(SerpApiError):
+            call_with_retry(failing("timeout", True), max_retries=3, breaker=breaker, sleep=lambda s: None)
+    # 2 appels × 4 tentatives : le disjoncteur n'a vu que 2 échecs
+    assert breaker._failures == 2
+    assert breaker.state == "closed"
+
+    with pytest.raises(SerpApiError):
+        call_with_retry(failing("timeout", True), max_retries=3, breaker=breaker, sleep=lambda s: None)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        call_with_retry(lambda: {}, breaker=breaker)
+
+
+def test_fatal_errors_do_not_trip_the_breaker():
+    breaker = CircuitBreaker(threshold=2, cooldown=60)
+    for _ in range(5):
+        with pytest.raises(SerpApiError):
+            call_with_retry(failing("Invalid API key", False), breaker=breaker, sleep=lambda s: None)
+    assert breaker._failures == 0
+    assert breaker.state == "closed"
+
+
+def test_recovered_call_resets_the_count():
+    breaker = CircuitBreaker(threshold=2, cooldown=60)
+    with pytest.raises(SerpApiError):
+        call_with_retry(failing("timeout", True), max_retries=1, breaker=breaker, sleep=lambda s: None)
+    attempts = iter([SerpApiError("timeout", True), None])
+
+    def flaky():
+        error = next(attempts)
+        if error:
+            raise error
+        return {"ok": True}
+
+    assert call_with_retry(flaky, max_retries=1, breaker=breaker, sleep=lambda s: None) == {"ok": True}
+    assert breaker._failures == 0
+
+
+def test_half_open_trial_can_retry_and_is_released_by_a_fatal_error():
+    breaker = CircuitBreaker(threshold=1, cooldown=0)
+    with pytest.raises(SerpApiError):
+        call_with_retry(failing("timeout", True), max_retries=0, breaker=breaker, sleep=lambda s: None)
+    assert breaker.state == "half-open"
+
+    # L'appel d'essai peut réessayer sans être bloqué par son propre essai
+    attempts = iter([SerpApiError("timeout", True), None])
+
+    def flaky():
+        error = next(attempts)
+        if error:
+            raise error
+        return {}
+
+    with pytest.raises(SerpApiError):
+        call_with_retry(failing("Invalid API key", False), breaker=breaker, sleep=lambda s: None)
+    assert call_with_retry(flaky, max_retries=1, breaker=breaker, sleep=lambda s: None) == {}
+    assert breaker.state == "closed"
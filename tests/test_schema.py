@@ -0,0 +1,77 @@
+import pandas as pd
+
+from utils.extract import FlightExtractor
+from utils.schema import itinerary_ids, normalize
+
+
+def offer(price, number="AF 703", time="2026-07-01 10:00"):
+    return {
+        "price": price,
+        "total_duration": 400,
+        "flights": [{
+            "airline": "Air France",
+            "flight_number": number,
+            "duration": 400,
+            "departure_airport": {"id": "ABJ", "time": time},
+            "arrival_airport": {"id": "CDG", "time": "2026-07-01 17:40"},
+        }],
+    }
+
+
+def test_same_flights_in_one_response_get_distinct_ids():
+    ext = FlightExtractor()
+    ext.add({"best_flights": [offer(600)], "other_flights": [offer(750), offer(640, "AF 705")]})
+    ids = ext.itineraries()["itinerary_id"]
+    assert ids.is_unique
+    # Les segments restent rattachés à leur offre
+    assert set(ext.segments()["itinerary_id"]) == set(ids)
+
+
+def test_ids_are_stable_across_collections():
+    first, second = FlightExtractor(), FlightExtractor()
+    first.add({"best_flights": [offer(600)], "other_flights": [offer(750)]}, fetched_at="J1")
+    second.add({"best_flights": [offer(580)], "other_flights": [offer(760)]}, fetched_at="J2")
+    assert list(first.itineraries()["itinerary_id"]) == list(second.itineraries()["itinerary_id"])
+
+    both = FlightExtractor()
+    both.add({"best_flights": [offer(600)]}, fetched_at="J1")
+    both.add({"best_flights": [offer(580)]}, fetched_at="J2")
+    assert both.itineraries()["itinerary_id"].nunique() == 1
+
+
+def test_first_offer_keeps_the_unranked_id():
+    dep = pd.Series(["2026-07-01 10:00"], dtype=object)
+    numbers = pd.Series(["AF 703"], dtype=object)
+    ext = FlightExtractor()
+    ext.add({"best_flights": [offer(600)]})
+    assert ext.itineraries()["itinerary_id"].iloc[0] == itinerary_ids(dep, numbers).iloc[0]
+
+
+def test_legacy_rows_are_ranked_per_date_pair():
+    legacy = pd.DataFrame({
+        "outbound_date": ["2026-07-01"] * 3,
+        "return_date": ["2026-07-15", "2026-07-15", "2026-07-20"],
+        "price": [900, 950, 910],
+        "departure_time": ["2026-07-01 10:00"] * 3,
+        "flight_numbers": ["AF 703"] * 3,
+    })
+    ids = normalize(legacy, "itineraries")["itinerary_id"]
+    assert ids.is_unique
+
+
+def test_return_date_is_part_of_the_id():
+    ids = []
+    for return_date in ("2026-07-15", "2026-07-20", None):
+        ext = FlightExtractor()
+        ext.add({"best_flights": [offer(600)]}, outbound_date="2026-07-01", return_date=return_date)
+        ids.append(ext.itineraries()["itinerary_id"].iloc[0])
+    assert len(set(ids)) == 3
+    # Aller simple : id calculé sur l'horaire et les vols seuls
+    assert ids[2] == itinerary_ids(pd.Series(["2026-07-01 10:00"]), pd.Series(["AF 703"])).iloc[0]
+
+    # Même id, que la date retour soit du texte (extracteur) ou une date (schéma normalisé)
+    legacy = pd.DataFrame({
+        "outbound_date": ["2026-07-01"], "return_date": ["2026-07-15"], "price": [600],
+        "departure_time": ["2026-07-01 10:00"], "flight_numbers": ["AF 703"],
+    })
+    assert normalize(legacy, "itineraries")["itinerary_id"].iloc[0] == ids[0]
@@ -0,0 +1,23 @@
+import numpy as np
+
+from utils.scoring import pareto_front
+
+
+def brute_front(*criteria):
+    points = np.column_stack(criteria)
+    return np.array([
+        not any(np.all(other <= p) and np.any(other < p) for other in points)
+        for p in points
+    ], dtype=bool)
+
+
+def test_pareto_front_matches_brute_force():
+    rng = np.random.default_rng(0)
+    for _ in range(300):
+        n = int(rng.integers(0, 40))
+        # Petites plages de valeurs : beaucoup d'égalités
+        price = rng.integers(300, 310, n)
+        duration = rng.integers(400, 406, n)
+        stops = rng.integers(0, 3, n)
+        assert np.array_equal(pareto_front(price, duration), brute_front(price, duration))
+        assert np.array_equal(pareto_front(price, duration, stops), brute_front(price, duration, stops))
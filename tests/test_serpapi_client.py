@@ -0,0 +1,50 @@
+import sys
+import types
+
+import pytest
+
+import utils.serpapi_client as client
+from utils.raw_archive import RawArchive
+from utils.response_cache import ResponseCache
+from utils.synthetic import make_response
+
+PARAMS = {
+    "engine": "google_flights", "departure_id": "CDG", "arrival_id": "ABJ",
+    "outbound_date": "2025-12-23", "currency": "EUR", "hl": "fr", "type": 2, "api_key": "x",
+}
+
+
+@pytest.fixture
+def fake_serpapi(tmp_path, monkeypatch):
+    """Faux package `serpapi` qui, comme le vrai, ajoute `source` au dict reçu."""
+    calls = []
+
+    class GoogleSearch:
+        def __init__(self, params):
+            params["source"] = "python"
+            self.params = params
+
+        def get_dict(self):
+            calls.append(dict(self.params))
+            return make_response(self.params["departure_id"], self.params["arrival_id"],
+                                 self.params["outbound_date"], seed=1)
+
+    monkeypatch.setitem(sys.modules, "serpapi", types.SimpleNamespace(GoogleSearch=GoogleSearch))
+    monkeypatch.setattr(client, "_cache", ResponseCache(str(tmp_path / "cache.sqlite")))
+    monkeypatch.setattr(client, "_archive", RawArchive(str(tmp_path / "archive")))
+    monkeypatch.setattr(client, "SERPAPI_ARCHIVE_ENABLED", True)
+    return calls
+
+
+def test_second_identical_search_is_a_cache_hit(fake_serpapi):
+    params = dict(PARAMS)
+    first = client.search(params)
+    second = client.search(dict(PARAMS))
+    assert len(fake_serpapi) == 1
+    assert second == first
+    assert params == PARAMS   # le dict de l'appelant n'est pas modifié
+
+
+def test_archive_key_matches_the_request(fake_serpapi):
+    client.search(dict(PARAMS))
+    assert len(client.get_archive().history(dict(PARAMS))) == 1
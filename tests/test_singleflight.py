@@ -0,0 +1,94 @@
+import threading
+
+import pytest
+
+from utils import singleflight
+from utils.singleflight import SharedCallError, SingleFlight
+
+
+class Aborted(BaseException):
+    """Comme l'arrêt d'un script Streamlit : n'hérite pas d'Exception."""
+
+
+@pytest.fixture
+def waiting(monkeypatch):
+    """Event positionné dès qu'un appelant attend l'appel en cours (sans attente active)."""
+    waiting = threading.Event()
+
+    class Done(threading.Event):
+        def wait(self, timeout=None):
+            waiting.set()
+            return super().wait(timeout)
+
+    init = singleflight._Call.__init__
+
+    def patched(self):
+        init(self)
+        self.done = Done()
+
+    monkeypatch.setattr(singleflight._Call, "__init__", patched)
+    return waiting
+
+
+def lead_then_follow(group, leader_fn, follower_fn, waiting):
+    """Lance l'appel meneur, attend qu'un second appelant le rejoigne, puis libère le meneur."""
+    started, release = threading.Event(), threading.Event()
+    outcomes = {}
+
+    def leader():
+        started.set()
+        release.wait()
+        return leader_fn()
+
+    def run(name, fn):
+        try:
+            outcomes[name] = group.do("k", fn)
+        except BaseException as e:
+            outcomes[name] = e
+
+    first = threading.Thread(target=run, args=("leader", leader))
+    first.start()
+    started.wait()
+    second = threading.Thread(target=run, args=("follower", follower_fn))
+    second.start()
+    assert waiting.wait(5)
+    release.set()
+    first.join(5)
+    second.join(5)
+    return outcomes
+
+
+def test_followers_retry_when_the_leader_is_aborted(waiting):
+    group = SingleFlight()
+
+    def abort():
+        raise Aborted()
+
+    outcomes = lead_then_follow(group, abort, lambda: "frais", waiting)
+    assert isinstance(outcomes["leader"], Aborted)
+    assert outcomes["follower"] == "frais"
+    assert group.in_flight() == 0
+    # Chaque appelant compté une fois : deux appels émis, aucun regroupé
+    assert (group.stats()["issued"], group.stats()["coalesced"]) == (2, 0)
+
+
+def test_followers_get_their_own_exception(waiting):
+    group = SingleFlight()
+    error = ValueError("boom")
+
+    def fail():
+        raise error
+
+    outcomes = lead_then_follow(group, fail, lambda: "jamais", waiting)
+    assert outcomes["leader"] is error
+    shared = outcomes["follower"]
+    assert isinstance(shared, SharedCallError)
+    assert shared.__cause__ is error and str(shared) == "boom"
+    assert (group.stats()["issued"], group.stats()["coalesced"], group.stats()["failed"]) == (1, 1, 1)
+
+
+def test_followers_share_the_result(waiting):
+    group = SingleFlight()
+    result = {"prix": 600}
+    outcomes = lead_then_follow(group, lambda: result, lambda: "jamais", waiting)
+    assert outcomes["leader"] is result and outcomes["follower"] is result
@@ -0,0 +1,27 @@
+import pandas as pd
+
+from utils.extract import FlightExtractor
+from utils.fare_db import SnapshotCache
+from utils.history_store import HistoryStore, import_legacy_csvs
+from utils.synthetic import make_response
+
+
+def test_refresh_does_not_reimport_legacy_files(tmp_path, monkeypatch):
+    """Store ne contenant que des `itineraries` (anciens CSV de meilleur_vol) : l'empreinte reste stable."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "output").mkdir()
+    ext = FlightExtractor()
+    ext.add(make_response("ABJ", "CDG", "2026-07-01", seed=1), outbound_date="2026-07-01")
+    ext.itineraries().to_csv(tmp_path / "output" / "vols_abj_paris_juillet_2026-06-01.csv", index=False)
+
+    store = HistoryStore(str(tmp_path / "store"))
+    cache = SnapshotCache("ABJ-CDG", str(tmp_path / "store"), str(tmp_path / "fares.sqlite"))
+    fingerprints, reads = [], []
+    for _ in range(3):
+        fingerprint = store.fingerprint(routes=["ABJ-CDG"])
+        fingerprints.append(fingerprint)
+        reads.append(cache.refresh(fingerprint)[0])
+    assert len(set(fingerprints)) == 1
+    assert reads == [1, 0, 0]
+    assert len(cache.frame) == len(ext.itineraries())
+    assert import_legacy_csvs(store) == []
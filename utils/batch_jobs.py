@@ -0,0 +1,141 @@
+"""
+utils/batch_jobs.py
+Matrice de collecte (routes × dates aller × dates retour) et journal de
+reprise (checkpoint) pour les collectes par lots.
+"""
+
+import csv
+import hashlib
+import itertools
+import json
+import os
+import threading
+from datetime import datetime
+from typing import NamedTuple
+
+
+class FlightJob(NamedTuple):
+    departure: str
+    arrival: str
+    outbound_date: str
+    return_date: str
+
+    @property
+    def route(self) -> str:
+        return f"{self.departure}-{self.arrival}"
+
+    @property
+    def job_id(self) -> str:
+        return f"{self.route}_{self.outbound_date}_{self.return_date or 'oneway'}"
+
+
+def _split(value) -> list:
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [v.strip() for v in str(value or "").split(";") if v.strip()]
+
+
+def load_jobs(path: str) -> list:
+    """
+    Lit la matrice de collecte.
+    - JSON : {"routes": ["CDG-ABJ", ...], "outbound_dates": [...], "return_dates": [...]}
+      → produit cartésien (les retours antérieurs à l'aller sont ignorés)
+    - CSV  : colonnes departure, arrival, outbound_date, return_date ; une cellule
+      peut contenir plusieurs valeurs séparées par « ; » (produit cartésien par ligne)
+    """
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            spec = json.load(f)
+        rows = [{
+            "routes": _split(spec["routes"]),
+            "outbound_date": _split(spec["outbound_dates"]),
+            "return_date": _split(spec.get("return_dates", [])) or [""],
+        }]
+    else:
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = [{
+                "routes": [f"{d}-{a}" for d in _split(r["departure"]) for a in _split(r["arrival"])],
+                "outbound_date": _split(r["outbound_date"]),
+                "return_date": _split(r.get("return_date")) or [""],
+            } for r in csv.DictReader(f)]
+
+    jobs, seen = [], set()
+    for row in rows:
+        for route, out, ret in itertools.product(row["routes"], row["outbound_date"], row["return_date"]):
+            if ret and ret < out:
+                continue
+            dep, arr = route.upper().split("-")
+            job = FlightJob(dep, arr, out, ret)
+            if job not in seen:
+                seen.add(job)
+                jobs.append(job)
+    return jobs
+
+
+def checkpoint_path(batch_path: str, directory: str) -> str:
+    """
+    Journal de reprise d'une matrice : nom du fichier + empreinte de son contenu.
+    Indépendant du jour : un lot interrompu avant minuit reprend après, et une
+    matrice modifiée repart d'un journal neuf.
+    """
+    with open(batch_path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:12]
+    name = os.path.splitext(os.path.basename(batch_path))[0]
+    return os.path.join(directory, f"{name}_{digest}.jsonl")
+
+
+class Checkpoint:
+    """
+    Journal append-only (JSON lines) de l'état de chaque job.
+    Relancer le même lot relit le journal et ne refait que les jobs non terminés.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.state = {}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # ligne tronquée par une interruption
+                    self.state[entry["job_id"]] = entry
+
+    def is_done(self, job: FlightJob) -> bool:
+        return self.state.get(job.job_id, {}).get("status") in ("done", "empty")
+
+    def pending(self, jobs: list) -> list:
+        return [job for job in jobs if not self.is_done(job)]
+
+    def record(self, job: FlightJob, status: str, **details):
+        entry = {
+            "job_id": job.job_id,
+            "status": status,
+            "at": datetime.now().isoformat(timespec="seconds"),
+            **details,
+        }
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.state[job.job_id] = entry
+
+    def archive(self) -> str:
+        """Met de côté le journal d'un lot terminé (suffixé par sa dernière écriture) et repart à vide."""
+        with self._lock:
+            finished = max(entry["at"] for entry in self.state.values()).replace(":", "")
+            stem, ext = os.path.splitext(self.path)
+            archived = f"{stem}.{finished}{ext}"
+            os.replace(self.path, archived)
+            self.state = {}
+        return archived
+
+    def summary(self) -> dict:
+        counts = {}
+        for entry in self.state.values():
+            counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        return counts
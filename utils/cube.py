@@ -0,0 +1,44 @@
+"""
+utils/cube.py
+Cube d'agrégats maintenu à l'écriture : pour chaque fichier `itineraries` du store,
+un fichier `cube` de même nom (route × date de collecte × compagnie × date aller)
+avec nombre / somme / min / max des prix.
+
+Les mesures sont additives : on recombine plusieurs fichiers, jours ou compagnies
+sans relire les relevés (moyenne = somme / nombre). Le cube survit à la rétention,
+les tableaux de bord l'utilisent à la place des `groupby` sur les lignes brutes.
+"""
+
+import pandas as pd
+
+from utils.schema import normalize
+
+CUBE_KEYS = ["airline", "outbound_date"]
+MEASURES = {"n": "sum", "price_sum": "sum", "price_min": "min", "price_max": "max"}
+
+
+def aggregate(itineraries: pd.DataFrame) -> pd.DataFrame:
+    """Cube d'un lot d'itinéraires (une ligne par compagnie et date aller)."""
+    df = normalize(itineraries, "itineraries").dropna(subset=["price"])
+    if df.empty:
+        return normalize(pd.DataFrame(), "cube")
+    price = df["price"].astype("int64")
+    cube = (
+        price.groupby([df[k] for k in CUBE_KEYS], observed=True, dropna=False)
+        .agg(n="count", price_sum="sum", price_min="min", price_max="max")
+        .reset_index()
+    )
+    return normalize(cube, "cube")
+
+
+def from_rollups(rollups: pd.DataFrame) -> pd.DataFrame:
+    """Cube reconstitué depuis des agrégats de rétention (somme = moyenne × nombre)."""
+    df = rollups.assign(price_sum=(rollups["price_mean"].astype(float) * rollups["n"].astype(float)).round())
+    return normalize(df, "cube")
+
+
+def combine(cube: pd.DataFrame, keys: list) -> pd.DataFrame:
+    """Regroupe le cube sur `keys` et ajoute la moyenne pondérée `price_mean`."""
+    out = cube.groupby(keys, observed=True, dropna=False)[list(MEASURES)].agg(MEASURES).reset_index()
+    out["price_mean"] = out["price_sum"].astype(float) / out["n"].astype(float)
+    return out
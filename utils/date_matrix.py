@@ -0,0 +1,112 @@
+"""
+utils/date_matrix.py
+Matrice de prix aller-retour : dates aller (lignes) × dates retour (colonnes),
+limitée aux séjours de `min_stay` à `max_stay` jours.
+
+Les cases sont interrogées via `plan_fare_search` (coordonnées en jours) :
+- prix déjà connus (collecte du jour, cache) gratuits
+- appels par lots, pour profiter de la concurrence de l'appelant
+- élagage : une case dont la borne basse ne peut plus battre le meilleur prix
+  trouvé n'est jamais interrogée
+
+Le résultat est une matrice NumPy dense (NaN = case non interrogée, sans vol ou
+hors séjour), directement utilisable par une heatmap.
+
+    matrix = build_date_matrix(("2026-07-01", "2026-07-14"), ("2026-07-15", "2026-08-15"),
+                               14, 28, fetch_prices, budget=40)
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from utils.fare_planner import PlanResult, plan_fare_search
+
+Pair = Tuple[str, str]   # (date aller, date retour) au format YYYY-MM-DD
+
+
+class DateMatrix(NamedTuple):
+    outbound: List[str]     # dates aller (lignes)
+    returns: List[str]      # dates retour (colonnes)
+    prices: np.ndarray      # prix min (€) par case, NaN si inconnu
+    valid: np.ndarray       # durée de séjour dans [min_stay, max_stay]
+    searched: np.ndarray    # case au prix connu (ou sans vol) ; un appel en échec ne compte pas
+    plan: PlanResult
+
+    @property
+    def skipped(self) -> np.ndarray:
+        """Cases valides sans prix connu : élaguées, appel en échec, ou budget épuisé."""
+        return self.valid & ~self.searched
+
+
+def _as_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    return value
+
+
+def days(start, end) -> List[str]:
+    start, end = _as_date(start), _as_date(end)
+    return [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+
+
+def stay_grid(outbound_window: tuple, return_window: tuple, min_stay: int, max_stay: int) -> tuple:
+    """(dates aller, dates retour, masque des cases dont la durée de séjour est admise)."""
+    outbound, returns = days(*outbound_window), days(*return_window)
+    stay = (
+        np.array(returns, dtype="datetime64[D]")[None, :]
+        - np.array(outbound, dtype="datetime64[D]")[:, None]
+    ).astype(np.int64)
+    return outbound, returns, (stay >= min_stay) & (stay <= max_stay)
+
+
+def pairs(outbound_window: tuple, return_window: tuple, min_stay: int, max_stay: int) -> List[Pair]:
+    """Couples (aller, retour) admis, ligne par ligne."""
+    outbound, returns, valid = stay_grid(outbound_window, return_window, min_stay, max_stay)
+    return [(outbound[i], returns[j]) for i, j in zip(*np.nonzero(valid))]
+
+
+def build_date_matrix(
+    outbound_window: tuple,
+    return_window: tuple,
+    min_stay: int,
+    max_stay: int,
+    fetch_prices: Callable[[List[Pair]], Dict[Pair, Optional[float]]],
+    budget: Optional[int] = None,
+    known: Optional[Dict[Pair, Optional[float]]] = None,
+    batch_size: int = 1,
+) -> DateMatrix:
+    """
+    `fetch_prices` : interroge une liste de couples, renvoie {couple: prix min, None ou FAILED}
+                     (cf. utils.fare_planner : un couple absent n'a pas été interrogé)
+    `budget`       : appels au plus (toutes les cases admises par défaut) ; 0 = matrice
+                     des seuls prix connus, sans aucun appel
+    """
+    outbound, returns, valid = stay_grid(outbound_window, return_window, min_stay, max_stay)
+    rows, cols = np.nonzero(valid)
+    points = [(outbound[i], returns[j]) for i, j in zip(rows, cols)]
+    prices = np.full(valid.shape, np.nan)
+    searched = np.zeros(valid.shape, dtype=bool)
+
+    if not points:
+        plan = PlanResult(None, None, {}, 0, 0.0, False, 0.0)
+        return DateMatrix(outbound, returns, prices, valid, searched, plan)
+
+    plan = plan_fare_search(
+        points,
+        np.column_stack([rows, cols]),
+        fetch_prices,
+        budget=len(points) if budget is None else int(budget),
+        known=known,
+        batch_size=batch_size,
+    )
+    position = dict(zip(points, zip(rows, cols)))
+    for point, price in plan.prices.items():
+        i, j = position[point]
+        searched[i, j] = True
+        if price is not None:
+            prices[i, j] = price
+    return DateMatrix(outbound, returns, prices, valid, searched, plan)
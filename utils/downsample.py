@@ -0,0 +1,85 @@
+"""
+utils/downsample.py
+Réduction des séries temporelles avant tracé (côté serveur) : au plus `max_points`
+points par courbe, quel que soit l'historique.
+
+- "minmax" : min et max de chaque tranche → l'enveloppe visuelle est conservée
+- "lttb"   : Largest-Triangle-Three-Buckets → la forme de la courbe est conservée
+
+Les deux renvoient des positions dans la série triée par x ; `downsample()` applique
+la réduction par groupe (une courbe par compagnie) et compte les points d'origine.
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+METHODS = ("minmax", "lttb")
+
+
+def _as_float(values) -> np.ndarray:
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype("datetime64[s]").astype(np.int64).astype(float)
+    return values.astype(float)
+
+
+def minmax_indices(y, max_points: int) -> np.ndarray:
+    """Positions du min et du max de chaque tranche (≤ max_points au total), dans l'ordre."""
+    y = _as_float(y)
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    n_buckets = max(max_points // 2, 1)
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+    buckets = np.repeat(np.arange(n_buckets), np.diff(edges))
+    # Argmin / argmax par tranche sans boucle : tri par (tranche, valeur),
+    # le premier et le dernier élément de chaque tranche sont son min et son max
+    order = np.lexsort((y, buckets))
+    keep = np.concatenate([order[edges[:-1]], order[edges[1:] - 1]])
+    return np.unique(keep)
+
+
+def lttb_indices(x, y, max_points: int) -> np.ndarray:
+    """Positions retenues par LTTB (premier et dernier point toujours gardés)."""
+    x, y = _as_float(x), _as_float(y)
+    n = len(y)
+    if n <= max_points or max_points < 3:
+        return np.arange(n) if n <= max_points else np.array([0, n - 1])
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    keep = np.empty(max_points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(max_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Point moyen de la tranche suivante (le dernier point pour la dernière tranche)
+        nlo, nhi = hi, (edges[i + 2] if i + 2 < len(edges) else n)
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def downsample(df: pd.DataFrame, x: str, y: str, max_points: int, by: Optional[str] = None,
+               method: str = "minmax") -> tuple:
+    """
+    (lignes retenues, {courbe: nombre de points d'origine}) ; au plus `max_points` lignes par courbe.
+    Sans `by`, la clé du dictionnaire est None.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Méthode de réduction inconnue : {method!r} ({', '.join(METHODS)})")
+    df = df.dropna(subset=[x, y]).sort_values([by, x] if by else x, kind="stable")
+    groups = df.groupby(by, observed=True, sort=False) if by else [(None, df)]
+    parts, counts = [], {}
+    for key, part in groups:
+        if method == "lttb":
+            keep = lttb_indices(part[x].to_numpy(), part[y].to_numpy(), max_points)
+        else:
+            keep = minmax_indices(part[y].to_numpy(), max_points)
+        parts.append(part.iloc[keep])
+        counts[key] = len(part)
+    if not parts:
+        return df, counts
+    return pd.concat(parts), counts
@@ -0,0 +1,55 @@
+"""
+utils/export.py
+Export d'un DataFrame par morceaux vers un fichier temporaire (CSV, CSV gzip ou
+Parquet) : jamais de CSV complet en mémoire, ni de double copie texte → bytes.
+Le fichier renvoyé est rembobiné, prêt à être lu (ex. `st.download_button`).
+"""
+
+import gzip
+import io
+import tempfile
+from typing import Iterator
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# format → (type MIME, extension)
+FORMATS = {
+    "csv": ("text/csv", ".csv"),
+    "csv.gz": ("application/gzip", ".csv.gz"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+}
+CHUNK_ROWS = 50_000
+_SPOOL_BYTES = 8 << 20   # au-delà, le fichier temporaire passe sur disque
+
+
+def chunks(df: pd.DataFrame, size: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    for start in range(0, len(df), size):
+        yield df.iloc[start:start + size]
+
+
+def export(df: pd.DataFrame, fmt: str = "csv", chunk_rows: int = CHUNK_ROWS):
+    """Écrit `df` morceau par morceau ; renvoie un fichier binaire temporaire rembobiné."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Format d'export inconnu : {fmt!r} ({', '.join(FORMATS)})")
+    out = tempfile.SpooledTemporaryFile(max_size=_SPOOL_BYTES)
+
+    if fmt == "parquet":
+        schema = pa.Schema.from_pandas(df.iloc[:0], preserve_index=False)
+        with pq.ParquetWriter(out, schema, compression="zstd") as writer:
+            for part in chunks(df, chunk_rows):
+                writer.write_table(pa.Table.from_pandas(part, schema=schema, preserve_index=False))
+    else:
+        raw = gzip.GzipFile(fileobj=out, mode="wb") if fmt == "csv.gz" else out
+        text = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+        df.iloc[:0].to_csv(text, index=False)
+        for part in chunks(df, chunk_rows):
+            part.to_csv(text, index=False, header=False)
+        text.flush()
+        text.detach()
+        if raw is not out:
+            raw.close()   # écrit la fin du flux gzip, sans fermer `out`
+
+    out.seek(0)
+    return out
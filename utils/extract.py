@@ -0,0 +1,205 @@
+"""
+utils/extract.py
+Extraction unique des réponses Google Flights (best_flights / other_flights)
+vers des tampons colonnaires :
+- table des itinéraires (une ligne par offre, prix et durée une seule fois)
+- table des segments (une ligne par vol, rattachée à son itinéraire)
+Remplace les boucles `for section in [...]` dupliquées dans chaque script.
+"""
+
+from array import array
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.schema import itinerary_ids
+
+SECTIONS = ("best_flights", "other_flights")
+_EMPTY = {}
+
+
+def _int_column(values: list) -> pd.arrays.IntegerArray:
+    """Colonne entière nullable (Int32) ; les valeurs absentes ou illisibles deviennent <NA>."""
+    try:
+        return pd.array(np.array(values, dtype=np.int32), dtype="Int32")
+    except (TypeError, ValueError):
+        cleaned = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce")
+        return pd.array(cleaned.round(), dtype="Int32")
+
+
+def _text_column(values: list) -> np.ndarray:
+    return np.array(values, dtype=object)
+
+
+def _category_column(values: list) -> pd.Categorical:
+    """Texte très répété (compagnies, aéroports, horaires) : encodage par dictionnaire."""
+    return pd.Categorical(values)
+
+
+class FlightExtractor:
+    """
+    Accumule des réponses SerpAPI dans des colonnes (une liste par champ),
+    sans passer par un dict par ligne. Les types sont appliqués une seule fois,
+    à la sortie : Int32 nullable pour les prix/durées, Categorical pour les
+    compagnies, aéroports et horaires.
+
+        ext = FlightExtractor()
+        ext.add(results, outbound_date="2025-12-23")
+        itin, seg = ext.itineraries(), ext.segments()
+    """
+
+    def __init__(self):
+        # Itinéraires
+        self._it_section = array("b")
+        self._it_rank = array("i")       # rang parmi les offres identiques de la même réponse
+        self._it_nb_segments = array("i")
+        self._it_price = []
+        self._it_duration = []
+        self._it_airline = []
+        self._it_dep_airport = []
+        self._it_arr_airport = []
+        self._it_dep_time = []
+        self._it_arr_time = []
+        self._it_flight_numbers = []
+        self._context = {}
+        self._ids = None                 # identifiants stables, calculés à la première sortie
+        # Segments
+        self._sg_itinerary = array("i")
+        self._sg_seq = array("i")
+        self._sg_duration = []
+        self._sg_airline = []
+        self._sg_flight_number = []
+        self._sg_dep_airport = []
+        self._sg_arr_airport = []
+        self._sg_dep_time = []
+        self._sg_arr_time = []
+
+    def __len__(self):
+        return len(self._it_nb_segments)
+
+    def add(self, results: dict, **context) -> int:
+        """Ajoute une réponse ; `context` est recopié sur chaque itinéraire (route, dates...)."""
+        start = len(self)
+        it_id = start
+        self._ids = None
+        seen = {}   # (horaire, vols) → nombre d'offres déjà vues dans cette réponse
+
+        # Méthodes liées en local : c'est la boucle chaude de tous les collecteurs
+        sg_itinerary, sg_seq = self._sg_itinerary.append, self._sg_seq.append
+        sg_duration, sg_airline = self._sg_duration.append, self._sg_airline.append
+        sg_flight, sg_dep, sg_arr = self._sg_flight_number.append, self._sg_dep_airport.append, self._sg_arr_airport.append
+        sg_dep_t, sg_arr_t = self._sg_dep_time.append, self._sg_arr_time.append
+
+        for section_idx, section in enumerate(SECTIONS):
+            for group in results.get(section) or ():
+                segments = group.get("flights") or ()
+                if not segments:
+                    continue
+                numbers = []
+                for seq, flight in enumerate(segments):
+                    dep = flight.get("departure_airport") or _EMPTY
+                    arr = flight.get("arrival_airport") or _EMPTY
+                    number = flight.get("flight_number")
+                    sg_itinerary(it_id)
+                    sg_seq(seq)
+                    sg_duration(flight.get("duration"))
+                    sg_airline(flight.get("airline"))
+                    sg_flight(number)
+                    sg_dep(dep.get("id"))
+                    sg_arr(arr.get("id"))
+                    sg_dep_t(dep.get("time"))
+                    sg_arr_t(arr.get("time"))
+                    numbers.append(number or "")
+
+                first_dep = segments[0].get("departure_airport") or _EMPTY
+                self._it_section.append(section_idx)
+                self._it_nb_segments.append(len(segments))
+                self._it_price.append(group.get("price"))
+                self._it_duration.append(group.get("total_duration"))
+                self._it_airline.append(segments[0].get("airline"))
+                self._it_dep_airport.append(first_dep.get("id"))
+                self._it_arr_airport.append(arr.get("id"))
+                dep_time, flight_numbers = first_dep.get("time"), " / ".join(numbers)
+                key = (dep_time or "", flight_numbers)
+                rank = seen.get(key, 0)
+                seen[key] = rank + 1
+                self._it_rank.append(rank)
+                self._it_dep_time.append(dep_time)
+                self._it_arr_time.append(arr.get("time"))
+                self._it_flight_numbers.append(flight_numbers)
+                it_id += 1
+
+        added = it_id - start
+        for key in set(self._context) | set(context):
+            column = self._context.setdefault(key, [None] * start)
+            column.extend([context.get(key)] * added)
+        return added
+
+    # ------------------------
+    # Sorties DataFrame
+    # ------------------------
+    def _stable_ids(self) -> np.ndarray:
+        """Identifiant stable (vols + horaire de départ + date retour + rang dans la réponse), partagé par les sorties."""
+        if self._ids is None:
+            returns = self._context.get("return_date")
+            ids = itinerary_ids(
+                pd.Series(self._it_dep_time, dtype=object),
+                pd.Series(self._it_flight_numbers, dtype=object),
+                None if returns is None else pd.Series(returns, dtype=object),
+                np.frombuffer(self._it_rank, dtype=np.int32),
+            )
+            self._ids = ids.to_numpy(dtype=np.int64)
+        return self._ids
+
+    def itineraries(self) -> pd.DataFrame:
+        df = pd.DataFrame({
+            "itinerary_id": self._stable_ids(),
+            "section": pd.Categorical.from_codes(np.array(self._it_section, dtype=np.int8), SECTIONS),
+            "airline": _category_column(self._it_airline),
+            "price": _int_column(self._it_price),
+            "duration_min": _int_column(self._it_duration),
+            "stops": np.array(self._it_nb_segments, dtype=np.int32) - 1,
+            "departure_airport": _category_column(self._it_dep_airport),
+            "arrival_airport": _category_column(self._it_arr_airport),
+            "departure_time": _category_column(self._it_dep_time),
+            "arrival_time": _category_column(self._it_arr_time),
+            "flight_numbers": _text_column(self._it_flight_numbers),
+        })
+        for key, values in self._context.items():
+            df[key] = _text_column(values)
+        return df
+
+    def segments(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            "itinerary_id": self._stable_ids()[np.array(self._sg_itinerary, dtype=np.intp)],
+            "seq": np.array(self._sg_seq, dtype=np.int32),
+            "airline": _category_column(self._sg_airline),
+            "flight_number": _text_column(self._sg_flight_number),
+            "departure_airport": _category_column(self._sg_dep_airport),
+            "arrival_airport": _category_column(self._sg_arr_airport),
+            "departure_time": _category_column(self._sg_dep_time),
+            "arrival_time": _category_column(self._sg_arr_time),
+            "segment_duration_min": _int_column(self._sg_duration),
+        })
+
+    def flat_segments(self, columns: Optional[list] = None) -> pd.DataFrame:
+        """
+        Format historique « une ligne par segment » : les colonnes de l'itinéraire
+        (prix, durée totale, escales, contexte) sont propagées par indexation vectorisée.
+        """
+        seg = self.segments()
+        idx = np.array(self._sg_itinerary, dtype=np.intp)
+        seg["price"] = _int_column(self._it_price).take(idx)
+        seg["duration_min"] = _int_column(self._it_duration).take(idx)
+        seg["stops"] = (np.array(self._it_nb_segments, dtype=np.int32) - 1)[idx]
+        for key, values in self._context.items():
+            seg[key] = _text_column(values)[idx]
+        return seg[columns] if columns is not None else seg
+
+
+def extract_flights(results: dict, columns: Optional[list] = None, **context) -> pd.DataFrame:
+    """Raccourci : une réponse → DataFrame « une ligne par segment »."""
+    ext = FlightExtractor()
+    ext.add(results, **context)
+    return ext.flat_segments(columns)
@@ -0,0 +1,469 @@
+"""
+utils/fare_db.py
+Base SQLite indexée des relevés de prix : une ligne par itinéraire collecté
+(table `fares`), ses vols dans la table fille `fare_segments`, et les agrégats
+des jours anciens (table `fare_rollups`, cf. utils/retention.py) et le cube
+d'agrégats additifs écrit avec chaque collecte (table `fare_cube`, cf. utils/cube.py).
+
+Le store Parquet (utils/history_store.py) reste la source : `sync()` y charge
+les fichiers nouveaux ou modifiés. Les questions courantes deviennent des
+requêtes indexées au lieu d'un chargement complet en pandas :
+
+    db = FareDB()
+    db.sync(HistoryStore())
+    db.cheapest("CDG-ABJ", outbound_date="2025-12-23", airline="Air France", last_days=30)
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional, Union
+
+import pandas as pd
+
+from utils.history_store import HistoryStore
+from utils.schema import SCHEMAS, conform, to_text
+
+# Base dérivée du store : un changement de schéma la reconstruit simplement
+_VERSION = 4
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fares (
+    route             TEXT NOT NULL,
+    collection_date   TEXT NOT NULL,
+    itinerary_id      INTEGER,
+    outbound_date     TEXT,
+    return_date       TEXT,
+    airline           TEXT,
+    price             INTEGER,
+    departure_airport TEXT,
+    arrival_airport   TEXT,
+    departure_time    TEXT,
+    arrival_time      TEXT,
+    duration_min      INTEGER,
+    stops             INTEGER,
+    flight_numbers    TEXT,
+    source            TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fares_route_collection ON fares (route, collection_date);
+CREATE INDEX IF NOT EXISTS idx_fares_route_outbound   ON fares (route, outbound_date, collection_date);
+CREATE INDEX IF NOT EXISTS idx_fares_route_return     ON fares (route, return_date, collection_date);
+CREATE INDEX IF NOT EXISTS idx_fares_route_airline    ON fares (route, airline, collection_date);
+CREATE INDEX IF NOT EXISTS idx_fares_itinerary        ON fares (itinerary_id, collection_date);
+CREATE INDEX IF NOT EXISTS idx_fares_source           ON fares (source);
+CREATE TABLE IF NOT EXISTS fare_segments (
+    itinerary_id      INTEGER NOT NULL,
+    seq               INTEGER,
+    airline           TEXT,
+    flight_number     TEXT,
+    departure_airport TEXT,
+    arrival_airport   TEXT,
+    departure_time    TEXT,
+    arrival_time      TEXT,
+    duration_min      INTEGER,
+    source            TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fare_segments_itinerary ON fare_segments (itinerary_id);
+CREATE INDEX IF NOT EXISTS idx_fare_segments_source    ON fare_segments (source);
+CREATE TABLE IF NOT EXISTS fare_rollups (
+    route           TEXT NOT NULL,
+    collection_date TEXT NOT NULL,
+    outbound_date   TEXT,
+    airline         TEXT,
+    n               INTEGER,
+    price_min       INTEGER,
+    price_median    REAL,
+    price_mean      REAL,
+    price_max       INTEGER,
+    source          TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fare_rollups_route_collection ON fare_rollups (route, collection_date);
+CREATE INDEX IF NOT EXISTS idx_fare_rollups_route_outbound   ON fare_rollups (route, outbound_date, collection_date);
+CREATE INDEX IF NOT EXISTS idx_fare_rollups_source           ON fare_rollups (source);
+CREATE TABLE IF NOT EXISTS fare_cube (
+    route           TEXT NOT NULL,
+    collection_date TEXT NOT NULL,
+    outbound_date   TEXT,
+    airline         TEXT,
+    n               INTEGER,
+    price_sum       INTEGER,
+    price_min       INTEGER,
+    price_max       INTEGER,
+    source          TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fare_cube_route_collection ON fare_cube (route, collection_date);
+CREATE INDEX IF NOT EXISTS idx_fare_cube_source           ON fare_cube (source);
+CREATE TABLE IF NOT EXISTS sources (
+    path  TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    rows  INTEGER NOT NULL
+);
+"""
+
+COLUMNS = ["route", "collection_date", *SCHEMAS["itineraries"]]
+SEGMENT_COLUMNS = list(SCHEMAS["segments"])
+ROLLUP_COLUMNS = ["route", "collection_date", *SCHEMAS["rollups"]]
+CUBE_COLUMNS = ["route", "collection_date", *SCHEMAS["cube"]]
+
+DateLike = Union[str, date, datetime]
+
+_CHUNK = 900   # limite de paramètres SQLite par requête
+
+
+def _day(value: DateLike) -> str:
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)[:10]
+
+
+def _route_of(path: str) -> Optional[str]:
+    """Route d'un fichier du store, lue dans le composant `route=...` du chemin (pas une sous-chaîne)."""
+    for part in os.path.normpath(path).split(os.sep):
+        if part.startswith("route="):
+            return part[len("route="):]
+    return None
+
+
+def _typed(df: pd.DataFrame) -> pd.DataFrame:
+    """Remet les types du schéma canonique sur un résultat SQL (colonnes présentes seulement)."""
+    return conform(df, "itineraries")
+
+
+class FareDB:
+
+    def __init__(self, path: str = "data/fares.sqlite"):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != _VERSION:
+            self._conn.executescript("DROP TABLE IF EXISTS fares; DROP TABLE IF EXISTS fare_segments; "
+                                     "DROP TABLE IF EXISTS fare_rollups; DROP TABLE IF EXISTS fare_cube; "
+                                     "DROP TABLE IF EXISTS sources;")
+            self._conn.execute(f"PRAGMA user_version = {_VERSION}")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    # ------------------------
+    # Chargement depuis le store
+    # ------------------------
+    def sync(self, store: HistoryStore, routes: Optional[Iterable[str]] = None) -> int:
+        """Charge les fichiers Parquet nouveaux ou réécrits ; supprime ceux qui ont disparu."""
+        files = store.files("itineraries", routes)
+        aggregates = [("fare_rollups", ROLLUP_COLUMNS, store.files("rollups", routes)),
+                      ("fare_cube", CUBE_COLUMNS, store.files("cube", routes))]
+        with self._lock:
+            known = dict(self._conn.execute("SELECT path, mtime FROM sources"))
+        current = {path for _, _, path in files}
+        current.update(path for _, _, agg_files in aggregates for _, _, path in agg_files)
+        loaded = 0
+
+        for table, columns, agg_files in aggregates:
+            for route, day, path in agg_files:
+                mtime = os.path.getmtime(path)
+                if known.get(path) == mtime:
+                    continue
+                agg = to_text(pd.read_parquet(path, engine="pyarrow").reindex(columns=columns[2:]))
+                agg.insert(0, "collection_date", day)
+                agg.insert(0, "route", route)
+                with self._lock, self._conn:
+                    self._insert(table, agg, path)
+                    self._conn.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?)", (path, mtime, len(agg)))
+                loaded += 1
+
+        for route, day, path in files:
+            mtime = os.path.getmtime(path)
+            if known.get(path) == mtime:
+                continue
+            itin = to_text(pd.read_parquet(path, engine="pyarrow").reindex(columns=COLUMNS[2:]))
+            itin.insert(0, "collection_date", day)
+            itin.insert(0, "route", route)
+            # Table fille : même nom de fichier côté `segments` (absente pour meilleur_vol.py)
+            seg_path = store.sibling(path, "segments")
+            seg = None
+            if os.path.exists(seg_path):
+                seg = to_text(pd.read_parquet(seg_path, engine="pyarrow").reindex(columns=SEGMENT_COLUMNS))
+            with self._lock, self._conn:
+                self._insert("fares", itin, path)
+                if seg is not None:
+                    self._insert("fare_segments", seg, path)
+                self._conn.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?)", (path, mtime, len(itin)))
+            loaded += 1
+
+        # Partitions supprimées, remplacées (replace=True) ou agrégées par la rétention
+        wanted = {r.upper() for r in routes} if routes else None
+        gone = [
+            p for p in known
+            if p not in current and (wanted is None or _route_of(p) in wanted)
+        ]
+        if gone:
+            with self._lock, self._conn:
+                self._conn.executemany("DELETE FROM fares WHERE source = ?", [(p,) for p in gone])
+                self._conn.executemany("DELETE FROM fare_segments WHERE source = ?", [(p,) for p in gone])
+                self._conn.executemany("DELETE FROM fare_rollups WHERE source = ?", [(p,) for p in gone])
+                self._conn.executemany("DELETE FROM fare_cube WHERE source = ?", [(p,) for p in gone])
+                self._conn.executemany("DELETE FROM sources WHERE path = ?", [(p,) for p in gone])
+        return loaded
+
+    def _insert(self, table: str, df: pd.DataFrame, source: str):
+        """Remplace les lignes de `source` dans `table` (appelé sous verrou et transaction)."""
+        self._conn.execute(f"DELETE FROM {table} WHERE source = ?", (source,))
+        df = df.assign(source=source)
+        rows = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+        self._conn.executemany(
+            f"INSERT INTO {table} ({', '.join(df.columns)}) VALUES ({', '.join('?' * len(df.columns))})", rows
+        )
+
+    # ------------------------
+    # Requêtes
+    # ------------------------
+    def _where(self, route: str, outbound_date=None, return_date=None, airlines=None,
+               since=None, until=None, last_days: Optional[int] = None, sources=None) -> tuple:
+        clauses, args = ["route = ?"], [route.upper()]
+        if sources is not None:
+            sources = list(sources)
+            clauses.append(f"source IN ({', '.join('?' * len(sources))})")
+            args.extend(sources)
+        if outbound_date:
+            clauses.append("outbound_date = ?")
+            args.append(_day(outbound_date))
+        if return_date:
+            clauses.append("return_date = ?")
+            args.append(_day(return_date))
+        if airlines:
+            airlines = [airlines] if isinstance(airlines, str) else list(airlines)
+            clauses.append(f"airline IN ({', '.join('?' * len(airlines))})")
+            args.extend(airlines)
+        if last_days:
+            # N derniers jours de collecte disponibles (pas forcément jusqu'à aujourd'hui)
+            latest = self.latest_collection(route)
+            if latest:
+                cutoff = _day(datetime.fromisoformat(latest) - timedelta(days=last_days - 1))
+                since = max(_day(since), cutoff) if since else cutoff
+        if since:
+            clauses.append("collection_date >= ?")
+            args.append(_day(since))
+        if until:
+            clauses.append("collection_date <= ?")
+            args.append(_day(until))
+        return " AND ".join(clauses), args
+
+    def query(self, sql: str, args: Iterable = ()) -> pd.DataFrame:
+        with self._lock:
+            return pd.read_sql_query(sql, self._conn, params=list(args))
+
+    def snapshots(self, route: str, columns: Optional[list] = None, **filters) -> pd.DataFrame:
+        """
+        Relevés bruts filtrés (filtres : outbound_date, return_date, airlines, since, until,
+        last_days, sources = fichiers du store dont proviennent les lignes).
+        """
+        where, args = self._where(route, **filters)
+        cols = ", ".join(columns or COLUMNS)
+        return _typed(self.query(f"SELECT {cols} FROM fares WHERE {where} ORDER BY collection_date", args))
+
+    def _rollup_where(self, route: str, **filters) -> Optional[tuple]:
+        """Filtres appliqués à `fare_rollups` ; None si la question exige le détail brut (date retour)."""
+        if filters.get("return_date"):
+            return None
+        return self._where(route, **filters)
+
+    def cheapest(self, route: str, airline: Optional[str] = None, **filters) -> pd.DataFrame:
+        """
+        Prix le plus bas vu à chaque date de collecte, avec le vol correspondant
+        (jours agrégés par la rétention : compagnie et date aller seulement).
+        """
+        where, args = self._where(route, airlines=airline, **filters)
+        sql = f"""
+            SELECT collection_date, itinerary_id, airline, price, flight_numbers,
+                   stops, outbound_date, return_date, departure_time
+            FROM fares WHERE {where} AND price IS NOT NULL
+        """
+        rolled = self._rollup_where(route, airlines=airline, **filters)
+        if rolled:
+            sql += f"""
+            UNION ALL
+            SELECT collection_date, NULL, airline, price_min, NULL, NULL, outbound_date, NULL, NULL
+            FROM fare_rollups WHERE {rolled[0]}
+            """
+            args = args + rolled[1]
+        # SQLite : avec MIN(), les colonnes non agrégées viennent de la ligne du minimum
+        sql = f"""
+            SELECT collection_date, itinerary_id, airline, MIN(price) AS price, flight_numbers,
+                   stops, outbound_date, return_date, departure_time
+            FROM ({sql}) GROUP BY collection_date ORDER BY collection_date
+        """
+        return _typed(self.query(sql, args))
+
+    def daily_stats(self, route: str, by_airline: bool = False, **filters) -> pd.DataFrame:
+        """
+        Min / moyenne / max / nombre d'itinéraires par date de collecte (et compagnie).
+        Lu dans le cube (historique complet, jours agrégés inclus) ; filtre `return_date` :
+        relevés bruts seulement.
+        """
+        where, args = self._where(route, **filters)
+        keys = "collection_date, airline" if by_airline else "collection_date"
+        if filters.get("return_date"):
+            sql = f"""
+                SELECT {keys}, MIN(price) AS price_min, AVG(price) AS price_mean,
+                       MAX(price) AS price_max, COUNT(*) AS n
+                FROM fares WHERE {where} AND price IS NOT NULL
+                GROUP BY {keys} ORDER BY {keys}
+            """
+        else:
+            sql = f"""
+                SELECT {keys}, MIN(price_min) AS price_min, SUM(price_sum) * 1.0 / SUM(n) AS price_mean,
+                       MAX(price_max) AS price_max, SUM(n) AS n
+                FROM fare_cube WHERE {where}
+                GROUP BY {keys} ORDER BY {keys}
+            """
+        return _typed(self.query(sql, args))
+
+    def cube(self, route: str, **filters) -> pd.DataFrame:
+        """Cellules du cube (date de collecte × compagnie × date aller), fichiers recombinés."""
+        where, args = self._where(route, **filters)
+        sql = f"""
+            SELECT route, collection_date, outbound_date, airline, SUM(n) AS n, SUM(price_sum) AS price_sum,
+                   MIN(price_min) AS price_min, MAX(price_max) AS price_max
+            FROM fare_cube WHERE {where}
+            GROUP BY collection_date, airline, outbound_date ORDER BY collection_date
+        """
+        return conform(self.query(sql, args), "cube")
+
+    def rollups(self, route: str, **filters) -> pd.DataFrame:
+        """Agrégats des jours anciens (compagnie × date aller), tels qu'écrits par la rétention."""
+        rolled = self._rollup_where(route, **filters)
+        if not rolled:
+            return conform(pd.DataFrame(columns=ROLLUP_COLUMNS), "rollups")
+        sql = f"SELECT {', '.join(ROLLUP_COLUMNS)} FROM fare_rollups WHERE {rolled[0]} ORDER BY collection_date"
+        return conform(self.query(sql, rolled[1]), "rollups")
+
+    def segments(self, route: str, itinerary_ids: Iterable[int], collection_date: Optional[DateLike] = None) -> pd.DataFrame:
+        """
+        Vols des itinéraires demandés (une ligne par segment, dans l'ordre du trajet),
+        tels que collectés le jour `collection_date` (dernière collecte par défaut) :
+        les identifiants sont stables d'un jour à l'autre, la jointure passe donc par
+        les fichiers sources de ce jour-là.
+        """
+        ids = [int(i) for i in dict.fromkeys(itinerary_ids)]
+        day = _day(collection_date) if collection_date else self.latest_collection(route)
+        if not ids or day is None:
+            return conform(pd.DataFrame(columns=SEGMENT_COLUMNS), "segments")
+        sql = f"""
+            SELECT DISTINCT {', '.join(f's.{c}' for c in SEGMENT_COLUMNS)} FROM fare_segments s
+            WHERE s.itinerary_id IN ({', '.join('?' * len(ids))})
+              AND s.source IN (SELECT DISTINCT source FROM fares WHERE route = ? AND collection_date = ?)
+            ORDER BY s.itinerary_id, s.seq
+        """
+        rows = self.query(sql, [*ids, route.upper(), day])
+        return conform(rows.rename(columns=lambda c: c.split(".")[-1]), "segments")
+
+    def sources(self, route: str) -> dict:
+        """Fichiers `itineraries` chargés pour la route → mtime au chargement."""
+        with self._lock:
+            return dict(self._conn.execute(
+                "SELECT path, mtime FROM sources s "
+                "WHERE EXISTS (SELECT 1 FROM fares f WHERE f.source = s.path AND f.route = ?)",
+                (route.upper(),),
+            ))
+
+    def airlines(self, route: str) -> list:
+        rows = self.query("SELECT airline FROM fares WHERE route = ? AND airline IS NOT NULL "
+                          "UNION SELECT airline FROM fare_rollups WHERE route = ? AND airline IS NOT NULL "
+                          "ORDER BY airline", [route.upper()] * 2)
+        return rows["airline"].tolist()
+
+    def latest_collection(self, route: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(d) FROM (SELECT MAX(collection_date) AS d FROM fares WHERE route = ? "
+                "UNION ALL SELECT MAX(collection_date) FROM fare_rollups WHERE route = ?)",
+                (route.upper(),) * 2,
+            ).fetchone()
+        return row[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def prepare_store(store: HistoryStore, routes: Optional[Iterable[str]] = None, base_dir: str = ".") -> HistoryStore:
+    """
+    Préparation unique du store, hors des rafraîchissements : import des anciens CSV
+    au premier lancement, puis cubes des fichiers écrits avant eux.
+    `base_dir` : dossier contenant output/ et data/raw/ (".." depuis notebooks/)
+    """
+    from utils.history_store import import_legacy_csvs
+
+    # Premier lancement seulement : après rétention, les jours anciens n'existent plus qu'en agrégats
+    if store.is_empty("itineraries") and store.is_empty("rollups"):
+        import_legacy_csvs(store, base_dir)
+    store.build_cubes(routes)
+    return store
+
+
+def open_fare_db(store_dir: Optional[str] = None, db_path: Optional[str] = None,
+                 routes: Optional[Iterable[str]] = None, base_dir: str = ".") -> FareDB:
+    """Base synchronisée avec le store (préparé au passage, cf. `prepare_store`)."""
+    from config.settings import FARE_DB_PATH, HISTORY_STORE_DIR
+
+    store = prepare_store(HistoryStore(store_dir or HISTORY_STORE_DIR), routes, base_dir)
+    db = FareDB(db_path or FARE_DB_PATH)
+    db.sync(store, routes)
+    return db
+
+
+class SnapshotCache:
+    """
+    Relevés bruts d'une route gardés en mémoire et complétés fichier par fichier :
+    à chaque changement du store, seuls les fichiers nouveaux ou réécrits sont relus
+    (et les lignes des fichiers disparus retirées), sans recharger tout l'historique.
+    """
+
+    def __init__(self, route: str, store_dir: Optional[str] = None, db_path: Optional[str] = None):
+        self.route = route
+        self.store_dir = store_dir
+        self.db_path = db_path
+        self.fingerprint = None
+        self.frame = _typed(pd.DataFrame(columns=COLUMNS))
+        self.cube = conform(pd.DataFrame(columns=CUBE_COLUMNS), "cube")
+        self._parts = {}   # fichier source → (mtime, relevés)
+        self._lock = threading.Lock()
+        # Une fois pour toutes : les rafraîchissements ne font que synchroniser la base
+        prepare_store(self._store(), [route])
+
+    def _store(self) -> HistoryStore:
+        from config.settings import HISTORY_STORE_DIR
+        return HistoryStore(self.store_dir or HISTORY_STORE_DIR)
+
+    def refresh(self, fingerprint: Optional[str] = None) -> tuple:
+        """
+        Met à jour si l'empreinte du store a changé (toujours si None) ;
+        renvoie (fichiers relus, fichiers retirés).
+        """
+        with self._lock:
+            if fingerprint is not None and fingerprint == self.fingerprint:
+                return 0, 0
+            from config.settings import FARE_DB_PATH
+
+            db = FareDB(self.db_path or FARE_DB_PATH)
+            db.sync(self._store(), [self.route])
+            try:
+                current = db.sources(self.route)
+                stale = [p for p, (mtime, _) in self._parts.items() if current.get(p) != mtime]
+                for path in stale:
+                    del self._parts[path]
+                fresh = [p for p in current if p not in self._parts]
+                for i in range(0, len(fresh), _CHUNK):
+                    rows = db.snapshots(self.route, columns=[*COLUMNS, "source"], sources=fresh[i:i + _CHUNK])
+                    for path, part in rows.groupby("source", sort=False):
+                        self._parts[path] = (current[path], part.drop(columns="source"))
+                if fresh or stale or self.fingerprint is None:
+                    parts = [part for _, part in self._parts.values()]
+                    frame = pd.concat(parts, ignore_index=True) if parts else self.frame.iloc[:0]
+                    self.frame = _typed(frame).sort_values("collection_date", kind="stable", ignore_index=True)
+                self.cube = db.cube(self.route)   # petit (jours × compagnies × dates aller) : relu en entier
+            finally:
+                db.close()
+            self.fingerprint = fingerprint
+            return len(fresh), len(stale)
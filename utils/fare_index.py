@@ -0,0 +1,368 @@
+"""
+utils/fare_index.py
+Index tarifaire d'une route pour les questions « le moins cher entre le jour X
+et le jour Y » sans `groupby(...).min()` sur les relevés :
+
+- calendrier : prix minimum par date aller (tous séjours confondus)
+- aller-retour : prix minimum par date aller × durée de séjour (jours)
+
+Chaque case garde le prix de la collecte la plus récente qui la couvre (minimum
+des offres de ce jour-là). Les cases sont rangées dans des arbres de segments
+(`RangeMin`) : minimum sur une plage de dates, ou sur un rectangle dates ×
+durées de séjour, en O(log n) ; affectation d'une case en O(log n).
+
+`refresh()` suit le store fichier par fichier (comme SnapshotCache) : seuls les
+fichiers nouveaux, réécrits ou supprimés sont relus. Un fichier ajouté est
+fusionné case par case avec l'état courant (une collecte plus récente remplace,
+une collecte du même jour garde le minimum) ; un fichier retiré ne fait
+recalculer que les dates aller qu'il couvrait, à partir des fichiers qui les
+couvrent encore. Les cases modifiées sont ensuite mises à jour dans les arbres.
+
+    index = FareIndex("ABJ-CDG-ABJ")
+    index.refresh()
+    index.cheapest("2026-07-01", "2026-07-14")
+    index.cheapest_round_trip("2026-07-01", "2026-07-14", min_stay=14, max_stay=28)
+"""
+
+import os
+import threading
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.history_store import HistoryStore
+from utils.schema import ALIASES
+
+_NO_STAY = -1              # aller simple (ou agrégat de rétention, sans date retour)
+_REBUILD_SHARE = 0.25      # au-delà de cette part de cases modifiées, on reconstruit l'arbre
+
+
+def _pow2(n: int) -> int:
+    return 1 << max(int(n) - 1, 0).bit_length()
+
+
+def _nodes(size: int, lo: int, hi: int) -> list:
+    """Nœuds couvrant les feuilles lo..hi (incluses), de gauche à droite."""
+    lo, hi = lo + size, hi + size + 1
+    left, right = [], []
+    while lo < hi:
+        if lo & 1:
+            left.append(lo)
+            lo += 1
+        if hi & 1:
+            hi -= 1
+            right.append(hi)
+        lo >>= 1
+        hi >>= 1
+    return left + right[::-1]
+
+
+class RangeMin:
+    """
+    Arbre de segments (minimum) sur un tableau 1D, ou 2D (arbre d'arbres) :
+    minimum d'une plage / d'un rectangle en O(log n) (O(log n · log m) en 2D),
+    affectation d'une case au même coût. Case vide = +inf.
+    """
+
+    def __init__(self, values):
+        values = np.asarray(values, dtype="float64")
+        if values.ndim == 1:
+            values = values[:, None]
+        self.shape = values.shape
+        self._n, self._m = _pow2(values.shape[0]), _pow2(values.shape[1])
+        tree = np.full((2 * self._n, 2 * self._m), np.inf)
+        tree[self._n:self._n + values.shape[0], self._m:self._m + values.shape[1]] = values
+        # Arbres des colonnes (lignes feuilles), puis lignes internes = minimum de leurs deux filles
+        s = self._m // 2
+        while s >= 1:
+            tree[self._n:, s:2 * s] = np.minimum(tree[self._n:, 2 * s:4 * s:2], tree[self._n:, 2 * s + 1:4 * s:2])
+            s //= 2
+        s = self._n // 2
+        while s >= 1:
+            tree[s:2 * s] = np.minimum(tree[2 * s:4 * s:2], tree[2 * s + 1:4 * s:2])
+            s //= 2
+        self._tree = tree
+
+    def _spans(self, rows: tuple, cols: tuple) -> Optional[tuple]:
+        r_lo, r_hi = max(rows[0], 0), min(rows[1], self.shape[0] - 1)
+        c_lo, c_hi = max(cols[0], 0), min(cols[1], self.shape[1] - 1)
+        if r_lo > r_hi or c_lo > c_hi:
+            return None
+        return _nodes(self._n, r_lo, r_hi), _nodes(self._m, c_lo, c_hi)
+
+    def query(self, rows: tuple, cols: tuple = (0, 0)) -> float:
+        """Minimum sur les lignes rows[0]..rows[1] et colonnes cols[0]..cols[1] (bornes incluses)."""
+        spans = self._spans(rows, cols)
+        if spans is None:
+            return np.inf
+        return float(self._tree[np.ix_(*spans)].min())
+
+    def argmin(self, rows: tuple, cols: tuple = (0, 0)) -> Optional[Tuple[float, int, int]]:
+        """(minimum, ligne, colonne) de la première case minimale (ordre ligne puis colonne), None si vide."""
+        spans = self._spans(rows, cols)
+        if spans is None:
+            return None
+        row_nodes, col_nodes = spans
+        block = self._tree[np.ix_(row_nodes, col_nodes)]
+        best = float(block.min())
+        if not np.isfinite(best):
+            return None
+        tree = self._tree
+        # Descente : ligne (en gardant le rectangle de colonnes), puis colonne dans la ligne trouvée
+        r = row_nodes[int(np.flatnonzero(block.min(axis=1) == best)[0])]
+        while r < self._n:
+            r = 2 * r if tree[2 * r, col_nodes].min() == best else 2 * r + 1
+        c = next(c for c in col_nodes if tree[r, c] == best)
+        while c < self._m:
+            c = 2 * c if tree[r, 2 * c] == best else 2 * c + 1
+        return best, r - self._n, c - self._m
+
+    def __getitem__(self, index) -> float:
+        i, j = index if isinstance(index, tuple) else (index, 0)
+        return float(self._tree[self._n + i, self._m + j])
+
+    def leaves(self) -> np.ndarray:
+        return self._tree[self._n:self._n + self.shape[0], self._m:self._m + self.shape[1]].copy()
+
+    def update(self, i: int, j: int, value: float):
+        """Affecte la case (i, j) et remonte ses ancêtres."""
+        tree = self._tree
+        r, c = self._n + i, self._m + j
+        tree[r, c] = value
+        path = [c]
+        c >>= 1
+        while c >= 1:
+            tree[r, c] = min(tree[r, 2 * c], tree[r, 2 * c + 1])
+            path.append(c)
+            c >>= 1
+        path = np.array(path)
+        r >>= 1
+        while r >= 1:
+            tree[r, path] = np.minimum(tree[2 * r, path], tree[2 * r + 1, path])
+            r >>= 1
+
+
+class Fare(NamedTuple):
+    price: float
+    outbound_date: pd.Timestamp
+    return_date: Optional[pd.Timestamp]   # None pour le calendrier
+
+
+def _days(values) -> np.ndarray:
+    """Dates → numéro de jour depuis 1970-01-01 (int64)."""
+    return np.asarray(pd.to_datetime(values), dtype="datetime64[D]").astype(np.int64)
+
+
+def _day(value) -> int:
+    return int(pd.Timestamp(value).to_datetime64().astype("datetime64[D]").astype(np.int64))
+
+
+def _date(day: int) -> pd.Timestamp:
+    return pd.Timestamp(np.datetime64(int(day), "D"))
+
+
+def _latest_min(rows: pd.DataFrame, keys: list) -> pd.DataFrame:
+    """Par clé : jour de la collecte la plus récente et prix minimum ce jour-là."""
+    latest = rows.groupby(keys, sort=False)["day"].transform("max")
+    return rows[rows["day"] == latest].groupby(keys, sort=False).agg(day=("day", "first"), price=("price", "min"))
+
+
+class FareIndex:
+
+    def __init__(self, route: str, store: Optional[HistoryStore] = None):
+        from config.settings import HISTORY_STORE_DIR
+
+        self.route = route.upper()
+        self.store = store or HistoryStore(HISTORY_STORE_DIR)
+        self._parts = {}                                       # fichier → (mtime, cases du fichier)
+        self._covering: Dict[int, set] = {}                    # jour aller → fichiers qui le couvrent
+        self._calendar: Dict[int, float] = {}                  # jour aller → prix
+        self._calendar_day: Dict[int, int] = {}                # jour aller → jour de la collecte retenue
+        self._stays: Dict[Tuple[int, int], float] = {}         # (jour aller, séjour) → prix
+        self._stays_day: Dict[Tuple[int, int], int] = {}       # (jour aller, séjour) → jour de collecte
+        self._origin = 0                                       # jour aller de la ligne 0
+        self._by_day = RangeMin(np.full(1, np.inf))
+        self._by_stay = RangeMin(np.full((1, 1), np.inf))
+        self._lock = threading.Lock()
+
+    # ------------------------
+    # Mise à jour
+    # ------------------------
+    def _read(self, path: str, dataset: str, day: str) -> pd.DataFrame:
+        """Cases d'un fichier : (jour de collecte, jour aller, séjour, prix min)."""
+        columns = ["outbound_date", "return_date", "price"] if dataset == "itineraries" else ["outbound_date", "price_min"]
+        try:
+            part = pd.read_parquet(path, columns=columns, engine="pyarrow")
+        except (KeyError, ValueError):
+            part = pd.read_parquet(path, engine="pyarrow").rename(columns=ALIASES).reindex(columns=columns)
+        part = part.rename(columns={"price_min": "price"}).dropna(subset=["outbound_date", "price"])
+        outbound = _days(part["outbound_date"])
+        if "return_date" in part:
+            returns = part["return_date"]
+            stay = np.where(returns.isna().to_numpy(), _NO_STAY, _days(returns) - outbound)
+        else:
+            stay = np.full(len(part), _NO_STAY)
+        cells = pd.DataFrame({
+            "day": _day(day),
+            "outbound": outbound,
+            "stay": stay.astype(np.int64),
+            "price": part["price"].astype("float64").to_numpy(),
+        })
+        return cells.groupby(["day", "outbound", "stay"], as_index=False, sort=False)["price"].min()
+
+    def refresh(self) -> tuple:
+        """Relit les fichiers nouveaux ou modifiés du store ; renvoie (fichiers relus, fichiers retirés)."""
+        with self._lock:
+            current = {
+                path: (dataset, day, os.path.getmtime(path))
+                for dataset in ("itineraries", "rollups")
+                for _, day, path in self.store.files(dataset, [self.route])
+            }
+            stale = [p for p, (mtime, _) in self._parts.items() if p not in current or current[p][2] != mtime]
+            calendar, stays = {}, {}
+            if stale:
+                self._remove(stale, calendar, stays)
+            fresh = [p for p in current if p not in self._parts]
+            added = []
+            for path in fresh:
+                dataset, day, mtime = current[path]
+                cells = self._read(path, dataset, day)
+                self._parts[path] = (mtime, cells)
+                for d in pd.unique(cells["outbound"]):
+                    self._covering.setdefault(int(d), set()).add(path)
+                added.append(cells)
+            if added:
+                self._absorb(pd.concat(added, ignore_index=True), calendar, stays)
+            if calendar or stays:
+                self._update_trees(calendar, stays)
+            return len(fresh), sum(p not in current for p in stale)
+
+    @staticmethod
+    def _keep(known: dict, known_day: dict, key, day: int, price: float, changed: dict):
+        """Règle « collecte la plus récente » pour une case : plus récente → remplace, même jour → minimum."""
+        current = known_day.get(key)
+        if current is not None and day < current:
+            return
+        if current == day:
+            price = min(price, known[key])
+        known[key], known_day[key] = price, day
+        changed[key] = price
+
+    def _absorb(self, cells: pd.DataFrame, calendar: dict, stays: dict):
+        """Intègre les cases de fichiers ajoutés, sans relire les autres (O(cases ajoutées))."""
+        if cells.empty:
+            return
+        for d, day, price in _latest_min(cells, ["outbound"]).itertuples(name=None):
+            self._keep(self._calendar, self._calendar_day, int(d), int(day), float(price), calendar)
+        trips = cells[cells["stay"] >= 0]
+        if trips.empty:
+            return
+        for (d, stay), day, price in _latest_min(trips, ["outbound", "stay"]).itertuples(name=None):
+            self._keep(self._stays, self._stays_day, (int(d), int(stay)), int(day), float(price), stays)
+
+    def _remove(self, paths: list, calendar: dict, stays: dict):
+        """
+        Retire des fichiers supprimés ou réécrits : seules les dates aller qu'ils couvraient
+        sont recalculées, à partir des seuls fichiers qui couvrent encore ces dates.
+        """
+        days = set()
+        for path in paths:
+            cells = self._parts.pop(path)[1]
+            for d in pd.unique(cells["outbound"]):
+                d = int(d)
+                days.add(d)
+                self._covering[d].discard(path)
+                if not self._covering[d]:
+                    del self._covering[d]
+        for d in days:
+            self._calendar.pop(d, None)
+            self._calendar_day.pop(d, None)
+            calendar[d] = np.inf
+        for key in [k for k in self._stays if k[0] in days]:
+            del self._stays[key], self._stays_day[key]
+            stays[key] = np.inf
+
+        covering = {p for d in days for p in self._covering.get(d, ())}
+        if covering:
+            cells = pd.concat([self._parts[p][1] for p in covering], ignore_index=True)
+            self._absorb(cells[cells["outbound"].isin(list(days))], calendar, stays)
+
+    def _update_trees(self, calendar: dict, stays: dict):
+        """Met à jour les cases modifiées dans les arbres (+inf = case vidée), ou les reconstruit."""
+        n_days, n_stays = self._by_stay.shape
+        fits = all(
+            0 <= d - self._origin < n_days for d in calendar
+        ) and all(0 <= d - self._origin < n_days and s < n_stays for d, s in stays)
+        if not fits or len(calendar) + len(stays) > _REBUILD_SHARE * (len(self._calendar) + len(self._stays)):
+            self._rebuild()
+            return
+        for d, price in calendar.items():
+            self._by_day.update(d - self._origin, 0, price)
+        for (d, s), price in stays.items():
+            self._by_stay.update(d - self._origin, s, price)
+
+    def _rebuild(self):
+        """Reconstruit les arbres ; taille arrondie à la puissance de 2 pour absorber les jours suivants."""
+        days = [*self._calendar, *(d for d, _ in self._stays)]
+        if not days:
+            self._origin = 0
+            self._by_day, self._by_stay = RangeMin(np.full(1, np.inf)), RangeMin(np.full((1, 1), np.inf))
+            return
+        self._origin = min(days)
+        n_days = _pow2(max(days) - self._origin + 1)
+        n_stays = _pow2(max((s for _, s in self._stays), default=0) + 1)
+        by_day = np.full(n_days, np.inf)
+        for d, price in self._calendar.items():
+            by_day[d - self._origin] = price
+        by_stay = np.full((n_days, n_stays), np.inf)
+        for (d, s), price in self._stays.items():
+            by_stay[d - self._origin, s] = price
+        self._by_day, self._by_stay = RangeMin(by_day), RangeMin(by_stay)
+
+    # ------------------------
+    # Requêtes
+    # ------------------------
+    def _rows(self, start, end) -> tuple:
+        lo = _day(start) - self._origin if start is not None else 0
+        hi = _day(end) - self._origin if end is not None else self._by_day.shape[0] - 1
+        return lo, hi
+
+    def cheapest(self, start=None, end=None) -> Optional[Fare]:
+        """Départ le moins cher entre `start` et `end` (inclus), tous séjours confondus."""
+        with self._lock:
+            hit = self._by_day.argmin(self._rows(start, end))
+            if hit is None:
+                return None
+            price, row, _ = hit
+            return Fare(price, _date(self._origin + row), None)
+
+    def cheapest_round_trip(self, start=None, end=None, min_stay: int = 0,
+                            max_stay: Optional[int] = None) -> Optional[Fare]:
+        """Aller-retour le moins cher : départ entre `start` et `end`, séjour de `min_stay` à `max_stay` jours."""
+        with self._lock:
+            cols = (max(min_stay, 0), self._by_stay.shape[1] - 1 if max_stay is None else max_stay)
+            hit = self._by_stay.argmin(self._rows(start, end), cols)
+            if hit is None:
+                return None
+            price, row, stay = hit
+            outbound = _date(self._origin + row)
+            return Fare(price, outbound, outbound + pd.Timedelta(days=stay))
+
+    def fare(self, outbound_date, return_date=None) -> Optional[float]:
+        """Prix d'une case (date aller, ou couple aller × retour) ; None si inconnu."""
+        with self._lock:
+            if return_date is None:
+                return self._calendar.get(_day(outbound_date))
+            day = _day(outbound_date)
+            return self._stays.get((day, _day(return_date) - day))
+
+    def calendar(self, start=None, end=None) -> pd.Series:
+        """Prix minimum par date aller connue entre `start` et `end` (inclus)."""
+        with self._lock:
+            lo, hi = self._rows(start, end)
+            lo, hi = max(lo, 0), min(hi, self._by_day.shape[0] - 1)
+            prices = self._by_day.leaves()[lo:hi + 1, 0] if lo <= hi else np.empty(0)
+            known = np.isfinite(prices)
+            dates = (np.arange(lo, lo + len(prices)) + self._origin).astype("datetime64[D]")
+            return pd.Series(prices[known], index=pd.DatetimeIndex(dates[known], name="outbound_date"), name="price_min")
@@ -0,0 +1,187 @@
+"""
+utils/fare_planner.py
+Recherche du tarif minimum sous budget d'appels API (« coarse-to-fine »)
+
+1. Échantillonnage grossier : points répartis au maximum dans la fenêtre
+   (dates aller, ou grille aller × durée de séjour pour l'aller-retour).
+2. Raffinement : on suppose que le prix varie d'au plus L €/jour entre deux
+   dates voisines (L estimé sur les prix observés). Chaque point non testé a
+   alors une borne basse ; on interroge en priorité les points dont la borne
+   est la plus basse, c'est-à-dire les voisinages des meilleurs prix.
+3. Arrêt quand le budget est épuisé ou quand, selon cette pente estimée, plus
+   aucun point ne peut battre le meilleur prix trouvé. L est estimé sur un
+   échantillon : les points élagués sont probablement, pas certainement, plus chers.
+
+`fetch_prices` renvoie pour chaque point interrogé son prix, None (aucun vol) ou
+FAILED (appel émis mais en échec : le point reste inconnu et pourra être réessayé).
+Un point absent de la réponse n'a pas été interrogé (collecte interrompue, ex.
+disjoncteur ouvert) : il ne compte pas dans les appels, et un lot sans aucun point
+interrogé arrête la recherche. Tant qu'aucun prix n'est connu, l'échantillonnage
+grossier continue.
+"""
+
+import math
+from typing import Callable, Dict, Hashable, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+FAILED = object()   # réponse de `fetch_prices` pour un appel émis mais en échec
+
+
+class PlanResult(NamedTuple):
+    best_point: Optional[Hashable]
+    best_price: Optional[float]
+    prices: Dict[Hashable, Optional[float]]   # tous les points interrogés
+    calls: int                                # appels réellement émis (échecs compris)
+    confidence: float                         # part de la fenêtre testée ou exclue par la borne
+    converged: bool                           # True si, selon la pente estimée, aucun point restant
+                                              # ne peut battre le meilleur (heuristique, pas une preuve)
+    lipschitz: float                          # pente max estimée (€/jour)
+
+
+def _farthest_points(coords: np.ndarray, k: int, chosen: List[int]) -> List[int]:
+    """Ajoute à `chosen` des points maximisant la distance aux points déjà choisis."""
+    chosen = list(chosen)
+    if not chosen:
+        chosen.append(0)
+    dist = np.min(np.abs(coords[:, None, :] - coords[chosen][None, :, :]).sum(axis=2), axis=1)
+    while len(chosen) < k:
+        nxt = int(np.argmax(dist))
+        if dist[nxt] == 0:
+            break
+        chosen.append(nxt)
+        dist = np.minimum(dist, np.abs(coords - coords[nxt]).sum(axis=1))
+    return chosen
+
+
+def _estimate_lipschitz(coords: np.ndarray, idx: List[int], prices: np.ndarray, floor: float) -> float:
+    """Pente max observée entre chaque point connu et son plus proche voisin connu."""
+    known = [i for i in idx if np.isfinite(prices[i])]
+    if len(known) < 2:
+        return floor
+    pts = coords[known]
+    d = np.abs(pts[:, None, :] - pts[None, :, :]).sum(axis=2).astype(float)
+    np.fill_diagonal(d, np.inf)
+    nearest = np.argmin(d, axis=1)
+    slopes = np.abs(prices[known] - prices[known][nearest]) / d[np.arange(len(known)), nearest]
+    return max(float(slopes.max()), floor)
+
+
+def plan_fare_search(
+    points: Sequence[Hashable],
+    coords: Sequence[Sequence[float]],
+    fetch_prices: Callable[[List[Hashable]], Dict[Hashable, Optional[float]]],
+    budget: int,
+    known: Optional[Dict[Hashable, Optional[float]]] = None,
+    coarse: Optional[int] = None,
+    batch_size: int = 1,
+    safety: float = 1.5,
+    min_slope: float = 5.0,
+) -> PlanResult:
+    """
+    `points`       : identifiants (date, ou (aller, retour))
+    `coords`       : coordonnées en jours de chaque point (1D ou 2D)
+    `fetch_prices` : interroge une liste de points, renvoie {point: prix min, None ou FAILED}
+                     (appelée par lots de `batch_size` pour profiter de la concurrence)
+    `known`        : prix déjà disponibles (cache, collecte du jour) — gratuits
+    `coarse`       : taille de l'échantillonnage grossier (2·√n par défaut) ; elle ne dépend
+                     pas du budget, si bien qu'un budget plus grand prolonge la même suite
+                     d'appels et ne peut pas trouver un prix moins bon
+    Un échec (FAILED) n'est pas compté comme « sans vol » ; un point absent n'a pas été interrogé.
+    """
+    n = len(points)
+    coords = np.asarray(coords, dtype=float).reshape(n, -1)
+    prices = np.full(n, np.nan)
+    sampled = []
+    failed = set()   # points dont l'appel a échoué : inconnus, réessayés en dernier
+    index = {p: i for i, p in enumerate(points)}
+    calls = 0
+    stopped = False  # `fetch_prices` n'interroge plus rien (collecte interrompue)
+
+    for p, price in (known or {}).items():
+        if p in index:
+            prices[index[p]] = np.inf if price is None else price
+            sampled.append(index[p])
+
+    def query(idx: List[int]):
+        nonlocal calls, stopped
+        idx = [i for i in idx if i not in sampled][: max(budget - calls, 0)]
+        if not idx:
+            return
+        found = fetch_prices([points[i] for i in idx])
+        attempted = [i for i in idx if points[i] in found]
+        calls += len(attempted)
+        stopped = not attempted
+        for i in attempted:
+            price = found[points[i]]
+            if price is FAILED:
+                failed.add(i)
+                continue
+            prices[i] = np.inf if price is None else price
+            sampled.append(i)
+            failed.discard(i)
+
+    def explore(remaining: np.ndarray):
+        """Points les plus éloignés des points déjà tentés (les échecs ne sont repris qu'en dernier)."""
+        size = max(batch_size, 1)
+        tried = sampled + sorted(failed)
+        fresh = [i for i in _farthest_points(coords, min(n, len(tried) + size), tried)
+                 if i not in failed and i not in sampled]
+        query(fresh or sorted(failed)[:size] or remaining[:size].tolist())
+
+    # 1. Échantillonnage grossier
+    coarse = max(2, int(math.ceil(2 * math.sqrt(n)))) if coarse is None else coarse
+    seeds = _farthest_points(coords, min(n, len(sampled) + coarse), sampled)
+    todo = [i for i in seeds if i not in sampled]
+    for start in range(0, len(todo), max(batch_size, 1)):
+        query(todo[start:start + batch_size])
+        if stopped:
+            break
+
+    # 2. Raffinement autour des meilleurs prix
+    lipschitz, converged = min_slope, False
+    while not stopped:
+        finite = [i for i in sampled if np.isfinite(prices[i])]
+        remaining = np.array([i for i in range(n) if i not in sampled], dtype=int)
+        if remaining.size == 0:
+            converged = True
+            break
+        if calls >= budget:
+            break
+        if not finite:
+            # Rien de connu (échecs ou aucun vol) : on continue d'échantillonner la fenêtre
+            explore(remaining)
+            continue
+        lipschitz = safety * _estimate_lipschitz(coords, sampled, prices, min_slope)
+        best = float(np.min(prices[finite]))
+        dist = np.abs(coords[remaining][:, None, :] - coords[finite][None, :, :]).sum(axis=2)
+        lower = np.max(prices[finite][None, :] - lipschitz * dist, axis=1)
+        promising = remaining[lower < best]
+        if promising.size == 0:
+            converged = True   # selon la pente estimée : les points restants sont élagués
+            break
+        order = promising[np.argsort(lower[lower < best], kind="stable")]
+        query(order[:max(batch_size, 1)].tolist())
+
+    finite = [i for i in sampled if np.isfinite(prices[i])]
+    if not finite:
+        return PlanResult(None, None, {points[i]: None for i in sampled}, calls, 0.0, False, lipschitz)
+
+    best_i = min(finite, key=lambda i: prices[i])
+    best = float(prices[best_i])
+    remaining = [i for i in range(n) if i not in sampled]
+    excluded = 0
+    if remaining:
+        dist = np.abs(coords[remaining][:, None, :] - coords[finite][None, :, :]).sum(axis=2)
+        lower = np.max(prices[finite][None, :] - lipschitz * dist, axis=1)
+        excluded = int((lower >= best).sum())
+
+    return PlanResult(
+        best_point=points[best_i],
+        best_price=best,
+        prices={points[i]: (None if not np.isfinite(prices[i]) else float(prices[i])) for i in sampled},
+        calls=calls,
+        confidence=round((len(sampled) + excluded) / n, 3),
+        converged=converged,
+        lipschitz=round(lipschitz, 2),
+    )
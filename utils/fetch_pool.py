@@ -0,0 +1,40 @@
+"""
+utils/fetch_pool.py
+Exécution concurrente des appels SerpAPI avec plafond de concurrence
+et limiteur de débit partagé.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable, Iterator, Optional, Tuple, Any
+
+from utils.rate_limit import TokenBucket
+
+
+def fetch_concurrently(
+    jobs: Iterable,
+    fetch: Callable[[Any], Any],
+    max_workers: int = 4,
+    limiter: Optional[TokenBucket] = None,
+) -> Iterator[Tuple[Any, Any, Optional[Exception]]]:
+    """
+    Lance `fetch(job)` pour chaque job dans un pool de threads.
+    Produit (job, résultat, erreur) dès qu'un job se termine, dans l'ordre
+    d'arrivée : l'appelant peut afficher la progression au fil de l'eau.
+    """
+    def _run(job):
+        if limiter is not None:
+            limiter.acquire()
+        return fetch(job)
+
+    pool = ThreadPoolExecutor(max_workers=max(1, int(max_workers)))
+    try:
+        futures = {pool.submit(_run, job): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                yield job, future.result(), None
+            except Exception as e:
+                yield job, None, e
+    finally:
+        # Si l'appelant s'arrête en cours de route, on n'attend pas les jobs restants
+        pool.shutdown(wait=False, cancel_futures=True)
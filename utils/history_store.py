@@ -0,0 +1,273 @@
+"""
+utils/history_store.py
+Historique des prix en Parquet, partitionné par route et date de collecte :
+
+    data/store/<dataset>/route=CDG-ABJ/collection_date=2025-10-21/part-<nom>.parquet
+
+- types du schéma canonique (utils/schema.py), appliqués une fois à l'écriture
+- `append` : écrit une partition (ou un fichier nommé, réécrit s'il existe) ;
+  chaque fichier `itineraries` est accompagné de son fichier `cube` (utils/cube.py)
+- `read`   : ne lit que les partitions de la route / période demandées
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import uuid
+from datetime import date, datetime
+from typing import Iterable, Optional, Union
+
+import pandas as pd
+
+from utils import cube
+from utils.schema import ALIASES, SCHEMAS, conform, normalize, split_flat
+
+DateLike = Union[str, date, datetime]
+
+
+def _day(value: DateLike) -> str:
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)[:10]
+
+
+class HistoryStore:
+
+    def __init__(self, root: str = "data/store"):
+        self.root = root
+
+    def _partition(self, dataset: str, route: str, collection_date: DateLike) -> str:
+        return os.path.join(
+            self.root, dataset, f"route={route.upper()}", f"collection_date={_day(collection_date)}"
+        )
+
+    # ------------------------
+    # Écriture
+    # ------------------------
+    def append(self, df: pd.DataFrame, dataset: str, route: str, collection_date: DateLike,
+               part_name: Optional[str] = None, replace: bool = False) -> str:
+        """
+        Ajoute `df` à la partition (route, collection_date).
+        `part_name` : nom stable du fichier (réécrit s'il existe déjà, ex. un job de lot)
+        `replace`   : vide d'abord la partition (collecte journalière relancée)
+        """
+        part_dir = self._partition(dataset, route, collection_date)
+        if replace and os.path.isdir(part_dir):
+            shutil.rmtree(part_dir)
+        os.makedirs(part_dir, exist_ok=True)
+        name = part_name or f"{datetime.now():%H%M%S}-{uuid.uuid4().hex[:8]}"
+        path = os.path.join(part_dir, f"part-{name}.parquet")
+        df = normalize(df, dataset)
+        df.to_parquet(path + ".tmp", index=False, engine="pyarrow")
+        os.replace(path + ".tmp", path)
+        if dataset == "itineraries":
+            # Agrégats maintenus à l'écriture, même nom de fichier
+            self.append(cube.aggregate(df), "cube", route, collection_date, part_name=name, replace=replace)
+        return path
+
+    def has_part(self, dataset: str, route: str, collection_date: DateLike, part_name: str) -> bool:
+        return os.path.exists(os.path.join(self._partition(dataset, route, collection_date), f"part-{part_name}.parquet"))
+
+    def sibling(self, path: str, dataset: str) -> str:
+        """Fichier de même nom et même partition dans un autre jeu de données."""
+        rel = os.path.relpath(path, self.root).split(os.sep, 1)[1]
+        return os.path.join(self.root, dataset, rel)
+
+    def build_cubes(self, routes: Optional[Iterable[str]] = None) -> int:
+        """
+        Complète le cube des fichiers écrits avant lui (itinéraires, ou agrégats de
+        rétention pour les jours dont les relevés bruts ont disparu). Renvoie le nombre de fichiers.
+        """
+        built = 0
+        for route, day, path in self.files("itineraries", routes):
+            if not os.path.exists(self.sibling(path, "cube")):
+                name = os.path.basename(path)[len("part-"):-len(".parquet")]
+                part = pd.read_parquet(path, engine="pyarrow")
+                self.append(cube.aggregate(part), "cube", route, day, part_name=name)
+                built += 1
+        for route, day, part_dir in self.partitions("rollups", routes):
+            if not os.path.isdir(self._partition("cube", route, day)):
+                agg = self.read("rollups", routes=[route], start=day, end=day)
+                self.append(cube.from_rollups(agg), "cube", route, day, part_name="rollups")
+                built += 1
+        return built
+
+    def append_flights(self, itineraries: pd.DataFrame, segments: pd.DataFrame, route: str,
+                       collection_date: DateLike, part_name: Optional[str] = None,
+                       replace: bool = False) -> str:
+        """Écrit une collecte : table `itineraries` + table fille `segments`, même nom de fichier."""
+        name = part_name or f"{datetime.now():%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self.append(segments, "segments", route, collection_date, part_name=name, replace=replace)
+        return self.append(itineraries, "itineraries", route, collection_date, part_name=name, replace=replace)
+
+    def drop(self, dataset: str, route: str, collection_date: DateLike) -> bool:
+        """Supprime une partition entière ; renvoie False si elle n'existait pas."""
+        part_dir = self._partition(dataset, route, collection_date)
+        if not os.path.isdir(part_dir):
+            return False
+        shutil.rmtree(part_dir)
+        return True
+
+    # ------------------------
+    # Lecture
+    # ------------------------
+    def partitions(self, dataset: str, routes: Optional[Iterable[str]] = None,
+                   start: Optional[DateLike] = None, end: Optional[DateLike] = None) -> list:
+        """(route, collection_date, dossier) des partitions retenues, triées par date."""
+        base = os.path.join(self.root, dataset)
+        if not os.path.isdir(base):
+            return []
+        wanted = {r.upper() for r in routes} if routes else None
+        start, end = (_day(start) if start else None), (_day(end) if end else None)
+        found = []
+        for route_dir in os.listdir(base):
+            if not route_dir.startswith("route="):
+                continue
+            route = route_dir[len("route="):]
+            if wanted is not None and route not in wanted:
+                continue
+            for day_dir in os.listdir(os.path.join(base, route_dir)):
+                if not day_dir.startswith("collection_date="):
+                    continue
+                day = day_dir[len("collection_date="):]
+                if (start and day < start) or (end and day > end):
+                    continue
+                found.append((route, day, os.path.join(base, route_dir, day_dir)))
+        return sorted(found, key=lambda p: (p[1], p[0]))
+
+    def files(self, dataset: str, routes: Optional[Iterable[str]] = None,
+              start: Optional[DateLike] = None, end: Optional[DateLike] = None) -> list:
+        """(route, collection_date, fichier parquet) des partitions retenues."""
+        return [
+            (route, day, os.path.join(part_dir, f))
+            for route, day, part_dir in self.partitions(dataset, routes, start, end)
+            for f in sorted(os.listdir(part_dir))
+            if f.endswith(".parquet")
+        ]
+
+    def read(self, dataset: str, routes: Optional[Iterable[str]] = None,
+             start: Optional[DateLike] = None, end: Optional[DateLike] = None,
+             columns: Optional[list] = None) -> pd.DataFrame:
+        """Lit les partitions (route, date de collecte) demandées ; bornes incluses."""
+        schema = SCHEMAS[dataset]
+        file_columns = [c for c in columns if c in schema] if columns else None
+        frames = []
+        for route, day, path in self.files(dataset, routes, start, end):
+            try:
+                part = pd.read_parquet(path, columns=file_columns, engine="pyarrow")
+            except (KeyError, ValueError):
+                # Fichier écrit avant le schéma canonique (anciens noms de colonnes)
+                part = pd.read_parquet(path, engine="pyarrow").rename(columns=ALIASES)
+                part = part.reindex(columns=file_columns or list(schema))
+            part["route"] = route
+            part["collection_date"] = day
+            frames.append(part)
+
+        if not frames:
+            empty = conform(normalize(pd.DataFrame(), dataset).assign(route=pd.NA, collection_date=pd.NA), dataset)
+            return empty[columns] if columns else empty
+
+        # Catégories différentes d'un fichier à l'autre → object après concat : on reconvertit
+        data = conform(pd.concat(frames, ignore_index=True), dataset)
+        return data[columns] if columns else data
+
+    def fingerprint(self, datasets: Iterable[str] = ("itineraries", "rollups"),
+                    routes: Optional[Iterable[str]] = None) -> str:
+        """Empreinte bon marché (liste des fichiers + mtime + taille) : change à chaque écriture."""
+        digest = hashlib.sha1()
+        for dataset in datasets:
+            for _, _, part_dir in self.partitions(dataset, routes):
+                for entry in sorted(os.scandir(part_dir), key=lambda e: e.name):
+                    if entry.name.endswith(".parquet"):
+                        stat = entry.stat()
+                        digest.update(f"{entry.path}|{stat.st_mtime_ns}|{stat.st_size}\n".encode())
+        return digest.hexdigest()
+
+    def latest_collection(self, dataset: str, route: Optional[str] = None) -> Optional[str]:
+        parts = self.partitions(dataset, [route] if route else None)
+        return parts[-1][1] if parts else None
+
+    def is_empty(self, dataset: str) -> bool:
+        return not self.partitions(dataset)
+
+
+# ------------------------
+# Import des anciens CSV
+# ------------------------
+LEGACY_PATTERNS = [
+    # (dossier, regex du nom de fichier, format, route par défaut)
+    # "flat" : une ligne par segment, prix recopié → scindé en itinéraires + segments
+    ("output", re.compile(r"^vols_paris_abidjan_(\d{4}-\d{2}-\d{2})\.csv$"), "flat", "CDG-ABJ"),
+    ("output", re.compile(r"^vols_abj_paris_juillet_(\d{4}-\d{2}-\d{2})\.csv$"), "itineraries", "ABJ-CDG"),
+    ("data/raw", re.compile(r"^flights_([A-Z]{3}-[A-Z]{3})_(\d{4}-\d{2}-\d{2})\.csv$"), "flat", None),
+]
+
+
+def _store_legacy(store: HistoryStore, df: pd.DataFrame, kind: str, route: str, day: str, name: str):
+    if kind == "flat":
+        itin, seg = split_flat(df, destination=route.split("-")[-1])
+        store.append_flights(itin, seg, route, day, part_name=name)
+    else:
+        store.append(df, kind, route, day, part_name=name)
+
+
+def import_legacy_csvs(store: HistoryStore, base_dir: str = ".") -> list:
+    """
+    Importe les CSV journaliers historiques (un fichier du store par CSV).
+    Un CSV déjà importé n'est pas réécrit : un second appel ne touche à rien (ni mtime,
+    ni empreinte du store). Les fichiers `..._retour_...csv` de fetch_serapi.py n'ont pas
+    de date de collecte : ignorés.
+    """
+    imported = []
+    for folder, pattern, kind, default_route in LEGACY_PATTERNS:
+        path = os.path.join(base_dir, folder)
+        if not os.path.isdir(path):
+            continue
+        for f in sorted(os.listdir(path)):
+            match = pattern.match(f)
+            if not match:
+                continue
+            route = default_route or match.group(1)
+            day = match.groups()[-1]
+            name = f"legacy-{os.path.splitext(f)[0]}"
+            if store.has_part("itineraries", route, day, name):
+                continue
+            df = pd.read_csv(os.path.join(path, f))
+            if df.empty:
+                continue
+            _store_legacy(store, df, kind, route, day, name)
+            imported.append(os.path.join(folder, f))
+
+    # Partitions CSV du collecteur par lots (data/raw/route=.../search_date=.../*.csv)
+    raw = os.path.join(base_dir, "data/raw")
+    if os.path.isdir(raw):
+        for route_dir in sorted(os.listdir(raw)):
+            if not route_dir.startswith("route="):
+                continue
+            for day_dir in sorted(os.listdir(os.path.join(raw, route_dir))):
+                folder = os.path.join(raw, route_dir, day_dir)
+                route, day = route_dir[6:], day_dir.split("=", 1)[1]
+                for f in sorted(os.listdir(folder)):
+                    name = f"legacy-{os.path.splitext(f)[0]}"
+                    if f.endswith(".csv") and not store.has_part("itineraries", route, day, name):
+                        df = pd.read_csv(os.path.join(folder, f))
+                        _store_legacy(store, df, "flat", route, day, name)
+                        imported.append(os.path.join(folder, f))
+    return imported
+
+
+def upgrade_flat_partitions(store: HistoryStore) -> int:
+    """
+    Fichiers `segments` écrits à plat (prix recopié sur chaque vol, avant la table
+    `itineraries`) : scindés et réécrits sous le même nom. Renvoie le nombre de fichiers.
+    """
+    upgraded = 0
+    for route, day, path in store.files("segments"):
+        df = pd.read_parquet(path, engine="pyarrow")
+        if "price" not in df.columns:
+            continue
+        name = os.path.basename(path)[len("part-"):-len(".parquet")]
+        _store_legacy(store, df, "flat", route, day, name)
+        upgraded += 1
+    return upgraded
@@ -0,0 +1,192 @@
+"""
+utils/merge_manifest.py
+Manifeste des fichiers déjà fusionnés + index persistant des lignes déjà écrites.
+
+- `changed(paths)` : ne renvoie que les fichiers nouveaux ou modifiés
+  (taille/mtime d'abord, hash sha256 seulement si l'un des deux a bougé)
+- `new_rows(df)`   : garde les lignes dont la clé n'a jamais été vue (simple lecture)
+- `record(state, written)` : enregistre le fichier et les clés des lignes écrites,
+  dans la même transaction, une fois le CSV écrit ; chaque clé garde son fichier
+  d'origine, ce qui permet de retirer les anciennes lignes d'un fichier réécrit
+- `forget(paths)`  : oublie des fichiers disparus du store (et leurs clés)
+
+Une seule base SQLite, comme le cache des réponses et l'index de l'archive.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path        TEXT PRIMARY KEY,
+    size        INTEGER NOT NULL,
+    mtime       REAL NOT NULL,
+    sha256      TEXT NOT NULL,
+    rows        INTEGER NOT NULL,
+    ingested_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS row_keys (
+    key  INTEGER PRIMARY KEY,
+    path TEXT                 -- fichier source (NULL : clé issue d'un compactage)
+) WITHOUT ROWID;
+"""
+
+_CHUNK = 900   # limite de paramètres SQLite par requête
+
+
+class FileState(NamedTuple):
+    path: str
+    size: int
+    mtime: float
+    sha256: str
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def row_keys(df: pd.DataFrame) -> np.ndarray:
+    """
+    Clé 64 bits par ligne, stockable telle quelle en INTEGER SQLite.
+    Calculée sur le texte des valeurs : identique que la ligne vienne du store typé ou d'un CSV relu.
+    """
+    as_text = df.astype("string").fillna("")
+    return pd.util.hash_pandas_object(as_text, index=False).to_numpy().view(np.int64)
+
+
+class MergeManifest:
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(row_keys)")]
+        if "path" not in columns:
+            # Manifeste antérieur : clés sans fichier d'origine
+            self._conn.execute("ALTER TABLE row_keys ADD COLUMN path TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_row_keys_path ON row_keys (path)")
+        self._conn.commit()
+
+    # ------------------------
+    # Fichiers
+    # ------------------------
+    def changed(self, paths: Iterable[str]) -> list:
+        """FileState des fichiers à (re)lire ; un simple `touch` ne déclenche pas de relecture."""
+        with self._lock:
+            known = {
+                row[0]: row[1:]
+                for row in self._conn.execute("SELECT path, size, mtime, sha256 FROM files")
+            }
+        todo = []
+        for path in paths:
+            stat = os.stat(path)
+            previous = known.get(path)
+            if previous and previous[0] == stat.st_size and previous[1] == stat.st_mtime:
+                continue
+            digest = file_sha256(path)
+            if previous and previous[2] == digest:
+                with self._lock, self._conn:
+                    self._conn.execute("UPDATE files SET mtime = ? WHERE path = ?", (stat.st_mtime, path))
+                continue
+            todo.append(FileState(path, stat.st_size, stat.st_mtime, digest))
+        return todo
+
+    def record(self, state: FileState, written: pd.DataFrame, key_columns: Optional[list] = None):
+        """
+        À appeler une fois `written` ajouté au CSV : le fichier et les clés de ses lignes
+        sont enregistrés ensemble (les clés de sa version précédente sont remplacées).
+        Un arrêt avant cet appel laisse le fichier « à relire » : rien n'est perdu.
+        """
+        keys = np.unique(row_keys(written[key_columns] if key_columns else written)) if not written.empty else []
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM row_keys WHERE path = ?", (state.path,))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO row_keys (key, path) VALUES (?, ?)", [(int(k), state.path) for k in keys]
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime, sha256, rows, ingested_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (state.path, state.size, state.mtime, state.sha256, len(written), time.time()),
+            )
+
+    def paths(self) -> list:
+        """Fichiers déjà fusionnés."""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT path FROM files")]
+
+    def forget(self, paths: Iterable[str]):
+        """Oublie des fichiers disparus : leurs clés ne comptent plus comme déjà vues."""
+        paths = [(p,) for p in paths]
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM row_keys WHERE path = ?", paths)
+            self._conn.executemany("DELETE FROM files WHERE path = ?", paths)
+
+    def file_keys(self, path: str) -> np.ndarray:
+        """Clés des lignes écrites pour la version précédente de `path` (vide si fichier nouveau)."""
+        with self._lock:
+            rows = self._conn.execute("SELECT key FROM row_keys WHERE path = ?", (path,)).fetchall()
+        return np.array([r[0] for r in rows], dtype=np.int64)
+
+    # ------------------------
+    # Index des lignes
+    # ------------------------
+    def new_rows(self, df: pd.DataFrame, key_columns: Optional[list] = None,
+                 replacing: Optional[str] = None) -> pd.DataFrame:
+        """
+        Lignes de `df` jamais vues (ni dans le fichier, ni dans les fusions précédentes).
+        Simple lecture : les clés ne sont enregistrées que par `record`.
+        `replacing` : fichier dont la version précédente est retirée du CSV (ses clés ne comptent pas).
+        """
+        if df.empty:
+            return df
+        keys = row_keys(df[key_columns] if key_columns else df)
+        first = ~pd.Series(keys).duplicated().to_numpy()
+        candidates = [int(k) for k in keys[first]]
+
+        owner = " AND path IS NOT ?" if replacing else ""
+        with self._lock:
+            seen = set()
+            for i in range(0, len(candidates), _CHUNK):
+                chunk = candidates[i:i + _CHUNK]
+                marks = ",".join("?" * len(chunk))
+                args = [*chunk, replacing] if replacing else chunk
+                seen.update(
+                    row[0] for row in self._conn.execute(f"SELECT key FROM row_keys WHERE key IN ({marks}){owner}", args)
+                )
+
+        keep = first & ~np.isin(keys, np.array(list(seen), dtype=np.int64))
+        return df[keep]
+
+    def reset_keys(self, df: pd.DataFrame, key_columns: Optional[list] = None):
+        """Réaligne l'index sur une sortie compactée (les clés conservées gardent leur fichier)."""
+        keys = np.unique(row_keys(df[key_columns] if key_columns else df)) if not df.empty else []
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS kept (key INTEGER PRIMARY KEY)")
+            self._conn.execute("DELETE FROM kept")
+            self._conn.executemany("INSERT INTO kept (key) VALUES (?)", [(int(k),) for k in keys])
+            self._conn.execute("DELETE FROM row_keys WHERE key NOT IN (SELECT key FROM kept)")
+            self._conn.execute("INSERT OR IGNORE INTO row_keys (key) SELECT key FROM kept")
+            self._conn.execute("DELETE FROM kept")
+
+    def stats(self) -> dict:
+        with self._lock:
+            files, rows = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(rows), 0) FROM files").fetchone()
+            keys = self._conn.execute("SELECT COUNT(*) FROM row_keys").fetchone()[0]
+        return {"files": files, "rows_ingested": rows, "keys": keys}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
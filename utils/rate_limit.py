@@ -0,0 +1,51 @@
+"""
+utils/rate_limit.py
+Limiteur de débit (seau de jetons) partagé entre les threads de collecte
+"""
+
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Seau de jetons thread-safe.
+    `rate` jetons sont ajoutés par seconde, jusqu'à `capacity` (rafale max).
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate doit être strictement positif")
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity is not None else max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Prend des jetons sans attendre ; renvoie False si le seau est vide."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1.0):
+        """Bloque jusqu'à ce que `tokens` jetons soient disponibles."""
+        if tokens > self.capacity:
+            raise ValueError("tokens dépasse la capacité du seau")
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
@@ -0,0 +1,189 @@
+"""
+utils/raw_archive.py
+Archive append-only et compressée des réponses SerpAPI brutes
+- un segment gzip par jour et par processus (un membre gzip par réponse)
+- index SQLite : paramètres, date de collecte, position dans le segment
+- relecture hors-ligne en parallèle (un processus par segment)
+"""
+
+import gzip
+import json
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Callable, Iterator, Optional
+
+import pandas as pd
+
+from utils.response_cache import cache_key, normalize_params
+
+
+class RawArchive:
+
+    def __init__(self, root: str):
+        self.root = root
+        self.index_path = os.path.join(root, "index.sqlite")
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._conn = sqlite3.connect(self.index_path, check_same_thread=False, timeout=30)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS records (
+                id            INTEGER PRIMARY KEY AUTOINCREMENT,
+                key           TEXT NOT NULL,
+                params        TEXT NOT NULL,
+                departure_id  TEXT,
+                arrival_id    TEXT,
+                outbound_date TEXT,
+                return_date   TEXT,
+                fetched_at    TEXT NOT NULL,
+                segment       TEXT NOT NULL,
+                offset        INTEGER NOT NULL,
+                length        INTEGER NOT NULL,
+                is_error      INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_records_key ON records(key, fetched_at)")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_records_route "
+            "ON records(departure_id, arrival_id, outbound_date, fetched_at)"
+        )
+        self._conn.commit()
+
+    # ------------------------
+    # Écriture
+    # ------------------------
+    def append(self, params: dict, response: dict, fetched_at: Optional[datetime] = None) -> int:
+        """Ajoute une réponse brute à l'archive ; renvoie l'id de l'enregistrement."""
+        fetched_at = (fetched_at or datetime.now()).isoformat(timespec="seconds")
+        norm = normalize_params(params)
+        record = {"fetched_at": fetched_at, "params": norm, "response": response}
+        blob = gzip.compress(json.dumps(record, ensure_ascii=False).encode("utf-8"))
+        segment = f"{fetched_at[:10]}-{os.getpid()}.jsonl.gz"
+
+        with self._lock:
+            with open(os.path.join(self.root, segment), "ab") as f:
+                offset = f.tell()
+                f.write(blob)
+            cur = self._conn.execute(
+                "INSERT INTO records (key, params, departure_id, arrival_id, outbound_date, "
+                "return_date, fetched_at, segment, offset, length, is_error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    cache_key(params), json.dumps(norm), norm.get("departure_id"),
+                    norm.get("arrival_id"), norm.get("outbound_date"), norm.get("return_date"),
+                    fetched_at, segment, offset, len(blob), int("error" in response),
+                ),
+            )
+            self._conn.commit()
+            return cur.lastrowid
+
+    # ------------------------
+    # Lecture
+    # ------------------------
+    def _select(self, route: Optional[str] = None, since: Optional[str] = None,
+                until: Optional[str] = None, include_errors: bool = False) -> list:
+        sql = "SELECT segment, offset, length FROM records WHERE 1 = 1"
+        args = []
+        if route:
+            dep, arr = route.upper().split("-")
+            sql += " AND departure_id = ? AND arrival_id = ?"
+            args += [dep, arr]
+        if since:
+            sql += " AND fetched_at >= ?"
+            args.append(since)
+        if until:
+            sql += " AND fetched_at < ?"
+            args.append(until)
+        if not include_errors:
+            sql += " AND is_error = 0"
+        sql += " ORDER BY segment, offset"
+        with self._lock:
+            return self._conn.execute(sql, args).fetchall()
+
+    def records(self, **filters) -> Iterator[dict]:
+        """Itère sur les enregistrements {fetched_at, params, response} filtrés."""
+        for segment, offset, length in self._select(**filters):
+            yield from _read_segment(self.root, segment, [(offset, length)])
+
+    def history(self, params: dict) -> list:
+        """Dates de collecte disponibles pour une recherche donnée."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT fetched_at FROM records WHERE key = ? ORDER BY fetched_at", (cache_key(params),)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    # ------------------------
+    # Relecture hors-ligne
+    # ------------------------
+    def replay(self, extractor: Callable[[dict, dict, str], object],
+               workers: Optional[int] = None, **filters) -> pd.DataFrame:
+        """
+        Applique `extractor(response, params, fetched_at)` à toute l'archive et
+        concatène les résultats (DataFrame ou liste de dicts) en un DataFrame.
+        `extractor` peut aussi être une classe : une instance par segment reçoit
+        chaque enregistrement via `add(response, params, fetched_at)`, puis
+        `frame()` renvoie un seul DataFrame (pas de milliers de petits DataFrames).
+        Les segments sont traités en parallèle ; `extractor` doit être défini au
+        niveau module (picklable).
+        """
+        by_segment = {}
+        for segment, offset, length in self._select(**filters):
+            by_segment.setdefault(segment, []).append((offset, length))
+        if not by_segment:
+            return pd.DataFrame()
+
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(by_segment) == 1:
+            parts = [
+                _extract_segment(self.root, segment, spans, extractor)
+                for segment, spans in sorted(by_segment.items())
+            ]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [
+                    pool.submit(_extract_segment, self.root, segment, spans, extractor)
+                    for segment, spans in sorted(by_segment.items())
+                ]
+                parts = [future.result() for future in futures]
+        return pd.concat(parts, ignore_index=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, first, last = self._conn.execute(
+                "SELECT COUNT(*), MIN(fetched_at), MAX(fetched_at) FROM records"
+            ).fetchone()
+        size = sum(
+            os.path.getsize(os.path.join(self.root, f))
+            for f in os.listdir(self.root) if f.endswith(".jsonl.gz")
+        )
+        return {"records": count, "first": first, "last": last, "size_bytes": size}
+
+
+def _read_segment(root: str, segment: str, spans: list) -> Iterator[dict]:
+    with open(os.path.join(root, segment), "rb") as f:
+        for offset, length in spans:
+            f.seek(offset)
+            yield json.loads(gzip.decompress(f.read(length)))
+
+
+def _extract_segment(root: str, segment: str, spans: list, extractor: Callable) -> pd.DataFrame:
+    if isinstance(extractor, type):
+        accumulator = extractor()
+        for record in _read_segment(root, segment, spans):
+            accumulator.add(record["response"], record["params"], record["fetched_at"])
+        return accumulator.frame()
+    frames, rows = [], []
+    for record in _read_segment(root, segment, spans):
+        out = extractor(record["response"], record["params"], record["fetched_at"])
+        if isinstance(out, pd.DataFrame):
+            frames.append(out)
+        else:
+            rows.extend(out)
+    if rows:
+        frames.append(pd.DataFrame(rows))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
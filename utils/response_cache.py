@@ -0,0 +1,147 @@
+"""
+utils/response_cache.py
+Cache disque des réponses SerpAPI (SQLite + zlib)
+- clé = paramètres normalisés, sans `api_key`
+- TTL par entrée
+- éviction LRU sous un budget de taille disque
+- compteurs hits / misses
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Optional
+
+# Paramètres qui n'influencent pas la réponse et ne doivent pas entrer dans la clé
+IGNORED_PARAMS = {"api_key", "no_cache", "async", "output", "source"}
+
+
+def normalize_params(params: dict) -> dict:
+    """Paramètres canoniques : sans secrets ni valeurs vides, valeurs en texte."""
+    norm = {}
+    for k, v in params.items():
+        if k in IGNORED_PARAMS or v is None or v == "":
+            continue
+        if hasattr(v, "strftime"):
+            v = v.strftime("%Y-%m-%d")
+        v = str(v).strip()
+        if k in ("departure_id", "arrival_id"):
+            v = v.upper()
+        norm[k] = v
+    return dict(sorted(norm.items()))
+
+
+def cache_key(params: dict) -> str:
+    payload = json.dumps(normalize_params(params), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Cache persistant partagé par tous les scripts (un fichier SQLite)."""
+
+    def __init__(self, path: str, default_ttl: float = 6 * 3600, max_bytes: int = 200 * 1024 * 1024):
+        self.path = path
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key         TEXT PRIMARY KEY,
+                params      TEXT NOT NULL,
+                payload     BLOB NOT NULL,
+                size        INTEGER NOT NULL,
+                created_at  REAL NOT NULL,
+                expires_at  REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access)")
+        self._conn.commit()
+
+    # ------------------------
+    # Lecture / écriture
+    # ------------------------
+    def get(self, params: dict) -> Optional[dict]:
+        key = cache_key(params)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(zlib.decompress(row[0]))
+
+    def set(self, params: dict, response: dict, ttl: Optional[float] = None):
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        key = cache_key(params)
+        payload = zlib.compress(json.dumps(response, ensure_ascii=False).encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, json.dumps(normalize_params(params)), payload, len(payload), now, now + ttl, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        """Supprime les entrées expirées puis les moins récemment lues au-delà du budget."""
+        cur = self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        self.evictions += max(cur.rowcount, 0)
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    # ------------------------
+    # Maintenance
+    # ------------------------
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "size_bytes": size,
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,102 @@
+"""
+utils/retention.py
+Rétention de l'historique : passé `raw_days`, un jour de collecte n'est plus gardé
+qu'agrégé (min / médiane / moyenne / max / nombre par compagnie et date aller),
+dans la table `rollups` du store, à la même partition (route, date de collecte).
+
+- incrémental : seuls les jours encore bruts au-delà de la limite sont traités
+- reprise sûre : l'agrégat est écrit (nom stable) avant la suppression des bruts
+- `rollup_days` : durée de vie des agrégats eux-mêmes (0 = indéfiniment)
+- le cube (utils/cube.py) n'est pas touché : il ne disparaît qu'avec les agrégats
+
+    apply_retention(HistoryStore(), raw_days=30)
+"""
+
+import hashlib
+import os
+from datetime import date, datetime, timedelta
+from typing import Iterable, NamedTuple, Optional, Union
+
+import pandas as pd
+
+from utils.history_store import HistoryStore
+
+ROLLUP_KEYS = ["airline", "outbound_date"]
+
+DateLike = Union[str, date, datetime]
+
+
+def _day(value: DateLike) -> str:
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)[:10]
+
+
+class RetentionResult(NamedTuple):
+    rolled: list     # (route, date de collecte) agrégés
+    rows_in: int     # itinéraires bruts lus
+    rows_out: int    # lignes d'agrégat écrites
+    expired: list    # (route, date de collecte) d'agrégats supprimés
+
+
+def rollup(itineraries: pd.DataFrame) -> pd.DataFrame:
+    """Agrégat journalier d'une partition `itineraries` (une ligne par compagnie et date aller)."""
+    df = itineraries.dropna(subset=["price"])
+    if df.empty:
+        return pd.DataFrame(columns=[*ROLLUP_KEYS, "n", "price_min", "price_median", "price_mean", "price_max"])
+    price = df["price"].astype(float)
+    return (
+        price.groupby([df[k] for k in ROLLUP_KEYS], observed=True, dropna=False)
+        .agg(n="count", price_min="min", price_median="median", price_mean="mean", price_max="max")
+        .reset_index()
+    )
+
+
+def _cutoff(days: int, today: Optional[DateLike]) -> str:
+    ref = datetime.fromisoformat(_day(today)).date() if today else date.today()
+    return _day(ref - timedelta(days=days))
+
+
+def _rollup_name(paths: list) -> str:
+    # Dépend des fichiers bruts agrégés : une reprise après arrêt réécrit le même fichier
+    digest = hashlib.sha1("\n".join(sorted(os.path.basename(p) for p in paths)).encode()).hexdigest()
+    return f"rollup-{digest[:12]}"
+
+
+def apply_retention(store: HistoryStore, raw_days: int, rollup_days: int = 0,
+                    routes: Optional[Iterable[str]] = None, today: Optional[DateLike] = None,
+                    dry_run: bool = False) -> RetentionResult:
+    """
+    Agrège les jours de collecte antérieurs à `today - raw_days` puis supprime leurs
+    partitions brutes (itinéraires + segments). `raw_days=0` désactive l'agrégation.
+    """
+    rolled, rows_in, rows_out, expired = [], 0, 0, []
+    if raw_days > 0:
+        cutoff = _cutoff(raw_days, today)
+        for route, day, part_dir in store.partitions("itineraries", routes, end=cutoff):
+            if day == cutoff:
+                continue   # borne incluse dans `partitions` : on garde `raw_days` jours pleins
+            paths = [os.path.join(part_dir, f) for f in sorted(os.listdir(part_dir)) if f.endswith(".parquet")]
+            raw = store.read("itineraries", routes=[route], start=day, end=day)
+            agg = rollup(raw)
+            rolled.append((route, day))
+            rows_in += len(raw)
+            rows_out += len(agg)
+            if dry_run:
+                continue
+            if not agg.empty:
+                store.append(agg, "rollups", route, day, part_name=_rollup_name(paths))
+            store.drop("itineraries", route, day)
+            store.drop("segments", route, day)
+
+    if rollup_days > 0:
+        cutoff = _cutoff(rollup_days, today)
+        for route, day, _ in store.partitions("rollups", routes, end=cutoff):
+            if day == cutoff:
+                continue
+            expired.append((route, day))
+            if not dry_run:
+                store.drop("rollups", route, day)
+                store.drop("cube", route, day)
+
+    return RetentionResult(rolled, rows_in, rows_out, expired)
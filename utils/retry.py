@@ -0,0 +1,226 @@
+"""
+utils/retry.py
+Appels SerpAPI robustes :
+- classement des erreurs (réessayables vs fatales)
+- backoff exponentiel avec jitter
+- disjoncteur (circuit breaker) pour arrêter un lot quand l'API tombe en boucle
+- métriques par tentative (latence, issue)
+"""
+
+import logging
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger("serpapi")
+
+# Messages d'erreur SerpAPI qui ne changeront pas en réessayant
+FATAL_PATTERNS = (
+    "invalid api key",
+    "unsupported",
+    "missing",
+    "invalid",
+    "run out of searches",
+    "account",
+    "not allowed",
+)
+# Messages transitoires (quota par seconde, panne côté serveur)
+RETRYABLE_PATTERNS = (
+    "timeout",
+    "timed out",
+    "try again",
+    "rate limit",
+    "too many requests",
+    "internal server error",
+    "service unavailable",
+    "bad gateway",
+    "temporarily",
+)
+# Réponses vides légitimes : ce ne sont pas des erreurs
+EMPTY_PATTERNS = ("hasn't returned any results",)
+
+
+class SerpApiError(Exception):
+    def __init__(self, message: str, retryable: bool):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class CircuitOpenError(SerpApiError):
+    """Le disjoncteur est ouvert : l'appel n'est pas émis."""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f"API SerpAPI en échec répété — appels suspendus encore {retry_in:.0f}s", False)
+
+
+def check_response(results: dict) -> dict:
+    """Lève SerpApiError si la réponse est une erreur ; la renvoie telle quelle sinon."""
+    message = results.get("error")
+    if not message:
+        return results
+    text = str(message).lower()
+    if any(p in text for p in EMPTY_PATTERNS):
+        return results
+    retryable = any(p in text for p in RETRYABLE_PATTERNS) and not any(p in text for p in FATAL_PATTERNS)
+    raise SerpApiError(str(message), retryable)
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, SerpApiError):
+        return error.retryable
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    # Erreurs réseau (requests hérite d'OSError)
+    return isinstance(error, (OSError, TimeoutError, ConnectionError))
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """« Full jitter » : uniforme entre 0 et min(cap, base * 2^attempt)."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """
+    Fermé → ouvert après `threshold` échecs consécutifs ; ouvert pendant
+    `cooldown` secondes, puis un appel d'essai (semi-ouvert) décide de la suite.
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 60):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half-open" if time.monotonic() - self._opened_at >= self.cooldown else "open"
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            elapsed = time.monotonic() - self._opened_at
+            if elapsed < self.cooldown or self._trial:
+                raise CircuitOpenError(max(self.cooldown - elapsed, 0))
+            self._trial = True  # un seul appel d'essai à la fois
+
+    def on_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def on_abort(self):
+        """Appel terminé par une erreur fatale : ni succès ni échec, libère l'appel d'essai."""
+        with self._lock:
+            self._trial = False
+
+    def on_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial = False
+            if self._failures >= self.threshold or self._opened_at is not None:
+                if self._opened_at is None:
+                    logger.warning("Disjoncteur SerpAPI ouvert après %d échecs consécutifs", self._failures)
+                self._opened_at = time.monotonic()
+
+
+class CallMetrics:
+    """Métriques par tentative : latence et issue (ok / retry / fatal / circuit_open)."""
+
+    def __init__(self, keep: int = 10000):
+        self.keep = keep
+        self._attempts = []
+        self._lock = threading.Lock()
+
+    def record(self, outcome: str, latency: float, attempt: int):
+        with self._lock:
+            self._attempts.append((outcome, latency, attempt))
+            if len(self._attempts) > self.keep:
+                del self._attempts[: len(self._attempts) - self.keep]
+
+    def summary(self) -> dict:
+        with self._lock:
+            attempts = list(self._attempts)
+        outcomes = {}
+        for outcome, _, _ in attempts:
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        latencies = sorted(lat for outcome, lat, _ in attempts if outcome != "circuit_open")
+
+        def pct(p):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 3) if latencies else None
+
+        return {
+            "attempts": len(attempts),
+            "outcomes": outcomes,
+            "retries": sum(1 for _, _, a in attempts if a > 0),
+            "latency_p50": pct(0.50),
+            "latency_p95": pct(0.95),
+            "latency_max": round(latencies[-1], 3) if latencies else None,
+        }
+
+
+def call_with_retry(
+    fn: Callable[[], dict],
+    max_retries: int = 3,
+    base_delay: float = 1.0,
+    max_delay: float = 30.0,
+    breaker: Optional[CircuitBreaker] = None,
+    metrics: Optional[CallMetrics] = None,
+    sleep: Callable[[float], None] = time.sleep,
+) -> dict:
+    """
+    Appelle `fn()` (qui renvoie un dict SerpAPI) en réessayant les erreurs transitoires.
+    Les erreurs fatales et l'ouverture du disjoncteur sont levées immédiatement.
+    Le disjoncteur voit un appel logique, pas chaque tentative : il est consulté une
+    fois avant la première, et ne compte un échec que lorsque les réessais sont épuisés
+    (une erreur fatale, qui ne dit rien de la santé de l'API, n'est pas comptée).
+    """
+    attempt = 0
+    if breaker is not None:
+        try:
+            breaker.before_call()
+        except CircuitOpenError:
+            if metrics is not None:
+                metrics.record("circuit_open", 0.0, attempt)
+            raise
+
+    while True:
+        start = time.perf_counter()
+        try:
+            results = check_response(fn())
+        except Exception as e:
+            latency = time.perf_counter() - start
+            retryable = is_retryable(e)
+            if not retryable or attempt >= max_retries:
+                if breaker is not None and retryable:
+                    breaker.on_failure()
+                elif breaker is not None:
+                    breaker.on_abort()
+                if metrics is not None:
+                    metrics.record("fatal" if not retryable else "exhausted", latency, attempt)
+                logger.error("Appel SerpAPI en échec (%s, tentative %d) : %s",
+                             "fatal" if not retryable else "réessais épuisés", attempt + 1, e)
+                raise
+            if metrics is not None:
+                metrics.record("retry", latency, attempt)
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            logger.warning("Erreur transitoire SerpAPI (tentative %d) : %s — nouvel essai dans %.1fs",
+                           attempt + 1, e, delay)
+            sleep(delay)
+            attempt += 1
+            continue
+
+        if breaker is not None:
+            breaker.on_success()
+        if metrics is not None:
+            metrics.record("ok", time.perf_counter() - start, attempt)
+        return results
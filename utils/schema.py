@@ -0,0 +1,240 @@
+"""
+utils/schema.py
+Schéma canonique des données de vols, commun à tous les scripts.
+
+Anciennement trois variantes : `duration` (output/), `duration_min` + `route` /
+`search_date` (data/raw/), `date_depart` / `nb_escales` (meilleur_vol.py).
+Tout passe désormais par `normalize()` une seule fois, à l'écriture, dans deux
+tables : `itineraries` (une ligne par offre, identifiant stable) et `segments`
+(les vols de chaque offre, sans recopier prix ni durée totale). Passé la durée
+de rétention, une troisième table `rollups` remplace les deux autres.
+
+- compagnies, aéroports, route → category
+- prix, durées → Int32 ; escales → Int8
+- dates et horaires → datetime64 (plus de texte à reparser)
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+DATE = "datetime64[s]"
+
+# Une ligne par itinéraire (offre) : prix et durée totale n'apparaissent qu'ici
+ITINERARIES = {
+    "itinerary_id": "Int64",
+    "outbound_date": DATE,
+    "return_date": DATE,
+    "airline": "category",
+    "price": "Int32",
+    "departure_airport": "category",
+    "arrival_airport": "category",
+    "departure_time": DATE,
+    "arrival_time": DATE,
+    "duration_min": "Int32",
+    "stops": "Int8",
+    "flight_numbers": "string",
+}
+
+# Table fille : un vol (segment) par ligne, rattaché à son itinéraire
+SEGMENTS = {
+    "itinerary_id": "Int64",
+    "seq": "Int8",
+    "airline": "category",
+    "flight_number": "string",
+    "departure_airport": "category",
+    "arrival_airport": "category",
+    "departure_time": DATE,
+    "arrival_time": DATE,
+    "duration_min": "Int32",
+}
+
+# Jours de collecte anciens, agrégés par utils/retention.py (bruts supprimés)
+ROLLUPS = {
+    "outbound_date": DATE,
+    "airline": "category",
+    "n": "Int32",
+    "price_min": "Int32",
+    "price_median": "Float32",
+    "price_mean": "Float32",
+    "price_max": "Int32",
+}
+
+# Cube d'agrégats additifs, écrit avec chaque fichier `itineraries` (utils/cube.py)
+CUBE = {
+    "outbound_date": DATE,
+    "airline": "category",
+    "n": "Int32",
+    "price_sum": "Int64",
+    "price_min": "Int32",
+    "price_max": "Int32",
+}
+
+SCHEMAS = {"segments": SEGMENTS, "itineraries": ITINERARIES, "rollups": ROLLUPS, "cube": CUBE}
+
+# Colonnes portées par le chemin de partition du store
+PARTITION_COLUMNS = {"route": "category", "collection_date": DATE}
+
+# Anciens noms → noms canoniques
+ALIASES = {
+    "duration": "duration_min",
+    "search_date": "collection_date",
+    "date_recolte": "collection_date",
+    "date_collecte": "collection_date",
+    "date_depart": "outbound_date",
+    "nb_escales": "stops",
+    "segment_duration_min": "duration_min",
+}
+
+
+def _clean_int(series: pd.Series) -> pd.Series:
+    if pd.api.types.is_numeric_dtype(series):
+        return series.round()
+    if pd.api.types.is_integer_dtype(pd.to_numeric(series.dropna(), errors="coerce")):
+        return pd.to_numeric(series, errors="coerce")   # entiers signés (identifiants)
+    # Anciens CSV : prix en texte ("1 030 €")
+    digits = series.astype("string").str.replace(r"[^0-9]", "", regex=True)
+    return pd.to_numeric(digits.replace("", pd.NA), errors="coerce")
+
+
+def _parse_dates(series: pd.Series) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    text = series.astype("string").replace("", pd.NA)
+    return pd.to_datetime(text, errors="coerce", format="ISO8601")
+
+
+def cast(series: pd.Series, dtype: str) -> pd.Series:
+    """Convertit une colonne vers son type canonique (sans effet si elle l'a déjà)."""
+    if series.dtype == dtype:
+        return series
+    if dtype.startswith("Int"):
+        return _clean_int(series).astype(dtype)
+    if dtype.startswith("datetime64"):
+        return _parse_dates(series).astype(dtype)
+    if dtype == "category":
+        return series.astype("string").astype("category")
+    return series.astype(dtype)
+
+
+def offer_rank(*keys: pd.Series) -> np.ndarray:
+    """Rang (0, 1, …) de chaque ligne parmi les lignes aux clés identiques, dans l'ordre d'apparition."""
+    frame = pd.DataFrame({i: key.astype(object).fillna("").to_numpy() for i, key in enumerate(keys)})
+    return frame.groupby(list(frame.columns), sort=False).cumcount().to_numpy(dtype=np.uint64)
+
+
+def _hash_text(values: pd.Series) -> np.ndarray:
+    """Hash de chaque valeur (absente = chaîne vide), calculé une fois par valeur distincte."""
+    codes, uniques = pd.factorize(values.to_numpy(dtype=object))
+    hashes = pd.util.hash_array(np.append(np.asarray(uniques, dtype=object), ""), categorize=False)
+    return hashes[codes]   # code -1 (absente) → dernier hash, celui de ""
+
+
+def _hash_day(values: pd.Series) -> np.ndarray:
+    """Hash d'une date au format YYYY-MM-DD ; 0 si elle est absente (aller simple)."""
+    codes, uniques = pd.factorize(values.to_numpy(dtype=object))
+    days = pd.to_datetime(pd.Series(uniques, dtype=object), errors="coerce", format="mixed")
+    text = days.dt.strftime("%Y-%m-%d").to_numpy(dtype=object)
+    hashes = np.where(days.notna(), pd.util.hash_array(np.where(days.notna(), text, ""), categorize=False), 0)
+    return np.append(hashes.astype(np.uint64), np.uint64(0))[codes]
+
+
+def itinerary_ids(departure_time: pd.Series, flight_numbers: pd.Series, return_date: Optional[pd.Series] = None,
+                  rank: Optional[np.ndarray] = None) -> pd.Series:
+    """
+    Identifiant stable d'un itinéraire : mêmes vols au même horaire (et même date
+    retour pour un aller-retour) → même id, d'une collecte à l'autre (le prix, lui, varie).
+    Une collecte peut proposer plusieurs offres sur les mêmes vols (autre tarif,
+    autre prix) : `rank` (cf. `offer_rank`, calculé par collecte) les distingue.
+    Un aller simple (sans date retour) et la première offre (rang 0) gardent l'id
+    calculé sur l'horaire et les vols seuls.
+    """
+    if pd.api.types.is_datetime64_any_dtype(departure_time):
+        dep = departure_time.dt.strftime("%Y-%m-%d %H:%M")
+    else:
+        dep = departure_time   # texte SerpAPI, déjà au format "YYYY-MM-DD HH:MM"
+    with np.errstate(over="ignore"):
+        ids = _hash_text(dep) * np.uint64(0x9E3779B97F4A7C15) ^ _hash_text(flight_numbers)
+        if return_date is not None:
+            ids = ids ^ (_hash_day(return_date) * np.uint64(0x94D049BB133111EB))
+        if rank is not None:
+            ids = ids ^ (np.asarray(rank, dtype=np.uint64) * np.uint64(0xC2B2AE3D27D4EB4F))
+    return pd.Series(ids.view(np.int64), index=departure_time.index, dtype="Int64")
+
+
+def normalize(df: pd.DataFrame, dataset: str) -> pd.DataFrame:
+    """Aligne un DataFrame (quel que soit son ancien format) sur le schéma du jeu de données."""
+    schema = SCHEMAS[dataset]
+    df = df.rename(columns=ALIASES)
+    out = pd.DataFrame(index=df.index)
+    for col, dtype in schema.items():
+        values = df[col] if col in df.columns else pd.Series(pd.NA, index=df.index, dtype=object)
+        out[col] = cast(values, dtype)
+    if dataset == "itineraries":
+        if out["stops"].isna().all():
+            out["stops"] = (out["flight_numbers"].str.count(" / ")).astype("Int8")
+        if out["itinerary_id"].isna().all():
+            # Anciens fichiers : un fichier = une collecte (une réponse par couple de dates)
+            rank = offer_rank(out["outbound_date"], out["return_date"], out["departure_time"], out["flight_numbers"])
+            out["itinerary_id"] = itinerary_ids(out["departure_time"], out["flight_numbers"], out["return_date"], rank)
+    return out.reset_index(drop=True)
+
+
+def split_flat(flat: pd.DataFrame, destination: str) -> tuple:
+    """
+    Ancien format « une ligne par segment » (prix et durée recopiés sur chaque vol)
+    → (itinéraires, segments). Un itinéraire s'arrête quand on atteint `destination`
+    ou quand la chaîne d'aéroports / le prix ne se suit plus.
+    """
+    df = flat.rename(columns=ALIASES).reset_index(drop=True)
+    if df.empty:
+        return normalize(df, "itineraries"), normalize(df, "segments")
+    dep = df["departure_airport"].astype("string").fillna("")
+    arr = df["arrival_airport"].astype("string").fillna("")
+    price = df["price"].astype("string").fillna("")
+    new = (
+        (arr.shift() == destination.upper())
+        | (dep != arr.shift())
+        | (price != price.shift())
+    )
+    group = np.cumsum(new.fillna(True).to_numpy(dtype=bool)) - 1
+    first = df[~pd.Series(group).duplicated(keep="first")].reset_index(drop=True)
+    last = df[~pd.Series(group).duplicated(keep="last")].reset_index(drop=True)
+    numbers = df["flight_number"].astype("string").fillna("").groupby(group).agg(" / ".join)
+    itin = pd.DataFrame({
+        "outbound_date": first.get("outbound_date"),
+        "return_date": first.get("return_date"),
+        "airline": first["airline"],
+        "price": first["price"],
+        "departure_airport": first["departure_airport"],
+        "arrival_airport": last["arrival_airport"],
+        "departure_time": first["departure_time"],
+        "arrival_time": last["arrival_time"],
+        "duration_min": first.get("duration_min"),
+        "stops": np.bincount(group) - 1,
+        "flight_numbers": numbers.to_numpy(),
+    })
+    itin = normalize(itin, "itineraries")
+
+    seg = df.drop(columns=["duration_min"], errors="ignore")   # durée totale : pas celle du vol
+    seg["itinerary_id"] = itin["itinerary_id"].to_numpy()[group]
+    seg["seq"] = pd.Series(group).groupby(group).cumcount().to_numpy()
+    return itin, normalize(seg, "segments")
+
+
+def conform(df: pd.DataFrame, dataset: str) -> pd.DataFrame:
+    """Réapplique les types canoniques aux colonnes présentes (après concat, SQL, ...)."""
+    for col, dtype in {**SCHEMAS[dataset], **PARTITION_COLUMNS}.items():
+        if col in df.columns:
+            df[col] = cast(df[col], dtype)
+    return df
+
+
+def to_text(df: pd.DataFrame) -> pd.DataFrame:
+    """Dates (`*_date`) et horaires en texte ISO, pour les sorties CSV et SQLite."""
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            fmt = "%Y-%m-%d" if col.endswith("_date") else "%Y-%m-%d %H:%M"
+            df[col] = df[col].dt.strftime(fmt)
+    return df
@@ -0,0 +1,175 @@
+"""
+utils/scoring.py
+Classement multicritère vectorisé des itinéraires, commun à meilleur_vol.py et
+flight_analyzer.py.
+
+- critères (plus petit = meilleur), ramenés chacun sur 0–100 (min-max) :
+  prix, durée, escales, écart à la plage horaire de départ souhaitée, compagnie
+  hors préférences
+- score global = moyenne pondérée (0 = parfait, 100 = pire), poids dans `Weights`
+- `pareto_front` : itinéraires non dominés (prix, durée, escales), exact, O(n log n)
+- `top_k` : k meilleurs scores par tri partiel (argpartition), sans trier le reste
+
+    ranked = rank(df, Weights(price=0.5, duration=0.3, stops=0.2), k=3)
+"""
+
+from typing import Iterable, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class Weights(NamedTuple):
+    price: float = 0.6
+    duration: float = 0.4
+    stops: float = 0.0
+    departure_hour: float = 0.0
+    airline: float = 0.0
+
+
+DEFAULT_WEIGHTS = Weights()
+
+# Critère → colonne de détail ajoutée par `rank`
+SCORE_COLUMNS = {
+    "price": "score_prix",
+    "duration": "score_duree",
+    "stops": "score_escales",
+    "departure_hour": "score_horaire",
+    "airline": "score_compagnie",
+}
+
+
+def _values(series: pd.Series) -> np.ndarray:
+    """Colonne numérique → float64, valeurs manquantes à +inf (toujours les pires)."""
+    values = pd.to_numeric(series, errors="coerce").astype("float64").to_numpy(na_value=np.nan)
+    return np.where(np.isnan(values), np.inf, values)
+
+
+def _departure_hours(series: pd.Series) -> np.ndarray:
+    if not pd.api.types.is_datetime64_any_dtype(series):
+        series = pd.to_datetime(series.astype("string"), errors="coerce", format="ISO8601")
+    return (series.dt.hour + series.dt.minute / 60).astype("float64").to_numpy(na_value=np.nan)
+
+
+def criteria(df: pd.DataFrame, preferred_airlines: Iterable[str] = (),
+             hours: tuple = (7, 21)) -> dict:
+    """Valeurs brutes de chaque critère (plus petit = meilleur), une entrée par champ de `Weights`."""
+    hour = _departure_hours(df["departure_time"]) if "departure_time" in df else np.full(len(df), np.nan)
+    lo, hi = hours
+    # Distance (en heures) à la plage souhaitée ; 0 à l'intérieur
+    outside = np.maximum(lo - hour, 0) + np.maximum(hour - hi, 0)
+    preferred = list(preferred_airlines)
+    airline = (
+        (~df["airline"].isin(preferred)).to_numpy(dtype="float64") if preferred and "airline" in df
+        else np.zeros(len(df))
+    )
+    return {
+        "price": _values(df["price"]),
+        "duration": _values(df["duration_min"]),
+        "stops": _values(df["stops"]) if "stops" in df else np.zeros(len(df)),
+        "departure_hour": np.where(np.isnan(outside), np.inf, outside),
+        "airline": airline,
+    }
+
+
+def _scale(values: np.ndarray) -> np.ndarray:
+    """Min-max sur 0–100 (0 si constant) ; valeurs manquantes (+inf) → 100."""
+    finite = np.isfinite(values)
+    if not finite.any():
+        return np.zeros(len(values))
+    lo, hi = values[finite].min(), values[finite].max()
+    scaled = (values - lo) / (hi - lo) * 100 if hi > lo else np.zeros(len(values))
+    return np.where(finite, scaled, 100.0)
+
+
+def score(df: pd.DataFrame, weights: Weights = DEFAULT_WEIGHTS, preferred_airlines: Iterable[str] = (),
+          hours: tuple = (7, 21), values: Optional[dict] = None) -> tuple:
+    """(score global, {critère: score 0–100}) pour les critères de poids non nul."""
+    total = sum(weights)
+    if total <= 0:
+        raise ValueError("Au moins un poids doit être strictement positif")
+    if values is None:
+        values = criteria(df, preferred_airlines, hours)
+    parts = {name: _scale(values[name]) for name, w in weights._asdict().items() if w > 0}
+    combined = sum(getattr(weights, name) * part for name, part in parts.items()) / total
+    return np.asarray(combined, dtype="float64"), parts
+
+
+def _front_2d(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Non dominés en (x, y) : tri par x puis minimum courant de y, en tenant compte des égalités."""
+    n = len(x)
+    if n == 0:
+        return np.zeros(0, dtype=bool)
+    order = np.lexsort((y, x))
+    xs, ys = x[order], y[order]
+    start = np.r_[True, xs[1:] != xs[:-1]]
+    group = np.cumsum(start) - 1
+    group_min = ys[start]                                     # meilleur y à x égal
+    before = np.r_[np.inf, np.minimum.accumulate(group_min)[:-1]]   # meilleur y à x strictement plus petit
+    dominated = (ys > group_min[group]) | (before[group] <= ys)
+    mask = np.empty(n, dtype=bool)
+    mask[order] = ~dominated
+    return mask
+
+
+def _dominated_by(x: np.ndarray, y: np.ndarray, ref_x: np.ndarray, ref_y: np.ndarray) -> np.ndarray:
+    """True si un point de référence a x ≤ x_i et y ≤ y_i (recherche dichotomique + minimum préfixe)."""
+    if len(ref_x) == 0:
+        return np.zeros(len(x), dtype=bool)
+    order = np.argsort(ref_x, kind="stable")
+    sorted_x, prefix_min = ref_x[order], np.minimum.accumulate(ref_y[order])
+    idx = np.searchsorted(sorted_x, x, side="right")
+    best = np.where(idx > 0, prefix_min[np.maximum(idx - 1, 0)], np.inf)
+    return best <= y
+
+
+def pareto_front(price, duration, stops: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Masque des itinéraires non dominés : aucun autre n'est à la fois moins cher (ou égal),
+    plus court (ou égal) et avec moins d'escales (ou autant), en étant strictement meilleur
+    sur un critère. Tri + minimum préfixe, un passage par niveau d'escales : O(L · n log n),
+    L = nombre de valeurs d'escales distinctes (≤ 4 en pratique).
+    """
+    x, y = np.asarray(price, dtype="float64"), np.asarray(duration, dtype="float64")
+    if stops is None:
+        return _front_2d(x, y)
+    s = np.asarray(stops, dtype="float64")
+    mask = np.zeros(len(x), dtype=bool)
+    seen = np.zeros(len(x), dtype=bool)   # niveaux d'escales déjà traités (strictement moins d'escales)
+    for level in np.unique(s):
+        rows = s == level
+        local = _front_2d(x[rows], y[rows])
+        # Dominé par un itinéraire avec moins d'escales (x ≤ et y ≤ suffisent : l'escale est stricte)
+        lower = _dominated_by(x[rows], y[rows], x[seen], y[seen])
+        mask[rows] = local & ~lower
+        seen |= rows
+    return mask
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions des k plus petits scores, triées (tri partiel : O(n + k log k))."""
+    scores = np.asarray(scores)
+    if k >= len(scores):
+        return np.argsort(scores, kind="stable")
+    part = np.argpartition(scores, k - 1)[:k]
+    return part[np.argsort(scores[part], kind="stable")]
+
+
+def rank(df: pd.DataFrame, weights: Weights = DEFAULT_WEIGHTS, k: Optional[int] = None,
+         preferred_airlines: Iterable[str] = (), hours: tuple = (7, 21)) -> pd.DataFrame:
+    """
+    `df` classé par score (0 = meilleur) avec `score_global`, le détail par critère
+    (`score_prix`, ...) et `pareto` ; seulement les `k` premiers si `k` est donné.
+    """
+    if df.empty:
+        return df.assign(score_global=pd.Series(dtype="float64"), pareto=pd.Series(dtype=bool))
+    values = criteria(df, preferred_airlines, hours)
+    combined, parts = score(df, weights, values=values)
+    stops = values["stops"] if "stops" in df else None
+    out = df.assign(
+        **{SCORE_COLUMNS[name]: part.round(1) for name, part in parts.items()},
+        score_global=combined.round(1),
+        pareto=pareto_front(values["price"], values["duration"], stops),
+    )
+    order = top_k(combined, k) if k else np.argsort(combined, kind="stable")
+    return out.iloc[order]
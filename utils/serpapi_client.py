@@ -0,0 +1,90 @@
+"""
+utils/serpapi_client.py
+Point d'entrée unique des appels SerpAPI (Google Flights) pour tous les scripts :
+cache disque → réessais / disjoncteur → API → archive brute
+"""
+
+import threading
+
+from config.settings import (
+    SERPAPI_CACHE_PATH, SERPAPI_CACHE_TTL, SERPAPI_CACHE_MAX_MB,
+    SERPAPI_ARCHIVE_DIR, SERPAPI_ARCHIVE_ENABLED,
+    SERPAPI_MAX_RETRIES, SERPAPI_BACKOFF_BASE, SERPAPI_BACKOFF_MAX,
+    SERPAPI_BREAKER_THRESHOLD, SERPAPI_BREAKER_COOLDOWN, SERPAPI_BACKEND,
+)
+from utils.raw_archive import RawArchive
+from utils.response_cache import ResponseCache
+from utils.retry import CallMetrics, CircuitBreaker, call_with_retry
+
+_cache = None
+_archive = None
+_cache_lock = threading.Lock()
+
+# Partagés par tous les threads du processus : un lot s'arrête dès que l'API tombe
+breaker = CircuitBreaker(SERPAPI_BREAKER_THRESHOLD, SERPAPI_BREAKER_COOLDOWN)
+metrics = CallMetrics()
+
+
+def get_cache() -> ResponseCache:
+    """Cache disque partagé du processus (créé à la première utilisation)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(
+                SERPAPI_CACHE_PATH,
+                default_ttl=SERPAPI_CACHE_TTL,
+                max_bytes=int(SERPAPI_CACHE_MAX_MB * 1024 * 1024),
+            )
+        return _cache
+
+
+def get_archive() -> RawArchive:
+    """Archive brute partagée du processus (créée à la première utilisation)."""
+    global _archive
+    with _cache_lock:
+        if _archive is None:
+            _archive = RawArchive(SERPAPI_ARCHIVE_DIR)
+        return _archive
+
+
+def _call_api(params: dict) -> dict:
+    from serpapi import GoogleSearch
+    # Copie : GoogleSearch ajoute `source` au dict reçu, ce qui fausserait la clé de cache
+    client = GoogleSearch(dict(params))
+    if SERPAPI_BACKEND:
+        client.BACKEND = SERPAPI_BACKEND.rstrip("/")
+    return client.get_dict()
+
+
+def search(params: dict, use_cache: bool = True, ttl: float = None) -> dict:
+    """
+    Équivalent de `GoogleSearch(params).get_dict()` passant par le cache disque.
+    Les erreurs transitoires sont réessayées avec backoff ; les erreurs fatales
+    (clé invalide, paramètre `hl` non supporté...) et l'ouverture du disjoncteur
+    lèvent `utils.retry.SerpApiError`.
+    Chaque réponse réellement reçue de l'API est ajoutée à l'archive brute.
+    """
+    cache = get_cache() if use_cache else None
+    if cache is not None:
+        cached = cache.get(params)
+        if cached is not None:
+            return cached
+
+    def attempt():
+        results = _call_api(params)
+        if SERPAPI_ARCHIVE_ENABLED:
+            get_archive().append(params, results)
+        return results
+
+    results = call_with_retry(
+        attempt,
+        max_retries=SERPAPI_MAX_RETRIES,
+        base_delay=SERPAPI_BACKOFF_BASE,
+        max_delay=SERPAPI_BACKOFF_MAX,
+        breaker=breaker,
+        metrics=metrics,
+    )
+
+    if cache is not None and "error" not in results:
+        cache.set(params, results, ttl=ttl)
+    return results
@@ -0,0 +1,104 @@
+"""
+utils/shared_history.py
+Jeu de données unique, en lecture seule, partagé par toutes les sessions d'un
+tableau de bord (à garder dans `st.cache_resource`) :
+
+- un `Snapshot` immuable (empreinte du store + tables prêtes à afficher)
+- un thread d'arrière-plan surveille l'empreinte du store et, s'il y a du nouveau,
+  construit le snapshot suivant (chargement incrémental, cf. SnapshotCache) puis le
+  substitue d'un seul coup : une session voit l'ancien ou le nouveau, jamais un mélange
+- les sessions reçoivent des vues (Copy-on-Write de pandas) : pas de copie par session
+
+    shared = SharedHistory("CDG-ABJ", prepare=lambda cache: (cache.frame, cache.cube))
+    shared.start()
+    data, cube = shared.view()
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Iterable, NamedTuple, Optional
+
+import pandas as pd
+
+from utils.fare_db import SnapshotCache
+from utils.history_store import HistoryStore
+
+logger = logging.getLogger("dashboard")
+
+
+class Snapshot(NamedTuple):
+    fingerprint: str
+    data: pd.DataFrame      # relevés bruts préparés
+    daily: pd.DataFrame     # agrégats (cube) préparés
+    loaded_at: float
+
+
+class SharedHistory:
+
+    def __init__(self, route: str, prepare: Callable[[SnapshotCache], tuple], interval: float = 60.0,
+                 store_dir: Optional[str] = None, db_path: Optional[str] = None):
+        from config.settings import HISTORY_STORE_DIR
+
+        self.route = route
+        self.interval = interval
+        self._prepare = prepare
+        self._store = HistoryStore(store_dir or HISTORY_STORE_DIR)
+        self._cache = SnapshotCache(route, store_dir, db_path)
+        self._snapshot: Optional[Snapshot] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # ------------------------
+    # Lecture (sessions)
+    # ------------------------
+    @property
+    def snapshot(self) -> Snapshot:
+        """Snapshot courant (chargé au premier appel) ; une simple lecture d'attribut, donc atomique."""
+        if self._snapshot is None:
+            self.refresh()
+        return self._snapshot
+
+    def view(self, columns: Optional[Iterable[str]] = None) -> tuple:
+        """
+        (relevés, agrégats) du snapshot courant, sans copie : sous Copy-on-Write, une
+        session qui modifie sa vue ne touche ni le snapshot ni les autres sessions.
+        """
+        snap = self.snapshot
+        data = snap.data[list(columns)] if columns is not None else snap.data.copy(deep=False)
+        return data, snap.daily.copy(deep=False)
+
+    # ------------------------
+    # Mise à jour
+    # ------------------------
+    def refresh(self) -> bool:
+        """Construit et publie un nouveau snapshot si le store a changé ; renvoie True si c'est le cas."""
+        with self._lock:
+            fingerprint = self._store.fingerprint(routes=[self.route])
+            if self._snapshot is not None and self._snapshot.fingerprint == fingerprint:
+                return False
+            self._cache.refresh(fingerprint)
+            data, daily = self._prepare(self._cache)
+            self._snapshot = Snapshot(fingerprint, data, daily, time.time())
+            return True
+
+    def start(self) -> "SharedHistory":
+        """Lance le rafraîchissement périodique (thread démon, idempotent)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=f"shared-history-{self.route}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if self.refresh():
+                    logger.info("Historique %s rechargé (%d relevés)", self.route, len(self._snapshot.data))
+            except Exception as e:
+                # Le snapshot précédent reste servi ; nouvel essai au prochain tour
+                logger.warning("Rafraîchissement de l'historique %s en échec : %s", self.route, e)
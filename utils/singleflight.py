@@ -0,0 +1,114 @@
+"""
+utils/singleflight.py
+Regroupement des requêtes identiques simultanées (« single-flight »).
+Les sessions Streamlit tournent dans des threads du même processus : si
+plusieurs utilisateurs lancent la même recherche en même temps, un seul
+appel est émis et tous reçoivent le même résultat.
+"""
+
+import threading
+from typing import Any, Callable, Hashable
+
+
+class SharedCallError(Exception):
+    """
+    Échec de l'appel partagé, levé chez chaque appelant qui l'attendait : une
+    exception neuve par thread (l'originale, commune, est dans `__cause__`).
+    """
+
+    def __init__(self, error: BaseException):
+        super().__init__(str(error))
+        self.error = error
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "aborted")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.aborted = False
+
+
+class SingleFlight:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.issued = 0
+        self.coalesced = 0
+        self.failed = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Exécute `fn()` pour `key`, ou attend l'appel identique déjà en cours.
+        Le résultat est partagé tel quel : il doit être traité en lecture seule
+        par les appelants. Une exception de l'appel est levée telle quelle chez
+        celui qui l'a émis, et enveloppée dans `SharedCallError` chez les autres.
+        Si l'appel en cours est interrompu sans erreur à partager (BaseException :
+        arrêt ou relance d'un script Streamlit, KeyboardInterrupt…), les appelants
+        en attente recommencent et l'un d'eux émet l'appel.
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                    self.issued += 1
+
+            if leader:
+                break
+            call.done.wait()
+            if call.aborted:
+                continue   # compté plus tard, une seule fois : émis ou regroupé
+            with self._lock:
+                self.coalesced += 1
+            if call.error is not None:
+                raise SharedCallError(call.error) from call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                self.failed += 1
+            raise
+        except BaseException:
+            call.aborted = True
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.issued + self.coalesced
+            return {
+                "issued": self.issued,
+                "coalesced": self.coalesced,
+                "failed": self.failed,
+                "in_flight": len(self._calls),
+                "saved_ratio": round(self.coalesced / total, 3) if total else 0.0,
+            }
+
+
+# Groupes partagés par tout le processus (ce module n'est importé qu'une fois,
+# contrairement aux scripts Streamlit ré-exécutés à chaque interaction)
+_groups = {}
+_groups_lock = threading.Lock()
+
+
+def get_group(name: str) -> SingleFlight:
+    with _groups_lock:
+        if name not in _groups:
+            _groups[name] = SingleFlight()
+        return _groups[name]
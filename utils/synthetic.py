@@ -0,0 +1,91 @@
+"""
+utils/synthetic.py
+Réponses Google Flights synthétiques mais réalistes (même structure que SerpAPI)
+pour les benchmarks et les tests de charge hors-ligne.
+"""
+
+import random
+from datetime import datetime, timedelta
+from typing import Optional
+
+AIRLINES = [
+    ("Air France", "AF", None),
+    ("Air Cote D'Ivoire", "HF", None),
+    ("Corsair", "SS", None),
+    ("Royal Air Maroc", "AT", "CMN"),
+    ("Brussels Airlines", "SN", "BRU"),
+    ("TAP Air Portugal", "TP", "LIS"),
+    ("Turkish Airlines", "TK", "IST"),
+    ("Emirates", "EK", "DXB"),
+]
+
+
+def _segment(rng, airline, code, dep, arr, start, minutes):
+    end = start + timedelta(minutes=minutes)
+    return {
+        "departure_airport": {"name": dep, "id": dep, "time": start.strftime("%Y-%m-%d %H:%M")},
+        "arrival_airport": {"name": arr, "id": arr, "time": end.strftime("%Y-%m-%d %H:%M")},
+        "duration": minutes,
+        "airplane": rng.choice(["Airbus A330", "Boeing 787", "Airbus A320", "Boeing 737"]),
+        "airline": airline,
+        "airline_logo": f"https://www.gstatic.com/flights/airline_logos/70px/{code}.png",
+        "travel_class": "Économie",
+        "flight_number": f"{code} {rng.randint(100, 999)}",
+        "legroom": "79 cm",
+        "extensions": ["Wi-Fi payant", "Prise USB"],
+    }
+
+
+def make_itinerary(rng: random.Random, departure_id: str, arrival_id: str, day: datetime) -> dict:
+    airline, code, hub = rng.choice(AIRLINES)
+    start = day.replace(hour=rng.randint(6, 20), minute=rng.choice([0, 15, 30, 45]))
+    if hub is None:
+        minutes = rng.randint(380, 420)
+        segments = [_segment(rng, airline, code, departure_id, arrival_id, start, minutes)]
+        layovers = []
+        total = minutes
+    else:
+        leg1, wait, leg2 = rng.randint(150, 300), rng.randint(60, 400), rng.randint(200, 380)
+        second_start = start + timedelta(minutes=leg1 + wait)
+        segments = [
+            _segment(rng, airline, code, departure_id, hub, start, leg1),
+            _segment(rng, airline, code, hub, arrival_id, second_start, leg2),
+        ]
+        layovers = [{"duration": wait, "name": hub, "id": hub}]
+        total = leg1 + wait + leg2
+    base = 650 if hub else 900
+    return {
+        "flights": segments,
+        "layovers": layovers,
+        "total_duration": total,
+        "carbon_emissions": {"this_flight": rng.randint(400000, 900000), "typical_for_this_route": 600000},
+        "price": int(base + rng.gauss(0, 120) + (day.toordinal() % 7) * 15),
+        "type": "Aller-retour",
+        "airline_logo": segments[0]["airline_logo"],
+        "booking_token": "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789") for _ in range(48)),
+    }
+
+
+def make_response(
+    departure_id: str = "CDG",
+    arrival_id: str = "ABJ",
+    outbound_date: str = "2025-12-23",
+    n_best: int = 3,
+    n_other: int = 12,
+    seed: Optional[int] = None,
+) -> dict:
+    """Une réponse complète au format `GoogleSearch(params).get_dict()`."""
+    rng = random.Random(seed)
+    day = datetime.strptime(outbound_date, "%Y-%m-%d")
+    return {
+        "search_metadata": {"status": "Success", "created_at": datetime.now().isoformat()},
+        "search_parameters": {
+            "engine": "google_flights",
+            "departure_id": departure_id,
+            "arrival_id": arrival_id,
+            "outbound_date": outbound_date,
+        },
+        "best_flights": [make_itinerary(rng, departure_id, arrival_id, day) for _ in range(n_best)],
+        "other_flights": [make_itinerary(rng, departure_id, arrival_id, day) for _ in range(n_other)],
+        "price_insights": {"lowest_price": 650, "price_level": "typical"},
+    }